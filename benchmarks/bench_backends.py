@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark TrafficEnv step latency for each simulation backend.
+
+'traci' talks to a SUMO process over a TCP socket; 'libsumo' runs SUMO inside
+this process, so every API call is a function call instead of a socket
+round-trip. 'fake' (FakeTraCI) needs no SUMO and only measures the Python side.
+
+Each backend runs in its own subprocess, so libsumo's one-simulation-per-process
+limit does not get in the way.
+
+Usage:
+    python benchmarks/bench_backends.py --steps 1000
+    python benchmarks/bench_backends.py --backends traci libsumo fake --scenario high
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def run_backend(backend, steps, scenario, seed):
+    """Runs in a subprocess: returns per-step latencies (ms) and TraCI calls per step."""
+    import torch
+    from src.config import NUM_AGENTS, ACTION_DIM
+    from src.env.traffic_env import TrafficEnv
+
+    env = TrafficEnv(use_sumo=True, scenario=scenario, backend=backend)
+    env.reset(seed=seed, scenario=scenario)
+    actions = torch.randint(ACTION_DIM, (steps, NUM_AGENTS), generator=torch.Generator().manual_seed(seed))
+    latencies, calls = [], 0
+    try:
+        for t in range(steps):
+            t0 = time.perf_counter()
+            _, _, _, done, info = env.step(actions[t])
+            latencies.append((time.perf_counter() - t0) * 1000)
+            calls += info.get('traci_calls', 0)
+            if done:
+                env.reset(seed=seed, scenario=scenario)
+        backend_name = env.sumo.backend_name
+    finally:
+        env.close()
+    return {'backend': backend_name, 'latencies': latencies, 'calls_per_step': calls / steps}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["traci", "libsumo"])
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--scenario", default="medium")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_backend(args.worker, args.steps, args.scenario, args.seed)
+        print("RESULT " + json.dumps(result))
+        return
+
+    rows = []
+    for backend in args.backends:
+        out = subprocess.run(
+            [sys.executable, __file__, "--worker", backend, "--steps", str(args.steps),
+             "--scenario", args.scenario, "--seed", str(args.seed)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(next(line for line in out.splitlines() if line.startswith("RESULT "))[7:])
+        rows.append((backend, result))
+
+    baseline = np.mean(rows[0][1]['latencies'])
+    print("\n" + "=" * 80)
+    print(f"📊 STEP LATENCY BY BACKEND (city4x4 {args.scenario}, {args.steps} steps)")
+    print("=" * 80)
+    print(f"{'Backend':>18} | {'mean (ms)':>10} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'calls/step':>10} | {'speedup':>8}")
+    print("-" * 80)
+    for backend, result in rows:
+        lat = np.asarray(result['latencies'])
+        name = backend if result['backend'] == backend else f"{backend}->{result['backend']}"
+        print(f"{name:>18} | {lat.mean():10.3f} | {np.percentile(lat, 50):9.3f} | {np.percentile(lat, 95):9.3f} | "
+              f"{result['calls_per_step']:10.1f} | {baseline / lat.mean():8.2f}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark rollout buffer memory per transition with the compact storage modes.
+
+A PPOTrainer is filled with the same synthetic rollout (K environments of
+--agents agents each, global rewards/costs/dones as TrafficEnv returns them) in
+each storage mode: the default float32/int64 layout, compact storage (uint8
+actions, one reward/cost/done per environment and step), and compact storage
+with float16 or bfloat16 states. For every mode the buffer bytes per step and
+per agent-step are reported, along with the time of one PPO update and the
+largest difference of its losses from the default layout.
+
+Usage:
+    python benchmarks/bench_buffer_memory.py
+    python benchmarks/bench_buffer_memory.py --agents 25 --envs 8 --buffer-size 4096
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.madrl.ppo_trainer import PPOTrainer
+
+MODES = [
+    ("default", dict()),
+    ("compact", dict(compact_buffer=True)),
+    ("compact + float16", dict(compact_buffer=True, buffer_state_dtype='float16')),
+    ("compact + bfloat16", dict(compact_buffer=True, buffer_state_dtype='bfloat16')),
+]
+
+
+def rollout(config, envs, steps, seed=0):
+    """Synthetic per-step tensors shaped like a stacked K-environment rollout."""
+    g = torch.Generator().manual_seed(seed)
+    agents = config.num_agents // envs
+    states = torch.rand(steps + 1, config.num_agents, config.state_dim, generator=g)
+    rewards = -torch.rand(steps, envs, 1, generator=g).repeat_interleave(agents, dim=1)
+    costs = torch.rand(steps, envs, 1, generator=g).repeat_interleave(agents, dim=1)
+    dones = torch.rand(steps, envs, generator=g) < 0.01
+    return states, rewards, costs, dones
+
+
+def run(config, envs, data):
+    """Fill the buffer with the rollout and time one PPO update; (metrics, seconds)."""
+    states, rewards, costs, dones = data
+    torch.manual_seed(0)
+    trainer = PPOTrainer(config=config, num_envs=envs)
+    for t in range(config.buffer_size):
+        actions, log_probs, values, cost_values = trainer.step_collect(states[t])
+        trainer.store(states[t], actions, log_probs, rewards[t], costs[t], values, cost_values, dones[t])
+    t0 = time.perf_counter()
+    metrics = trainer.train_step(states[-1], dones[-1].any())
+    return metrics, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=25, help="Agents per environment")
+    parser.add_argument("--envs", type=int, default=4)
+    parser.add_argument("--buffer-size", type=int, default=2048)
+    parser.add_argument("--update-steps", type=int, default=256,
+                        help="Steps collected for the timed update and loss comparison")
+    args = parser.parse_args()
+
+    base = RunConfig(num_agents=args.agents * args.envs, device="cpu", ppo_epochs=2)
+    data = rollout(base.override(buffer_size=args.update_steps), args.envs, args.update_steps)
+
+    rows, reference = [], None
+    for name, changes in MODES:
+        # Memory of the full-size buffer; the update runs on a shorter rollout
+        full = PPOTrainer(config=base.override(buffer_size=args.buffer_size, **changes), num_envs=args.envs)
+        per_step, per_agent_step = full.buffer.bytes_per_transition()
+        total = full.buffer.memory_bytes()
+        del full
+        metrics, seconds = run(base.override(buffer_size=args.update_steps, **changes), args.envs, data)
+        losses = [metrics[k] for k in ('policy_loss', 'critic_loss', 'avg_cost')]
+        reference = reference or losses
+        diff = max(abs(a - b) for a, b in zip(losses, reference))
+        rows.append((name, per_step, per_agent_step, total, seconds, diff))
+
+    mib = 1024 * 1024
+    default_total = rows[0][3]
+    print("\n" + "=" * 80)
+    print(f"📊 ROLLOUT BUFFER MEMORY ({args.envs} envs x {args.agents} agents, buffer_size={args.buffer_size})")
+    print("=" * 80)
+    print(f"{'Storage':>20} | {'B/step':>8} | {'B/agent-step':>12} | {'buffer MiB':>10} | {'vs default':>10} | "
+          f"{'update s':>8} | {'loss diff':>9}")
+    print("-" * 80)
+    for name, per_step, per_agent_step, total, seconds, diff in rows:
+        print(f"{name:>20} | {per_step:8.0f} | {per_agent_step:12.1f} | {total / mib:10.1f} | "
+              f"{total / default_total:10.0%} | {seconds:8.2f} | {diff:9.1e}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark a small hyperparameter sweep run inside one process vs one Python process per configuration.
+
+Each configuration is a RunConfig (city, buffer size, batch size); a run builds a
+surrogate TrafficEnv and a PPOTrainer from it, collects one buffer of experience
+and performs one PPO update. In-process, all trainers are created side by side in
+the same interpreter; the baseline relaunches Python for every configuration,
+paying the interpreter and torch start-up each time.
+
+Usage:
+    python benchmarks/bench_config_sweep.py
+    python benchmarks/bench_config_sweep.py --buffer-sizes 256 512 --cities city2x2 city5x5
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.env.traffic_env import TrafficEnv
+from src.madrl.ppo_trainer import PPOTrainer
+
+
+def run(city, buffer_size, batch_size, seed=0):
+    """One configuration: collect buffer_size steps and run one PPO update."""
+    torch.manual_seed(seed)
+    config = RunConfig.for_city(city, buffer_size=buffer_size, batch_size=batch_size,
+                                max_steps_per_episode=buffer_size, ppo_epochs=2)
+    env = TrafficEnv(use_sumo=False, city=city, config=config)
+    trainer = PPOTrainer(config=config)
+    states = env.reset(seed=seed)
+    for _ in range(buffer_size):
+        actions, log_probs, values, cost_values = trainer.step_collect(states)
+        next_states, rewards, costs, done, _ = env.step(actions)
+        trainer.store(states, actions, log_probs, rewards, costs, values, cost_values, done)
+        states = next_states
+    metrics = trainer.train_step(states, done)
+    return {'num_agents': config.num_agents, 'buffer_shape': list(trainer.buffer.states.shape),
+            'policy_loss': metrics['policy_loss']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", nargs="+", default=["city2x2", "city4x4", "city5x5"])
+    parser.add_argument("--buffer-sizes", nargs="+", type=int, default=[128, 256])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        city, buffer_size, batch_size = args.child
+        print(json.dumps(run(city, int(buffer_size), int(batch_size))))
+        return
+
+    grid = list(itertools.product(args.cities, args.buffer_sizes))
+
+    t0 = time.perf_counter()
+    in_process = [run(city, size, args.batch_size) for city, size in grid]
+    in_process_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    relaunched = []
+    for city, size in grid:
+        out = subprocess.run([sys.executable, __file__, "--child", city, str(size), str(args.batch_size)],
+                             capture_output=True, text=True, check=True)
+        relaunched.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    relaunch_time = time.perf_counter() - t0
+
+    print("\n" + "=" * 80)
+    print(f"📊 HYPERPARAMETER SWEEP ({len(grid)} configurations, batch {args.batch_size}, surrogate env)")
+    print("=" * 80)
+    print(f"{'City':>10} | {'buffer':>6} | {'agents':>6} | {'buffer tensor':>16} | {'loss (in-proc)':>14} | {'loss (relaunch)':>15}")
+    print("-" * 80)
+    for (city, size), a, b in zip(grid, in_process, relaunched):
+        print(f"{city:>10} | {size:6d} | {a['num_agents']:6d} | {str(tuple(a['buffer_shape'])):>16} | "
+              f"{a['policy_loss']:14.4f} | {b['policy_loss']:15.4f}")
+    print("-" * 80)
+    print(f"One process:              {in_process_time:8.2f} s")
+    print(f"Process per config:       {relaunch_time:8.2f} s")
+    print(f"Speedup:                  {relaunch_time / in_process_time:8.2f}x")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
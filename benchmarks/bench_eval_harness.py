@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark the parallel checkpoint evaluation harness (madrl.evaluation).
+
+The (checkpoint x scenario x seed) sweep over the saved actors (and the
+fixed-time baseline) runs on the surrogate network, first with one worker and
+then with --workers processes, each into a fresh results log. The sweep is then
+extended by one seed and resumed: only the new seed's jobs run, the rest come
+from the log. The summary table (mean and 95% CI over the seeds) is printed.
+
+Usage:
+    python benchmarks/bench_eval_harness.py
+    python benchmarks/bench_eval_harness.py --workers 4 --seeds 0 1 2 3 --steps 720
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.madrl.evaluation import SCENARIOS, EvaluationHarness, format_table
+
+
+def sweep(harness):
+    """(seconds, jobs run) for running a harness's pending jobs."""
+    t0 = time.perf_counter()
+    ran = sum(1 for _ in harness.run())
+    return time.perf_counter() - t0, ran
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoints", nargs="+",
+                        default=sorted(glob.glob(os.path.join(REPO_ROOT, "models", "actor_ep*.pt")))[:3] + ["fixed_time"])
+    parser.add_argument("--city", default="city4x4")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0, 1, 2])
+    parser.add_argument("--steps", type=int, default=360, help="Steps per evaluation episode")
+    parser.add_argument("--workers", type=int, default=max(2, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    config = RunConfig(max_steps_per_episode=args.steps, device="cpu")
+    common = dict(cities=[args.city], scenarios=SCENARIOS, use_sumo=False, config=config)
+    with tempfile.TemporaryDirectory() as log_dir:
+        rows = []
+        for workers in (1, args.workers):
+            harness = EvaluationHarness(args.checkpoints, seeds=args.seeds, sweep=f"workers{workers}",
+                                        log_dir=log_dir, max_workers=workers, **common)
+            rows.append((f"fresh, {workers} workers", len(harness.jobs)) + sweep(harness))
+
+        extended = EvaluationHarness(args.checkpoints, seeds=args.seeds + [max(args.seeds) + 1],
+                                     sweep=f"workers{args.workers}", log_dir=log_dir,
+                                     max_workers=args.workers, **common)
+        rows.append((f"resumed (+1 seed), {args.workers} workers", len(extended.jobs)) + sweep(extended))
+        summary = format_table(extended.summary())
+
+    print("\n" + "=" * 100)
+    print(f"📊 PARALLEL CHECKPOINT EVALUATION ({args.city}, {len(args.checkpoints)} checkpoints x "
+          f"{len(SCENARIOS)} scenarios, {args.steps} steps, {os.cpu_count()} CPUs)")
+    print("=" * 100)
+    print(f"{'Sweep':>32} | {'jobs':>5} | {'run':>5} | {'time s':>7} | {'s/job run':>9}")
+    print("-" * 100)
+    for name, jobs, seconds, ran in rows:
+        print(f"{name:>32} | {jobs:5d} | {ran:5d} | {seconds:7.2f} | {seconds / max(1, ran):9.3f}")
+    print("-" * 100)
+    print(summary)
+    print("=" * 100 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the start-up cost of importing the package, as a fresh worker process sees it.
+
+Each module is imported in a new interpreter with `python -X importtime`, from an
+empty working directory, and the cumulative import time of the module is read
+from the importtime report (median of --repeats runs). Lines printed to stdout and
+directories created in the working directory are counted as import side effects.
+
+With --ref, the same measurements are taken on the `src` tree of another git
+revision (extracted with git archive) for a before/after comparison.
+
+Usage:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --ref HEAD~1 --repeats 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODULES = ['src', 'src.config', 'src.env.sumo_interface', 'src.env.route_cache', 'src.env.traffic_env']
+
+
+def measure(root, module, repeats):
+    """(median cumulative import time in ms, stdout lines, directories created)"""
+    times, lines, created = [], 0, 0
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as cwd:
+            env = dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE='1')
+            result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                    cwd=cwd, env=env, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+            created = len(os.listdir(cwd))
+        lines = len(result.stdout.splitlines())
+        for line in result.stderr.splitlines():
+            parts = [p.strip() for p in line.split('|')]
+            if len(parts) == 3 and parts[2] == module:
+                times.append(int(parts[1]) / 1000.0)
+    return statistics.median(times), lines, created
+
+
+def extract(ref, dest):
+    archive = subprocess.run(["git", "-C", REPO_ROOT, "archive", ref, "src"], capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", dest], input=archive.stdout, check=True)
+    return dest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ref", default=None, help="git revision to compare against (e.g. HEAD~1)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as before_root:
+        trees = [("current", REPO_ROOT)]
+        if args.ref:
+            trees.insert(0, (args.ref, extract(args.ref, before_root)))
+        results = {name: {m: measure(root, m, args.repeats) for m in args.modules} for name, root in trees}
+
+    print("\n" + "=" * 80)
+    print(f"📊 IMPORT START-UP COST (python -X importtime, median of {args.repeats} fresh interpreters)")
+    print("=" * 80)
+    print(f"{'Module':>24} | {'Tree':>10} | {'import (ms)':>11} | {'stdout lines':>12} | {'dirs created':>12}")
+    print("-" * 80)
+    for module in args.modules:
+        for name, _ in trees:
+            ms, lines, created = results[name][module]
+            print(f"{module:>24} | {name:>10} | {ms:11.1f} | {lines:12d} | {created:12d}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
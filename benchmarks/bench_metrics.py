@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-step cost of SUMOInterface metric collection across traffic levels.
+
+Compares the per-vehicle getter loop against subscription-based collection and
+reports wall time and TraCI calls per step for each scenario. Subscription results
+are decoded inside simulationStep, so the step time is reported alongside the metric
+time. With subscriptions the per-step cost should stay roughly flat as the vehicle
+count grows.
+
+Usage:
+    python benchmarks/bench_metrics.py --steps 1000
+    python benchmarks/bench_metrics.py --sumocfg low.sumocfg high.sumocfg
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.config import get_sumo_config_file
+from src.env.sumo_interface import SUMOInterface
+
+
+def run(sumo_cfg, use_subscriptions, steps, seed):
+    """Run `steps` simulation steps and time only the metric collection."""
+    sumo = SUMOInterface(sumo_cfg_path=sumo_cfg, use_subscriptions=use_subscriptions)
+    sumo.start(seed=seed)
+
+    elapsed = 0.0
+    step_elapsed = 0.0
+    calls = 0
+    vehicles = 0
+    try:
+        for _ in range(steps):
+            t0 = time.perf_counter()
+            sumo._traci.simulationStep()
+            step_elapsed += time.perf_counter() - t0
+            vehicles_before = sumo.total_vehicles
+            calls_before = sumo.traci_call_count
+            t0 = time.perf_counter()
+            sumo._update_metrics()
+            elapsed += time.perf_counter() - t0
+            calls += sumo.traci_call_count - calls_before
+            vehicles += sumo.total_vehicles - vehicles_before
+            if sumo.step_count >= 100:
+                sumo._initialize_metrics()
+    finally:
+        sumo.end()
+
+    return {
+        "ms_per_step": 1000.0 * elapsed / steps,
+        "sim_ms_per_step": 1000.0 * step_elapsed / steps,
+        "calls_per_step": calls / steps,
+        "avg_vehicles": vehicles / steps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--city", default="city4x4")
+    parser.add_argument("--scenarios", nargs="+", default=["low", "medium", "high"])
+    parser.add_argument("--sumocfg", nargs="+", help="Explicit .sumocfg files (overrides --city/--scenarios)")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.sumocfg:
+        configs = [(os.path.basename(path), path) for path in args.sumocfg]
+    else:
+        configs = [(scenario, get_sumo_config_file(scenario, args.city)) for scenario in args.scenarios]
+
+    rows = []
+    for name, cfg in configs:
+        for use_subscriptions in (False, True):
+            result = run(cfg, use_subscriptions, args.steps, args.seed)
+            rows.append((name, "subscription" if use_subscriptions else "per-vehicle", result))
+
+    print("\n" + "=" * 80)
+    print("📊 METRIC COLLECTION BENCHMARK")
+    print("=" * 80)
+    print(f"{'Scenario':>16} | {'Mode':>12} | {'Vehicles':>8} | {'metrics ms':>10} | {'step ms':>8} | {'calls/step':>10}")
+    print("-" * 80)
+    for name, mode, r in rows:
+        print(f"{name:>16} | {mode:>12} | {r['avg_vehicles']:8.1f} | {r['ms_per_step']:10.3f} | "
+              f"{r['sim_ms_per_step']:8.3f} | {r['calls_per_step']:10.1f}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
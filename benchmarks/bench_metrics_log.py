@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark saving episode metrics: rewriting metrics.json vs the append-only JSON Lines log.
+
+The legacy format keeps every episode in one JSON document (as logs/metrics.json),
+so saving after each episode rewrites the whole file and reading the latest point
+parses all of it. MetricsWriter appends each batch of records (with an fsync) and
+MetricsReader.last() reads only the end of the file.
+
+For --episodes episodes, each saved right after it ends, this reports the total
+save time, the save time of the last 100 episodes (which grows with the run for
+the legacy file), the bytes written and the time to read the latest point.
+
+Usage:
+    python benchmarks/bench_metrics_log.py --episodes 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.madrl.metrics_log import MetricsReader, MetricsWriter
+
+TAIL = 100
+
+
+def episodes(n, seed=0):
+    rng = random.Random(seed)
+    for i in range(1, n + 1):
+        yield {'episode': i, 'scenario': rng.choice(['low', 'medium', 'high']),
+               'reward': rng.uniform(80, 96), 'avg_cost': rng.uniform(0.09, 0.12), 'steps': 100}
+
+
+def legacy(path, n):
+    """Rewrite the whole metrics.json after each episode; (save times, bytes written)."""
+    doc = {'episodes': [], 'best_reward': float('-inf'), 'best_episode': 0}
+    times, written = [], 0
+    for record in episodes(n):
+        t0 = time.perf_counter()
+        doc['episodes'].append(record)
+        if record['reward'] > doc['best_reward']:
+            doc['best_reward'], doc['best_episode'] = record['reward'], record['episode']
+        with open(path, 'w') as f:
+            json.dump(doc, f, indent=4)
+        times.append(time.perf_counter() - t0)
+        written += os.path.getsize(path)
+    return times, written
+
+
+def appended(log_dir, n, flush_every):
+    """Log every episode to a MetricsWriter; (save times, bytes written)."""
+    times = []
+    with MetricsWriter('bench', log_dir, flush_every=flush_every) as writer:
+        for record in episodes(n):
+            t0 = time.perf_counter()
+            writer.log(record, kind='episode')
+            times.append(time.perf_counter() - t0)
+    return times, os.path.getsize(writer.path)
+
+
+def read_latest(fn, repeats=20):
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        latest = fn()
+    return (time.perf_counter() - t0) / repeats, latest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=3000)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'metrics.json')
+        times, written = legacy(path, args.episodes)
+
+        def load_latest():
+            with open(path) as f:
+                return json.load(f)['episodes'][-1]
+        read_s, latest = read_latest(load_latest)
+        rows.append(("metrics.json rewrite", times, written, read_s, latest['episode']))
+
+        for flush_every in (1, 32):
+            log_dir = os.path.join(tmp, f"jsonl{flush_every}")
+            times, written = appended(log_dir, args.episodes, flush_every)
+            reader = MetricsReader.for_run('bench', log_dir)
+            read_s, latest = read_latest(lambda: reader.last(1)[0])
+            rows.append((f"JSONL, flush every {flush_every}", times, written, read_s, latest['episode']))
+
+    mib = 1024 * 1024
+    print("\n" + "=" * 80)
+    print(f"📊 EPISODE METRICS LOG ({args.episodes} episodes, saved after every episode)")
+    print("=" * 80)
+    print(f"{'Format':>22} | {'total save s':>12} | {f'last {TAIL} ms/ep':>14} | {'written MiB':>11} | "
+          f"{'read latest ms':>14}")
+    print("-" * 80)
+    for name, times, written, read_s, latest in rows:
+        assert latest == args.episodes
+        tail_ms = sum(times[-TAIL:]) * 1000 / TAIL
+        print(f"{name:>22} | {sum(times):12.3f} | {tail_ms:14.3f} | {written / mib:11.2f} | {read_s * 1000:14.3f}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline pretraining and checkpoint triage from recorded controller logs.
+
+Fixed-time and actuated controllers (epsilon-greedy, so their logs carry usable
+behaviour probabilities) are recorded on the surrogate network. From the
+recordings, without running the simulator:
+
+  * streaming: one pass over all memory-mapped windows with 0 and --workers
+    DataLoader workers
+  * behaviour cloning: PPOTrainer.pretrain_actor on each controller's logs, and
+    PPOTrainer.fit_critic on the recorded returns
+  * offline evaluation: evaluate_checkpoint (importance-weighted) of a random
+    actor and the two cloned actors on the pooled logs, next to their mean reward
+    in on-policy surrogate rollouts and the time each estimate takes
+
+Usage:
+    python benchmarks/bench_offline.py
+    python benchmarks/bench_offline.py --city city5x5 --seeds 0 1 2 --steps 3600 --workers 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.env.traffic_env import TrafficEnv
+from src.agents.baselines import ActuatedController, FixedTimeController
+from src.madrl.ppo_trainer import PPOTrainer
+from src.madrl.offline import evaluate_checkpoint, record_controller, trajectory_loader
+from src.madrl.trajectory import find_trajectories
+
+
+def stream_pass(directories, steps, workers):
+    """(seconds, MiB) for one pass over every window."""
+    nbytes = 0
+    t0 = time.perf_counter()
+    for batch in trajectory_loader(directories, steps, num_workers=workers):
+        for t in batch.values():
+            # Touch every value so the mapped pages are actually read
+            t.float().sum()
+            nbytes += t.numel() * t.element_size()
+    return time.perf_counter() - t0, nbytes / (1024 * 1024)
+
+
+def on_policy_reward(actor, config, city, seeds, steps):
+    """Mean per-step reward of the actor's stochastic policy on the surrogate."""
+    total, t0 = 0.0, time.perf_counter()
+    for seed in seeds:
+        env = TrafficEnv(use_sumo=False, city=city, config=config)
+        states = env.reset(seed=1000 + seed)
+        torch.manual_seed(seed)
+        for _ in range(steps):
+            with torch.no_grad():
+                actions, _ = actor.sample_actions(states)
+            states, rewards, _, done, _ = env.step(actions)
+            total += rewards[0].item()
+            if done:
+                states = env.reset(seed=1000 + seed)
+    return total / (steps * len(seeds)), time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--city", default="city4x4")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0, 1])
+    parser.add_argument("--steps", type=int, default=1800, help="Recorded steps per (controller, seed)")
+    parser.add_argument("--window", type=int, default=256, help="Steps per streamed batch")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    config = RunConfig.for_city(args.city, max_steps_per_episode=args.steps, device="cpu")
+    controllers = [FixedTimeController(config, args.epsilon), ActuatedController(config, args.epsilon)]
+
+    with tempfile.TemporaryDirectory() as root:
+        t0 = time.perf_counter()
+        for controller in controllers:
+            for seed in args.seeds:
+                env = TrafficEnv(use_sumo=False, city=args.city, config=config)
+                record_controller(controller, env, args.steps, args.city, 'medium', seed, root=root)
+        record_s = time.perf_counter() - t0
+        everything = find_trajectories(root)
+
+        streams = [(workers,) + stream_pass(everything, args.window, workers) for workers in (0, args.workers)]
+
+        # Behaviour cloning and critic fitting, one trainer per controller
+        checkpoints, clone_rows = {}, []
+        torch.manual_seed(0)
+        checkpoints['random init'] = os.path.join(root, 'actor_random.pt')
+        torch.save(PPOTrainer(config=config).actor.state_dict(), checkpoints['random init'])
+        for controller in controllers:
+            trainer = PPOTrainer(config=config)
+            logs = find_trajectories(root, checkpoint=controller.name)
+            t0 = time.perf_counter()
+            for _ in range(args.epochs):
+                bc = trainer.pretrain_actor(trajectory_loader(logs, args.window))
+                critic = trainer.fit_critic(trajectory_loader(logs, args.window, gamma=config.gamma))
+            clone_rows.append((controller.name, bc, critic, time.perf_counter() - t0))
+            checkpoints[f"BC {controller.name}"] = path = os.path.join(root, f"actor_bc_{controller.name}.pt")
+            torch.save(trainer.actor.state_dict(), path)
+
+        eval_rows = []
+        for name, path in checkpoints.items():
+            t0 = time.perf_counter()
+            estimate = evaluate_checkpoint(path, everything, config, steps=args.window)
+            offline_s = time.perf_counter() - t0
+            actor = PPOTrainer(config=config).actor
+            actor.load_state_dict(torch.load(path))
+            truth, rollout_s = on_policy_reward(actor, config, args.city, args.seeds, args.steps)
+            eval_rows.append((name, estimate, offline_s, truth, rollout_s))
+
+    print("\n" + "=" * 80)
+    print(f"📊 OFFLINE PRETRAINING AND EVALUATION ({args.city}, {len(everything)} recordings x {args.steps} steps, "
+          f"epsilon={args.epsilon})")
+    print("=" * 80)
+    print(f"Recording the controllers: {record_s:.2f} s")
+    for workers, seconds, mib in streams:
+        print(f"Stream one pass, {workers} workers: {seconds:6.2f} s ({mib / seconds:7.1f} MiB/s)")
+    print("-" * 80)
+    print(f"{'Cloned from':>12} | {'BC loss':>8} | {'BC accuracy':>11} | {'critic loss':>11} | {'critic EV':>9} | {'time s':>6}")
+    for name, bc, critic, seconds in clone_rows:
+        print(f"{name:>12} | {bc['bc_loss']:8.4f} | {bc['bc_accuracy']:11.1%} | {critic['critic_loss']:11.4f} | "
+              f"{critic['explained_variance']:9.3f} | {seconds:6.2f}")
+    print("-" * 80)
+    print(f"{'Checkpoint':>20} | {'IW reward':>9} | {'ESS':>8} | {'offline s':>9} | {'rollout reward':>14} | {'rollout s':>9}")
+    for name, estimate, offline_s, truth, rollout_s in eval_rows:
+        print(f"{name:>20} | {estimate['reward']:9.4f} | {estimate['ess']:8.1f} | {offline_s:9.2f} | "
+              f"{truth:14.4f} | {rollout_s:9.2f}")
+    print(f"Behaviour data mean reward: {eval_rows[0][1]['behaviour_reward']:.4f} "
+          f"({eval_rows[0][1]['samples']} weighted steps)")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark PPO minibatch updates/sec on a full rollout buffer.
+
+Compares the former two-backward update (policy_loss.backward(retain_graph=True)
+followed by critic_loss.backward()) with the fused single-backward update, the
+shared-trunk actor-critic and, optionally, the torch.compile'd loss.
+
+Usage:
+    python benchmarks/bench_ppo_update.py --updates 200
+    python benchmarks/bench_ppo_update.py --compile
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.config import BUFFER_SIZE, BATCH_SIZE, CLIP_EPSILON, DEVICE, MAX_GRAD_NORM, NUM_AGENTS, STATE_DIM
+from src.madrl.ppo_trainer import PPOTrainer
+
+
+def fill_buffer(trainer):
+    for _ in range(BUFFER_SIZE):
+        states = torch.randn(NUM_AGENTS, STATE_DIM, device=DEVICE)
+        actions, log_probs, values, cost_values = trainer.step_collect(states)
+        rewards = torch.randn(NUM_AGENTS, 1, device=DEVICE)
+        costs = torch.rand(NUM_AGENTS, 1, device=DEVICE)
+        trainer.buffer.store(states, actions, log_probs, rewards, costs, values, cost_values, False)
+    with torch.no_grad():
+        next_v, next_cv = trainer.critic(torch.randn(NUM_AGENTS, STATE_DIM, device=DEVICE))
+    trainer.buffer.compute_advantages_and_returns(next_v, next_cv)
+
+
+def legacy_update(trainer, batch, current_lambda):
+    """The two-backward minibatch update used before the fused update."""
+    states, actions, old_log_probs, advantages, returns, cost_advantages, cost_returns = batch
+    advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
+    cost_advantages = (cost_advantages - cost_advantages.mean()) / (cost_advantages.std() + 1e-8)
+
+    new_log_probs = trainer.actor.get_log_prob(states, actions.squeeze(-1)).unsqueeze(-1)
+    ratio = torch.exp(new_log_probs - old_log_probs)
+    surr1 = ratio * advantages
+    surr2 = torch.clamp(ratio, 1.0 - CLIP_EPSILON, 1.0 + CLIP_EPSILON) * advantages
+    policy_loss = -(torch.min(surr1, surr2) - current_lambda * cost_advantages).mean()
+
+    values, cost_values = trainer.critic(states)
+    critic_loss = F.mse_loss(values, returns) + F.mse_loss(cost_values, cost_returns)
+
+    trainer.actor_optimizer.zero_grad()
+    policy_loss.backward(retain_graph=True)
+    nn.utils.clip_grad_norm_(trainer.actor.parameters(), MAX_GRAD_NORM)
+    trainer.actor_optimizer.step()
+
+    trainer.critic_optimizer.zero_grad()
+    critic_loss.backward()
+    nn.utils.clip_grad_norm_(trainer.critic.parameters(), MAX_GRAD_NORM)
+    trainer.critic_optimizer.step()
+
+
+def bench(trainer, update_fn, num_updates):
+    """Minibatch updates per second, cycling over buffer epochs until num_updates are done."""
+    done = 0
+    warmup = 5
+    t0 = None
+    while done < num_updates + warmup:
+        for batch in trainer.buffer.get(BATCH_SIZE):
+            if done == warmup:
+                t0 = time.perf_counter()
+            update_fn(batch)
+            done += 1
+            if done >= num_updates + warmup:
+                break
+    return num_updates / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--compile", action="store_true", help="Also benchmark the torch.compile'd loss")
+    args = parser.parse_args()
+
+    variants = [("legacy two-backward", {}, "legacy"), ("fused", {}, "fused"),
+                ("fused shared-trunk", {"shared_trunk": True}, "fused")]
+    if args.compile:
+        variants.append(("fused + torch.compile", {"compile_update": True}, "fused"))
+
+    rows = []
+    for name, kwargs, mode in variants:
+        torch.manual_seed(0)
+        trainer = PPOTrainer(**kwargs)
+        fill_buffer(trainer)
+        lagrange = trainer.lagrange_multiplier.detach()
+        if mode == "legacy":
+            update_fn = lambda batch: legacy_update(trainer, batch, lagrange.item())
+        else:
+            update_fn = lambda batch: trainer._update_minibatch(batch, lagrange)
+        rows.append((name, bench(trainer, update_fn, args.updates)))
+
+    baseline = rows[0][1]
+    print("\n" + "=" * 80)
+    print(f"📊 PPO UPDATE THROUGHPUT (device={DEVICE}, batch={BATCH_SIZE})")
+    print("=" * 80)
+    print(f"{'Variant':>24} | {'updates/sec':>12} | {'speedup':>8}")
+    print("-" * 80)
+    for name, rate in rows:
+        print(f"{name:>24} | {rate:12.1f} | {rate / baseline:8.2f}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
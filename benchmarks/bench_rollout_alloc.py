@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-step allocations of the rollout path (TrafficEnv.step + ExperienceBuffer.store).
+
+Each environment is stepped with fixed actions and every transition is stored
+in an ExperienceBuffer, with and without TrafficEnv(staging=True). Per step this
+reports:
+
+  * tracemalloc: Python/NumPy bytes allocated during the step (the transient
+    peak above the memory held before the step) and still held after it
+  * torch allocations: tensor storage allocations made by torch, counted with
+    torch.profiler (profile_memory=True); tracemalloc does not see these
+  * step time without any tracing
+
+Usage:
+    python benchmarks/bench_rollout_alloc.py --steps 500
+    python benchmarks/bench_rollout_alloc.py --envs surrogate fake --city city5x5
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import torch
+from torch.profiler import ProfilerActivity, profile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.env.traffic_env import TrafficEnv
+from src.madrl.buffer import ExperienceBuffer
+
+
+def make_env(kind, city, staging):
+    config = RunConfig(device="cpu")
+    if kind == "surrogate":
+        return TrafficEnv(use_sumo=False, city=city, config=config, staging=staging)
+    return TrafficEnv(use_sumo=True, city="city4x4", backend=kind, config=config, staging=staging)
+
+
+class Rollout:
+    """One environment and a buffer; step() advances and stores one transition."""
+
+    def __init__(self, kind, city, staging, steps):
+        self.env = make_env(kind, city, staging)
+        self.states = self.env.reset(seed=0)
+        config = self.env.config.override(buffer_size=steps)
+        self.buffer = ExperienceBuffer(config.num_agents, config=config)
+        n = config.num_agents
+        # Policy outputs are fixed so only the environment and buffer are measured
+        self.actions = torch.zeros(n, dtype=torch.long)
+        self.zeros = torch.zeros(n, 1)
+
+    def step(self):
+        next_states, rewards, costs, done, _ = self.env.step(self.actions)
+        self.buffer.store(self.states, self.actions, self.zeros, rewards, costs,
+                          self.zeros, self.zeros, done)
+        self.states = next_states
+        if self.buffer.ptr == self.buffer.buffer_size:
+            self.buffer.clear()
+
+    def close(self):
+        self.env.close()
+
+
+def measure(kind, city, staging, steps):
+    rollout = Rollout(kind, city, staging, steps)
+    try:
+        for _ in range(20):
+            rollout.step()
+
+        t0 = time.perf_counter()
+        for _ in range(steps):
+            rollout.step()
+        step_ms = (time.perf_counter() - t0) * 1000 / steps
+
+        with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+            for _ in range(steps):
+                rollout.step()
+        torch_allocs = sum(1 for e in prof.events() if e.self_cpu_memory_usage > 0) / steps
+
+        tracemalloc.start()
+        transient = held = 0
+        for _ in range(steps):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            rollout.step()
+            current, peak = tracemalloc.get_traced_memory()
+            transient += peak - before
+            held += current - before
+        tracemalloc.stop()
+        return step_ms, torch_allocs, transient / steps, held / steps
+    finally:
+        rollout.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--envs", nargs="+", default=["surrogate", "fake"],
+                        help="'surrogate' or a SUMO backend ('fake', 'traci', 'libsumo')")
+    parser.add_argument("--city", default="city5x5", help="Surrogate network")
+    parser.add_argument("--steps", type=int, default=500)
+    args = parser.parse_args()
+
+    rows = []
+    for kind in args.envs:
+        for staging in (False, True):
+            rows.append((kind, staging) + measure(kind, args.city, staging, args.steps))
+
+    print("\n" + "=" * 80)
+    print(f"📊 ROLLOUT ALLOCATIONS PER STEP (env.step + buffer.store, {args.steps} steps)")
+    print("=" * 80)
+    print(f"{'Env':>10} | {'staging':>7} | {'step (ms)':>9} | {'torch allocs':>12} | "
+          f"{'py transient B':>14} | {'py held B':>9}")
+    print("-" * 80)
+    for kind, staging, step_ms, torch_allocs, transient, held in rows:
+        print(f"{kind:>10} | {str(staging):>7} | {step_ms:9.3f} | {torch_allocs:12.1f} | "
+              f"{transient:14.0f} | {held:9.1f}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark how long the trainer waits for route files per episode.
+
+Three ways of getting a fresh randomTrips demand for every episode:
+  on demand  - generate the route file synchronously at reset (no cache)
+  prefetch   - RouteCache.prefetch generates --ahead episodes in the background
+               while the current episode runs (first pass, cold cache)
+  cached     - the same seeds again, served from the compressed on-disk cache
+
+An episode is emulated by sleeping --episode-time seconds; with --use-sumo a real
+SUMO episode of --steps steps is run on each route file instead.
+
+Needs randomTrips.py (SUMO_HOME or the eclipse-sumo package).
+
+Usage:
+    python benchmarks/bench_route_cache.py --episodes 6 --episode-time 3
+    python benchmarks/bench_route_cache.py --use-sumo --steps 600 --scenario high
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.config import NUM_AGENTS, get_sumo_config_file
+from src.env.topology import get_net_file
+from src.env.route_cache import RouteCache, generate_route_file, SCENARIO_PERIODS
+
+
+def make_episode(args):
+    if not args.use_sumo:
+        return lambda route_file: time.sleep(args.episode_time)
+
+    from src.env.traffic_env import TrafficEnv
+    env = TrafficEnv(use_sumo=True, scenario=args.scenario, backend='traci')
+
+    def run(route_file):
+        env.sumo.update_route_file(route_file)
+        env.reset(seed=0, scenario=args.scenario)
+        for _ in range(args.steps):
+            env.step(torch.zeros(NUM_AGENTS, dtype=torch.long))
+        env.close()
+    return run
+
+
+def bench_on_demand(args, cache_dir, episode):
+    cache = RouteCache(cache_dir)
+    net_file = get_net_file(get_sumo_config_file(args.scenario, args.city))
+    waits = []
+    for seed in range(args.episodes):
+        t0 = time.perf_counter()
+        path = cache.path(args.city, args.scenario, seed)
+        generate_route_file(net_file, path, SCENARIO_PERIODS[args.scenario], seed)
+        waits.append(time.perf_counter() - t0)
+        episode(path)
+    return waits
+
+
+def bench_prefetch(args, cache, episode):
+    prefetcher = cache.prefetch(args.city, args.scenario, range(100, 100 + args.episodes), ahead=args.ahead)
+    waits, paths = [], []
+    t0 = time.perf_counter()
+    for path in prefetcher:
+        waits.append(time.perf_counter() - t0)
+        paths.append(path)
+        episode(path)
+        t0 = time.perf_counter()
+    return waits, paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=6)
+    parser.add_argument("--episode-time", type=float, default=3.0)
+    parser.add_argument("--ahead", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--city", default="city4x4")
+    parser.add_argument("--scenario", default="medium", choices=list(SCENARIO_PERIODS))
+    parser.add_argument("--use-sumo", action="store_true")
+    parser.add_argument("--steps", type=int, default=600)
+    args = parser.parse_args()
+
+    episode = make_episode(args)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        on_demand = bench_on_demand(args, os.path.join(cache_dir, "on_demand"), episode)
+        cache = RouteCache(os.path.join(cache_dir, "cache"), max_workers=args.workers)
+        try:
+            prefetch, paths = bench_prefetch(args, cache, episode)
+            cached, _ = bench_prefetch(args, cache, episode)
+        finally:
+            cache.close()
+        stats = cache.get_stats()
+        compressed = sum(os.path.getsize(p) for p in paths)
+        raw = 0
+        for p in paths:
+            with gzip.open(p, 'rb') as f:
+                raw += len(f.read())
+
+    rows = [("on demand", on_demand), ("prefetch (cold)", prefetch), ("cached", cached)]
+    base = sum(on_demand)
+    print("\n" + "=" * 80)
+    print(f"📊 ROUTE FILE WAIT PER EPISODE ({args.city}/{args.scenario}, {args.episodes} episodes, "
+          f"{'SUMO ' + str(args.steps) + ' steps' if args.use_sumo else f'{args.episode_time:g}s'} per episode, "
+          f"{args.ahead} ahead)")
+    print("=" * 80)
+    print(f"{'Mode':>16} | {'first wait (s)':>14} | {'mean wait (s)':>13} | {'total wait (s)':>14} | {'saved':>6}")
+    print("-" * 80)
+    for name, waits in rows:
+        total = sum(waits)
+        print(f"{name:>16} | {waits[0]:14.3f} | {total / len(waits):13.3f} | {total:14.3f} | "
+              f"{1 - total / base:6.0%}")
+    print("-" * 80)
+    print(f"Cache: {stats['misses']} generated, {stats['hits']} hits")
+    print(f"Compression: {raw / 1024:.0f} KiB -> {compressed / 1024:.0f} KiB ({raw / max(compressed, 1):.1f}x)")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark TrafficEnv.reset latency with and without the warm-start snapshot cache.
+
+Cold resets relaunch SUMO and simulate the warm-up from t=0 every episode; warm
+resets load a cached snapshot of the warmed-up state into the running process.
+Seeds cycle through --seeds distinct values, so the first round of each seed is a
+cache miss and later rounds are hits.
+
+Without --use-sumo the FakeTraCI backend is used (with emulated launch and step
+costs), which needs no SUMO installation.
+
+Usage:
+    python benchmarks/bench_snapshot_reset.py --resets 20 --seeds 4
+    python benchmarks/bench_snapshot_reset.py --use-sumo --scenario medium --warmup 300
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.config import NUM_AGENTS
+from src.env.traffic_env import TrafficEnv
+from src.env.snapshot_cache import SnapshotCache
+from src.env.fake_traci import FakeTraCI
+
+
+def make_api(use_sumo):
+    return None if use_sumo else FakeTraCI(grid_size=4, start_delay=0.5, step_delay=0.002)
+
+
+def bench_cold(args):
+    """Relaunch + warm-up from t=0 on every reset."""
+    api = make_api(args.use_sumo)
+    env = TrafficEnv(use_sumo=True, scenario=args.scenario, api=api)
+    latencies = []
+    try:
+        for i in range(args.resets):
+            t0 = time.perf_counter()
+            env.reset(seed=i % args.seeds, scenario=args.scenario)
+            for _ in range(args.warmup):
+                env.sumo.step()
+            latencies.append(time.perf_counter() - t0)
+            env.step(torch.zeros(NUM_AGENTS, dtype=torch.long))
+    finally:
+        env.close()
+    return latencies, api
+
+
+def bench_warm(args, cache_dir):
+    api = make_api(args.use_sumo)
+    cache = SnapshotCache(cache_dir, warmup_steps=args.warmup)
+    env = TrafficEnv(use_sumo=True, scenario=args.scenario, snapshot_cache=cache, api=api)
+    latencies = []
+    try:
+        for i in range(args.resets):
+            t0 = time.perf_counter()
+            env.reset(seed=i % args.seeds, scenario=args.scenario)
+            latencies.append(time.perf_counter() - t0)
+            env.step(torch.zeros(NUM_AGENTS, dtype=torch.long))
+    finally:
+        env.close()
+    return latencies, cache, api
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resets", type=int, default=20)
+    parser.add_argument("--seeds", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=300)
+    parser.add_argument("--scenario", default="medium")
+    parser.add_argument("--use-sumo", action="store_true")
+    args = parser.parse_args()
+
+    cold, _ = bench_cold(args)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        warm, cache, api = bench_warm(args, cache_dir)
+    stats = cache.get_stats()
+
+    mean_cold = sum(cold) / len(cold)
+    mean_warm = sum(warm) / len(warm)
+    print("\n" + "=" * 80)
+    print(f"📊 RESET LATENCY ({'SUMO' if args.use_sumo else 'FakeTraCI'}, {args.resets} resets, "
+          f"{args.seeds} seeds, warm-up {args.warmup} steps)")
+    print("=" * 80)
+    print(f"{'Mode':>26} | {'mean reset (s)':>15} | {'speedup':>8}")
+    print("-" * 80)
+    print(f"{'cold (relaunch + warm-up)':>26} | {mean_cold:15.3f} | {1.0:8.2f}")
+    print(f"{'snapshot cache (overall)':>26} | {mean_warm:15.3f} | {mean_cold / mean_warm:8.2f}")
+    print(f"{'snapshot cache (misses)':>26} | {stats['miss_reset_latency']:15.3f} |")
+    print(f"{'snapshot cache (hits)':>26} | {stats['hit_reset_latency']:15.3f} | "
+          f"{mean_cold / max(stats['hit_reset_latency'], 1e-9):8.2f}")
+    print("-" * 80)
+    print(f"Hit rate: {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['misses']} misses)")
+    if api is not None:
+        print(f"FakeTraCI: {api.starts} process starts, {api.loads} reloads, "
+              f"{api.state_saves} snapshots saved, {api.state_loads} loaded")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
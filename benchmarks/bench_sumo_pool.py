@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark SUMO episode start-up with and without the persistent process pool.
+
+Without the pool every episode launches a new SUMO binary and kills it at the end;
+with SUMOProcessPool the process is kept and the next episode is loaded into it
+with traci.load. Episodes alternate between the given scenarios, so the pooled
+run also exercises switching configurations in place.
+
+Usage:
+    python benchmarks/bench_sumo_pool.py --episodes 10 --steps 100
+    python benchmarks/bench_sumo_pool.py --scenarios medium high --episodes 6
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.config import get_sumo_config_file
+from src.env.sumo_interface import SUMOInterface
+from src.env.sumo_pool import SUMOProcessPool
+
+
+def run_episodes(args, pool=None):
+    interfaces = {scenario: SUMOInterface(get_sumo_config_file(scenario), scenario=scenario, pool=pool)
+                  for scenario in args.scenarios}
+    start_times = []
+    t_total = time.perf_counter()
+    for episode in range(args.episodes):
+        sumo = interfaces[args.scenarios[episode % len(args.scenarios)]]
+        t0 = time.perf_counter()
+        sumo.start(seed=episode)
+        start_times.append(time.perf_counter() - t0)
+        for _ in range(args.steps):
+            sumo.step()
+        sumo.end()
+    return sum(start_times) / len(start_times), time.perf_counter() - t_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--scenarios", nargs="+", default=["medium"])
+    args = parser.parse_args()
+
+    fresh_start, fresh_total = run_episodes(args)
+    pool = SUMOProcessPool()
+    try:
+        pooled_start, pooled_total = run_episodes(args, pool)
+        stats = pool.get_stats()
+    finally:
+        pool.close()
+
+    print("\n" + "=" * 80)
+    print(f"📊 SUMO EPISODE START-UP ({args.episodes} episodes x {args.steps} steps, "
+          f"scenarios: {', '.join(args.scenarios)})")
+    print("=" * 80)
+    print(f"{'Mode':>22} | {'mean start (s)':>15} | {'total (s)':>10} | {'speedup':>8}")
+    print("-" * 80)
+    print(f"{'launch per episode':>22} | {fresh_start:15.3f} | {fresh_total:10.2f} | {1.0:8.2f}")
+    print(f"{'process pool':>22} | {pooled_start:15.3f} | {pooled_total:10.2f} | {fresh_total / pooled_total:8.2f}")
+    print("-" * 80)
+    print(f"Pool: {stats['launches']} launches, {stats['reloads']} reloads, {stats['restarts']} restarts")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark the NumPy surrogate simulator against SUMO.
+
+Steps SurrogateTrafficSim with random actions for each (grid, K parallel envs)
+combination and reports intersection-steps/sec. With --use-sumo, a single SUMO
+TrafficEnv on the same scenario is measured as the reference.
+
+Usage:
+    python benchmarks/bench_surrogate.py --cities city4x4 city5x5 --envs 1 16 64
+    python benchmarks/bench_surrogate.py --cities city30x30 --envs 64 --steps 100
+    python benchmarks/bench_surrogate.py --use-sumo --scenario medium
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.config import NUM_AGENTS, ACTION_DIM
+from src.env.surrogate import SurrogateTrafficSim
+
+
+def bench_surrogate(city, num_envs, steps, scenario, seed):
+    sim = SurrogateTrafficSim(num_envs, city=city, scenario=scenario, seed=seed)
+    rng = np.random.default_rng(seed)
+    actions = rng.integers(ACTION_DIM, size=(steps, num_envs, sim.num_intersections))
+    t0 = time.perf_counter()
+    for t in range(steps):
+        _, _, _, done = sim.step(actions[t])
+        if done:
+            sim.reset()
+    elapsed = time.perf_counter() - t0
+    return sim.num_intersections, num_envs * steps / elapsed
+
+
+def bench_sumo(steps, scenario, seed):
+    from src.env.traffic_env import TrafficEnv
+
+    env = TrafficEnv(use_sumo=True, scenario=scenario)
+    env.reset(seed=seed, scenario=scenario)
+    try:
+        t0 = time.perf_counter()
+        for _ in range(steps):
+            _, _, _, done, _ = env.step(torch.randint(ACTION_DIM, (NUM_AGENTS,)))
+            if done:
+                env.reset(seed=seed, scenario=scenario)
+        elapsed = time.perf_counter() - t0
+    finally:
+        env.close()
+    return len(env.sumo.tls_ids) or NUM_AGENTS, steps / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", nargs="+", default=["city2x2", "city4x4", "city5x5"])
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--scenario", default="medium")
+    parser.add_argument("--use-sumo", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = []
+    if args.use_sumo:
+        num_tls, rate = bench_sumo(args.steps, args.scenario, args.seed)
+        rows.append(("SUMO city4x4", 1, num_tls, rate))
+    for city in args.cities:
+        for num_envs in args.envs:
+            num_tls, rate = bench_surrogate(city, num_envs, args.steps, args.scenario, args.seed)
+            rows.append((f"surrogate {city}", num_envs, num_tls, rate))
+
+    baseline = rows[0][3] * rows[0][2]
+    print("\n" + "=" * 80)
+    print(f"📊 SURROGATE SIMULATOR THROUGHPUT ({args.scenario} scenario, {args.steps} steps)")
+    print("=" * 80)
+    print(f"{'Simulator':>22} | {'envs':>5} | {'env-steps/sec':>14} | {'isect-steps/sec':>16} | {'vs first':>8}")
+    print("-" * 80)
+    for name, num_envs, num_tls, rate in rows:
+        print(f"{name:>22} | {num_envs:5d} | {rate:14.1f} | {rate * num_tls:16.1f} | {rate * num_tls / baseline:8.1f}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
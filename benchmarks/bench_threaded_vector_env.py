@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark the thread-pooled ThreadedVectorTrafficEnv against the process-based
+VectorTrafficEnv (env-steps/sec for each number of environments K).
+
+Both run K SUMO processes; they differ in where the TrafficEnv wrappers live: K
+worker processes exchanging data through pipes and shared memory, or K threads in
+the main process whose TraCI socket waits release the GIL. Pass --surrogate to run
+the NumPy surrogate instead of SUMO (pure Python work, so threads cannot overlap it).
+
+Usage:
+    python benchmarks/bench_threaded_vector_env.py --envs 1 2 4 --steps 300
+    python benchmarks/bench_threaded_vector_env.py --surrogate --envs 1 4 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.config import NUM_AGENTS, ACTION_DIM
+from src.env.vector_env import VectorTrafficEnv
+from src.env.threaded_vector_env import ThreadedVectorTrafficEnv
+
+
+def bench(env_cls, num_envs, steps, use_sumo, scenario, seed):
+    venv = env_cls(num_envs, use_sumo=use_sumo, scenario=scenario)
+    try:
+        venv.reset(seed=seed)
+        t0 = time.perf_counter()
+        for _ in range(steps):
+            venv.step(torch.randint(ACTION_DIM, (num_envs, NUM_AGENTS)))
+        elapsed = time.perf_counter() - t0
+    finally:
+        venv.close()
+    return num_envs * steps / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--surrogate", action="store_true")
+    parser.add_argument("--scenario", default="medium")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    use_sumo = not args.surrogate
+
+    rows = []
+    for num_envs in args.envs:
+        processes = bench(VectorTrafficEnv, num_envs, args.steps, use_sumo, args.scenario, args.seed)
+        threads = bench(ThreadedVectorTrafficEnv, num_envs, args.steps, use_sumo, args.scenario, args.seed)
+        rows.append((num_envs, processes, threads))
+
+    print("\n" + "=" * 80)
+    print(f"📊 THREADS vs PROCESSES ({'SUMO' if use_sumo else 'surrogate'} mode, {args.steps} steps, "
+          f"{os.cpu_count()} CPUs)")
+    print("=" * 80)
+    print(f"{'Envs (K)':>10} | {'processes (steps/s)':>20} | {'threads (steps/s)':>18} | {'threads/proc':>12}")
+    print("-" * 80)
+    for num_envs, processes, threads in rows:
+        print(f"{num_envs:>10} | {processes:20.1f} | {threads:18.1f} | {threads / processes:12.2f}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
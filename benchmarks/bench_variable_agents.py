@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark rollout buffer memory when it is sized from the detected agent count.
+
+For every network the buffer is sized from the environment's detected traffic
+light count (TrafficEnv.num_agents) and compared with a buffer sized for the
+worst case (25 agents, city5x5). For a batch of environments on different
+networks, the padded/masked buffer (padded to the largest network present) is
+compared as well, and the masked C-PPO losses on the padded minibatch are
+checked against the unmasked losses on the same rows without padding.
+
+Usage:
+    python benchmarks/bench_variable_agents.py --buffer-size 2048
+    python benchmarks/bench_variable_agents.py --use-sumo
+"""
+
+import argparse
+import os
+import sys
+
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.env.traffic_env import TrafficEnv
+from src.env.padding import pad_agents
+from src.madrl.buffer import ExperienceBuffer
+from src.madrl.ppo_trainer import PPOTrainer
+
+WORST_CASE_AGENTS = 25
+CITIES = ["city2x2", "city3x3", "city4x4", "city5x5"]
+
+
+def buffer_bytes(buffer):
+    return sum(t.numel() * t.element_size() for t in vars(buffer).values()
+               if isinstance(t, torch.Tensor) and t.dim() == 3)
+
+
+def loss_check(config, counts, steps=32):
+    """Max |masked loss on padded rows - loss on the same rows unpadded| over one minibatch."""
+    torch.manual_seed(0)
+    width = max(counts)
+    trainer = PPOTrainer(config=config.override(num_agents=len(counts) * width, buffer_size=steps), masked=True)
+    per_env = [torch.randn(steps, n, config.state_dim) for n in counts]
+    for t in range(steps):
+        states, mask = pad_agents([s[t] for s in per_env], width)
+        actions, log_probs, values, cost_values = trainer.step_collect(states)
+        rewards = torch.randn(len(counts), width, 1)
+        trainer.store(states, actions, log_probs, rewards, rewards.abs(), values, cost_values,
+                      torch.zeros(len(counts), dtype=torch.bool), agent_mask=mask)
+    trainer.buffer.compute_advantages_and_returns(torch.zeros(len(counts), width, 1),
+                                                  torch.zeros(len(counts), width, 1))
+    packed = trainer.buffer._pack().reshape(-1, trainer.buffer.packed_width)
+    batch = trainer.buffer._unpack(packed)
+    real = batch[7].squeeze(-1) > 0
+    lagrange = trainer.lagrange_multiplier.detach()
+    with torch.no_grad():
+        masked = trainer._compute_losses(*batch[:7], lagrange, batch[7])
+        compact = trainer._compute_losses(*[b[real] for b in batch[:7]], lagrange)
+    return max(abs(a.item() - b.item()) for a, b in zip(masked[:4], compact[:4]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buffer-size", type=int, default=2048)
+    parser.add_argument("--mixed", nargs="+", default=["city2x2", "city3x3", "city4x4"])
+    parser.add_argument("--use-sumo", action="store_true", help="Also size a buffer for the SUMO city4x4 network")
+    args = parser.parse_args()
+
+    config = RunConfig(buffer_size=args.buffer_size, device="cpu")
+    worst = buffer_bytes(ExperienceBuffer(WORST_CASE_AGENTS, config=config))
+
+    rows = []
+    for city in CITIES:
+        env = TrafficEnv(use_sumo=False, city=city, config=config)
+        rows.append((f"{city} (surrogate)", env.num_agents, buffer_bytes(ExperienceBuffer(env.num_agents, config=env.config))))
+    if args.use_sumo:
+        env = TrafficEnv(use_sumo=True, city="city4x4", config=config)
+        rows.append(("city4x4 (SUMO)", env.num_agents, buffer_bytes(ExperienceBuffer(env.num_agents, config=env.config))))
+
+    counts = [TrafficEnv(use_sumo=False, city=city, config=config).num_agents for city in args.mixed]
+    mixed_padded = buffer_bytes(ExperienceBuffer(len(counts) * max(counts), config=config, masked=True))
+    mixed_worst = len(counts) * worst
+    max_diff = loss_check(config, counts)
+
+    mib = 1024 * 1024
+    print("\n" + "=" * 80)
+    print(f"📊 BUFFER MEMORY BY DETECTED AGENT COUNT (buffer_size={args.buffer_size}, "
+          f"worst case {WORST_CASE_AGENTS} agents = {worst / mib:.1f} MiB)")
+    print("=" * 80)
+    print(f"{'Network':>24} | {'agents':>6} | {'buffer (MiB)':>12} | {'vs worst case':>13}")
+    print("-" * 80)
+    for name, agents, nbytes in rows:
+        print(f"{name:>24} | {agents:6d} | {nbytes / mib:12.1f} | {nbytes / worst:13.0%}")
+    print("-" * 80)
+    print(f"Mixed batch {'+'.join(args.mixed)} (agents {counts}):")
+    print(f"  padded to {max(counts)} agents + mask: {mixed_padded / mib:8.1f} MiB "
+          f"({mixed_padded / mixed_worst:.0%} of {len(counts)} x worst case = {mixed_worst / mib:.1f} MiB)")
+    print(f"  masked vs unpadded losses, max |diff|: {max_diff:.2e}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
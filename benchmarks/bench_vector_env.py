@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark VectorTrafficEnv throughput (env-steps/sec) against the number of workers K.
+
+Runs random actions through a single in-process TrafficEnv and through
+VectorTrafficEnv for each K. Surrogate mode (the default) runs the NumPy queueing
+model, needs no SUMO installation and mostly measures the multiprocessing overhead;
+pass --use-sumo to measure real simulation.
+
+Usage:
+    python benchmarks/bench_vector_env.py --envs 1 2 4 8 --steps 500
+    python benchmarks/bench_vector_env.py --use-sumo --scenario medium
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.config import NUM_AGENTS, ACTION_DIM
+from src.env.traffic_env import TrafficEnv
+from src.env.vector_env import VectorTrafficEnv
+
+
+def bench_single(steps, use_sumo, scenario, seed):
+    env = TrafficEnv(use_sumo=use_sumo, scenario=scenario)
+    env.reset(seed=seed, scenario=scenario)
+    try:
+        t0 = time.perf_counter()
+        for _ in range(steps):
+            actions = torch.randint(ACTION_DIM, (NUM_AGENTS,))
+            _, _, _, done, _ = env.step(actions)
+            if done:
+                env.reset(seed=seed, scenario=scenario)
+        elapsed = time.perf_counter() - t0
+    finally:
+        env.close()
+    return steps / elapsed
+
+
+def bench_vector(num_envs, steps, use_sumo, scenario, seed):
+    venv = VectorTrafficEnv(num_envs, use_sumo=use_sumo, scenario=scenario)
+    try:
+        venv.reset(seed=seed)
+        t0 = time.perf_counter()
+        for _ in range(steps):
+            actions = torch.randint(ACTION_DIM, (num_envs, NUM_AGENTS))
+            venv.step(actions)
+        elapsed = time.perf_counter() - t0
+    finally:
+        venv.close()
+    return num_envs * steps / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--use-sumo", action="store_true")
+    parser.add_argument("--scenario", default="medium")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    baseline = bench_single(args.steps, args.use_sumo, args.scenario, args.seed)
+    rows = [(num_envs, bench_vector(num_envs, args.steps, args.use_sumo, args.scenario, args.seed))
+            for num_envs in args.envs]
+
+    print("\n" + "=" * 80)
+    print(f"📊 VECTOR ENV THROUGHPUT ({'SUMO' if args.use_sumo else 'surrogate'} mode, {args.steps} steps)")
+    print("=" * 80)
+    print(f"{'Envs (K)':>10} | {'env-steps/sec':>14} | {'speedup':>8}")
+    print("-" * 80)
+    print(f"{'single':>10} | {baseline:14.1f} | {1.0:8.2f}")
+    for num_envs, rate in rows:
+        print(f"{num_envs:>10} | {rate:14.1f} | {rate / baseline:8.2f}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,24 @@
 # src/__init__.py
+# Nothing is imported eagerly: submodules and config values load on first access
+# (PEP 562), so `import src` stays cheap in freshly spawned worker processes.
+import importlib
 import os
-print("✅ TrafficLearningproject package loaded")
 
-from .config import NUM_AGENTS, MAX_STEPS_PER_EPISODE, DEVICE, STATE_DIM, SUMO_CONFIG_FILE
-
-print(f"🔧 Config parameters: NUM_AGENTS={NUM_AGENTS}, MAX_STEPS_PER_EPISODE={MAX_STEPS_PER_EPISODE}, DEVICE={DEVICE}, STATE_DIM={STATE_DIM} , SUMO_CONFIG_FILE ={SUMO_CONFIG_FILE}")
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-print(f"📁 Base directory set to: {BASE_DIR}")
 
-__all__ = ['env', 'madrl', 'utils']
+__all__ = ['env', 'madrl', 'agents', 'config']
+
+_SUBMODULES = {'env', 'madrl', 'agents', 'config'}
+_CONFIG_NAMES = {'NUM_AGENTS', 'MAX_STEPS_PER_EPISODE', 'DEVICE', 'STATE_DIM', 'SUMO_CONFIG_FILE'}
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _CONFIG_NAMES:
+        return getattr(importlib.import_module(".config", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-from .env import *
-from .madrl import *
-# from .utils import *
-print("✅ Submodules imported: env, madrl, utils")
 
+def __dir__():
+    return sorted(list(globals()) + list(_SUBMODULES) + list(_CONFIG_NAMES))
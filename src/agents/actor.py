@@ -1,23 +1,28 @@
+import os
 import torch
 import torch.nn as nn
 from torch.distributions import Categorical
-from config import STATE_DIM, ACTION_DIM, DEVICE
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import RunConfig
 
 class Actor(nn.Module):
     """
     Defines the Actor Network (Policy) for one agent.
     Outputs action logits for a Categorical distribution.
+    Sizes and device come from `config` (a RunConfig, default RunConfig()).
     """
-    def __init__(self):
+    def __init__(self, config=None):
         super().__init__()
+        self.config = config or RunConfig()
         
         self.network = nn.Sequential(
-            nn.Linear(STATE_DIM, 256),
+            nn.Linear(self.config.state_dim, 256),
             nn.ReLU(),
             nn.Linear(256, 128),
             nn.ReLU(),
-            nn.Linear(128, ACTION_DIM)
-        ).to(DEVICE)
+            nn.Linear(128, self.config.action_dim)
+        ).to(self.config.device)
         
     def forward(self, state):
         """Input: state (Tensor, shape: [STATE_DIM]) -> Output: action_logits (Tensor, shape: [ACTION_DIM])"""
@@ -45,6 +50,28 @@ class Actor(nn.Module):
         
         return action, log_prob, entropy
     
+    def sample_actions(self, state, deterministic: bool = False):
+        """
+        Batched action selection for all agents with one forward pass.
+
+        state may have any leading shape, e.g. (NUM_AGENTS, STATE_DIM) or
+        (K, NUM_AGENTS, STATE_DIM). Sampling is a single Gumbel-max draw over the
+        whole batch instead of constructing a Categorical distribution.
+
+        Returns: action (Tensor, shape: [...]), log_prob (Tensor, shape: [...])
+        """
+        log_probs = torch.log_softmax(self.forward(state), dim=-1)
+
+        if deterministic:
+            action = torch.argmax(log_probs, dim=-1)
+        else:
+            # argmax(log p + Gumbel) with Gumbel = -log(Exp(1)) samples from p
+            noise = torch.empty_like(log_probs).exponential_().log_()
+            action = torch.argmax(log_probs - noise, dim=-1)
+
+        log_prob = log_probs.gather(-1, action.unsqueeze(-1)).squeeze(-1)
+        return action, log_prob
+
     def get_log_prob(self, state, action):
         """Calculates log_prob for a specific action (used during PPO update)."""
         logits = self.forward(state)
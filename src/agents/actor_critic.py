@@ -0,0 +1,68 @@
+import os
+import torch
+import torch.nn as nn
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import RunConfig
+from src.agents.actor import Actor
+
+
+class SharedActorCritic(nn.Module):
+    """
+    Actor-Critic variant with a shared feature trunk.
+
+    One trunk feeds the policy head (action logits) and the reward/cost value heads,
+    so a single forward pass gives everything the C-PPO update needs. It exposes the
+    Actor interface (forward -> logits, sample_actions, get_log_prob, ...) and
+    value(state) with the Critic's (value, cost_value) output.
+    """
+    def __init__(self, config=None):
+        super().__init__()
+        self.config = config or RunConfig()
+        device = self.config.device
+
+        self.trunk = nn.Sequential(
+            nn.Linear(self.config.state_dim, 256),
+            nn.ReLU(),
+            nn.Linear(256, 128),
+            nn.ReLU()
+        ).to(device)
+
+        self.policy_head = nn.Linear(128, self.config.action_dim).to(device)
+        self.value_head = nn.Linear(128, 1).to(device)
+        self.cost_head = nn.Linear(128, 1).to(device)
+
+    def forward(self, state):
+        """Input: state (Tensor, shape: [..., STATE_DIM]) -> Output: action_logits (Tensor, shape: [..., ACTION_DIM])"""
+        return self.policy_head(self.trunk(state))
+
+    def value(self, state):
+        """Output: value (Tensor, shape: [..., 1]), cost_value (Tensor, shape: [..., 1])"""
+        x = self.trunk(state)
+        return self.value_head(x), self.cost_head(x)
+
+    def evaluate(self, state):
+        """Single trunk pass -> (action_logits, value, cost_value)."""
+        x = self.trunk(state)
+        return self.policy_head(x), self.value_head(x), self.cost_head(x)
+
+    # The sampling helpers only depend on forward(), so they are shared with Actor
+    get_action_and_log_prob = Actor.get_action_and_log_prob
+    sample_actions = Actor.sample_actions
+    get_log_prob = Actor.get_log_prob
+
+
+def load_policy(path, config=None):
+    """
+    Policy network of an actor_*.pt checkpoint, in eval mode.
+
+    PPOTrainer.save_models writes an Actor state dict, or with shared_trunk=True a
+    SharedActorCritic one (trunk.* / *_head.* keys); the matching class is built.
+    Both give logits from forward() and get_action_and_log_prob().
+    """
+    config = config or RunConfig()
+    state_dict = torch.load(path, map_location=config.device)
+    shared = any(key.startswith('trunk.') for key in state_dict)
+    policy = SharedActorCritic(config) if shared else Actor(config)
+    policy.load_state_dict(state_dict)
+    return policy.eval()
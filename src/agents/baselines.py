@@ -0,0 +1,97 @@
+import math
+import os
+from abc import ABC, abstractmethod
+import torch
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import RunConfig
+
+
+class BaselineController(ABC):
+    """
+    Rule-based signal controller with the policy interface used for data collection:
+    act(states) -> (actions, log_probs) for a (..., NUM_AGENTS, STATE_DIM) state tensor.
+
+    With epsilon > 0 each agent takes a uniformly random action with probability
+    epsilon (otherwise the rule's action), and log_probs are the log probabilities
+    of the actions taken under that mixture, so recorded logs can serve as behaviour
+    data for importance-weighted evaluation (see madrl.offline).
+    """
+    name = 'baseline'
+
+    def __init__(self, config=None, epsilon=0.0):
+        self.config = config or RunConfig()
+        self.epsilon = epsilon
+
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def rule_actions(self, states):
+        """(..., NUM_AGENTS) long tensor of the rule's actions for `states`."""
+
+    def act(self, states):
+        rule = self.rule_actions(states)
+        n = self.config.action_dim
+        if self.epsilon > 0:
+            explore = torch.rand(rule.shape, device=rule.device) < self.epsilon
+            actions = torch.where(explore, torch.randint_like(rule, n), rule)
+        else:
+            actions = rule
+        p_rule = 1.0 - self.epsilon + self.epsilon / n
+        p_other = self.epsilon / n
+        log_probs = torch.where(actions == rule, math.log(p_rule),
+                                math.log(p_other) if p_other > 0 else -math.inf)
+        return actions, log_probs.to(torch.float32)
+
+
+class FixedTimeController(BaselineController):
+    """Never intervenes (action 0), so every signal runs its own fixed-time program."""
+    name = 'fixed_time'
+
+    def rule_actions(self, states):
+        return torch.zeros(states.shape[:-1], dtype=torch.long, device=states.device)
+
+
+class ActuatedController(BaselineController):
+    """
+    Queue-actuated control with gap-out: a phase is held for at least min_green
+    steps, then ended (action 1) once the intersection's total queue has not
+    decreased for `gap` consecutive steps, i.e. the green no longer discharges,
+    or after max_green steps. Phase changes of the signal's own program restart
+    the timers.
+    """
+    name = 'actuated'
+
+    def __init__(self, config=None, epsilon=0.0, min_green=10, max_green=60, gap=3):
+        super().__init__(config, epsilon)
+        self.min_green = min_green
+        self.max_green = max_green
+        self.gap = gap
+        self.reset()
+
+    def reset(self):
+        self._phase = None
+        self._queue = None
+        self._green_time = None
+        self._stalled = None
+
+    def rule_actions(self, states):
+        phase = states[..., 0]
+        # Halting vehicles of the four approaches (state columns 1, 3, 5, 7)
+        queue = states[..., 1:9:2].sum(dim=-1)
+        if self._phase is None or self._phase.shape != phase.shape:
+            self._phase = phase.clone()
+            self._queue = queue.clone()
+            self._green_time = torch.zeros_like(phase)
+            self._stalled = torch.zeros_like(phase)
+
+        changed = phase != self._phase
+        self._green_time = torch.where(changed, torch.zeros_like(phase), self._green_time + 1)
+        stalled = (queue >= self._queue) & ~changed
+        self._stalled = torch.where(stalled, self._stalled + 1, torch.zeros_like(phase))
+        switch = (self._green_time >= self.max_green) | \
+                 ((self._green_time >= self.min_green) & (self._stalled >= self.gap))
+        self._phase = phase.clone()
+        self._queue = queue.clone()
+        return switch.long()
@@ -1,27 +1,33 @@
+import os
 import torch.nn as nn
-from config import STATE_DIM, DEVICE
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import RunConfig
 
 class Critic(nn.Module):
     """
     Defines the Critic Network (Value Function).
     In C-PPO, it estimates both the Reward Value (V) and the Cost Value (V_c).
+    Sizes and device come from `config` (a RunConfig, default RunConfig()).
     """
-    def __init__(self):
+    def __init__(self, config=None):
         super().__init__()
+        self.config = config or RunConfig()
+        device = self.config.device
         
         # Shared feature extractor
         self.fc_common = nn.Sequential(
-            nn.Linear(STATE_DIM, 256),
+            nn.Linear(self.config.state_dim, 256),
             nn.ReLU(),
             nn.Linear(256, 128),
             nn.ReLU()
-        ).to(DEVICE)
+        ).to(device)
         
         # Reward Value head (V(s))
-        self.value_head = nn.Linear(128, 1).to(DEVICE)
+        self.value_head = nn.Linear(128, 1).to(device)
         
         # Cost Value head (V_c(s))
-        self.cost_head = nn.Linear(128, 1).to(DEVICE)
+        self.cost_head = nn.Linear(128, 1).to(device)
         
     def forward(self, state):
         """
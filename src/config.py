@@ -1,11 +1,17 @@
 import os
-import torch
+import re
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+# Importing this module has no side effects: no printing, no directory creation
+# and no torch import. DEVICE and SUMO_CONFIG_FILE are resolved on first access
+# (see __getattr__ below); code that writes under logs/ or models/ creates the
+# directories it needs.
 
 # --- IMPORTANT: Path Configuration ---
 # Ensure the path below correctly points to your SUMO configuration file (.sumocfg)
 # This path is set relative to this config module so it works regardless of
 # the current working directory used to start the script.
-import os
 
 def get_sumo_config_file(scenario='medium', city='city4x4'):
     """
@@ -35,19 +41,12 @@ def get_sumo_config_file(scenario='medium', city='city4x4'):
     
     return config_path
 
-# Default to medium traffic scenario
-SUMO_CONFIG_FILE = get_sumo_config_file('medium')
-
-if not os.path.exists(SUMO_CONFIG_FILE):
-    # Helpful warning only; training will still be able to run in mock mode
-    # but real SUMO-based training requires the configuration file to exist.
-    print(f"ERROR: SUMO configuration file not found at expected path: {SUMO_CONFIG_FILE}")
-
 NUM_AGENTS = 16          # 4x4 grid -> 16 intersections
 STATE_DIM = 12           # [phase, 4 queues, 4 speeds, 3 historical]
 ACTION_DIM = 2           # [0=initial phase, 1=next phase]
 MAX_STEPS_PER_EPISODE = 3600
 SIM_SEED = 42
+SUMO_BACKEND = 'traci'   # 'traci', or opt in to 'libsumo' / 'auto' (libsumo if installed); 'fake' for tests
 
 # --- PPO Hyperparameters ---
 LEARNING_RATE_ACTOR = 3e-4
@@ -59,6 +58,11 @@ CLIP_EPSILON = 0.2       # PPO clipping parameter
 BATCH_SIZE = 128
 BUFFER_SIZE = 2048       # Size of the PPO buffer (steps collected per update)
 MAX_GRAD_NORM = 0.5
+WHOLE_TIMESTEP_MINIBATCHES = False  # Keep all agents of a timestep in the same minibatch
+TARGET_KL = None         # e.g. 0.02: stop the PPO epochs early once approx. KL exceeds 1.5 * TARGET_KL (opt-in)
+COMPACT_BUFFER = False   # uint8 actions, per-step dones, deduplicated global rewards/costs
+BUFFER_STATE_DTYPE = 'float32'  # Rollout state storage: 'float32', 'float16' or 'bfloat16'
+GAE_TORCHSCRIPT = False  # Run the GAE reverse scan through its TorchScript-compiled version
 
 # --- Lagrangian Constraints (Safety Layer for C-PPO) ---
 COST_LIMIT = 60.0        # Max allowed pedestrian wait time (seconds) - defined as R_norm in your interface.
@@ -70,17 +74,121 @@ LAGRANGE_MAX = 100.0     # Maximum value for lambda
 TOTAL_EPISODES = 200
 SAVE_FREQ = 20
 EVAL_FREQ = 50
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 # --- Directory Configuration ---
 LOG_DIR = "logs/tensorboard"
 MODEL_DIR = "models"
-METRICS_PATH = "logs/metrics.json"
+METRICS_PATH = "logs/metrics.json"   # Legacy single-document metrics (see madrl.metrics_log.convert_legacy)
+METRICS_LOG_DIR = "logs/metrics"    # Append-only JSON Lines metrics, one file per run
 BASELINE_RESULTS_PATH = "logs/baseline_results.csv"
+SNAPSHOT_DIR = "logs/snapshots"   # Warmed-up SUMO states, one per (city, scenario, seed)
+SNAPSHOT_WARMUP_STEPS = 300       # Simulated seconds before a snapshot is saved
+ROUTE_CACHE_DIR = "logs/routes"   # Generated route files, one per (city, scenario, seed, period)
+TRAJECTORY_DIR = "logs/trajectories"  # Recorded rollouts, one per (city, scenario, seed, checkpoint)
+
+
+def parse_grid_size(city):
+    """Grid side length of a 'cityNxN' name (city4x4 for anything else, as get_sumo_config_file)."""
+    match = re.fullmatch(r'city(\d+)x(\d+)', str(city).lower())
+    if match is None or match.group(1) != match.group(2):
+        return 4
+    return int(match.group(1))
+
+
+# --- Per-run configuration ---
+def _default(name):
+    # Read at instantiation, so defaults follow the module constants (and overrides of them)
+    return field(default_factory=lambda: globals()[name])
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """
+    Typed configuration of one training run, passed to the constructors of
+    ExperienceBuffer, Actor, Critic, SharedActorCritic, PPOTrainer and TrafficEnv.
+
+    Defaults are the module constants above. Several RunConfigs (e.g. different
+    buffer sizes, agent counts or devices) can coexist in one process:
+
+        small = RunConfig.for_city('city2x2', buffer_size=512)
+        large = small.override(num_agents=25, device='cpu')
+    """
+    num_agents: int = _default('NUM_AGENTS')
+    state_dim: int = _default('STATE_DIM')
+    action_dim: int = _default('ACTION_DIM')
+    max_steps_per_episode: int = _default('MAX_STEPS_PER_EPISODE')
+    learning_rate_actor: float = _default('LEARNING_RATE_ACTOR')
+    learning_rate_critic: float = _default('LEARNING_RATE_CRITIC')
+    gamma: float = _default('GAMMA')
+    gae_lambda: float = _default('GAE_LAMBDA')
+    ppo_epochs: int = _default('PPO_EPOCHS')
+    clip_epsilon: float = _default('CLIP_EPSILON')
+    batch_size: int = _default('BATCH_SIZE')
+    buffer_size: int = _default('BUFFER_SIZE')
+    compact_buffer: bool = _default('COMPACT_BUFFER')
+    buffer_state_dtype: str = _default('BUFFER_STATE_DTYPE')
+    gae_torchscript: bool = _default('GAE_TORCHSCRIPT')
+    max_grad_norm: float = _default('MAX_GRAD_NORM')
+    whole_timestep_minibatches: bool = _default('WHOLE_TIMESTEP_MINIBATCHES')
+    target_kl: Optional[float] = _default('TARGET_KL')
+    cost_limit: float = _default('COST_LIMIT')
+    lagrange_lr: float = _default('LAGRANGE_LR')
+    lagrange_init: float = _default('LAGRANGE_INIT')
+    lagrange_max: float = _default('LAGRANGE_MAX')
+    model_dir: str = _default('MODEL_DIR')
+    device: object = None   # torch.device or str; None resolves to DEVICE
+
+    def __post_init__(self):
+        import torch
+        device = _lazy('DEVICE') if self.device is None else torch.device(self.device)
+        object.__setattr__(self, 'device', device)
+
+    @classmethod
+    def for_city(cls, city, **overrides):
+        """Configuration with num_agents set from a 'cityNxN' name (city2x2 -> 4, city5x5 -> 25)."""
+        overrides.setdefault('num_agents', parse_grid_size(city) ** 2)
+        return cls(**overrides)
+
+    def override(self, **changes):
+        """Copy with some fields replaced."""
+        return replace(self, **changes)
+
+
+# --- Lazily resolved settings ---
+def _resolve_device():
+    import torch
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def _resolve_sumo_config_file():
+    # Default to medium traffic scenario
+    path = get_sumo_config_file('medium')
+    if not os.path.exists(path):
+        # Helpful warning only; training will still be able to run in surrogate mode
+        # but real SUMO-based training requires the configuration file to exist.
+        print(f"ERROR: SUMO configuration file not found at expected path: {path}")
+    return path
+
+
+_LAZY = {
+    'DEVICE': _resolve_device,
+    'SUMO_CONFIG_FILE': _resolve_sumo_config_file,
+}
+
+
+def _lazy(name):
+    # Computed once on first access, then cached as a module global
+    if name not in globals():
+        globals()[name] = _LAZY[name]()
+    return globals()[name]
+
+
+def __getattr__(name):
+    # PEP 562: only called for names that are not module globals yet
+    if name in _LAZY:
+        return _lazy(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Create directories if they don't exist
-os.makedirs(LOG_DIR, exist_ok=True)
-os.makedirs(MODEL_DIR, exist_ok=True)
-os.makedirs("logs", exist_ok=True)
 
-print(f"✅ Configuration loaded: {NUM_AGENTS} agents, device={DEVICE}")
\ No newline at end of file
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
\ No newline at end of file
@@ -0,0 +1,71 @@
+import threading
+
+
+BACKENDS = ('auto', 'traci', 'libsumo', 'fake')
+
+# traci.start is not thread-safe (port selection and the connection registry); every launcher holds this
+TRACI_START_LOCK = threading.Lock()
+
+# libsumo runs the simulation inside this process and supports only one at a time
+_libsumo_lock = threading.Lock()
+_libsumo_owner = None
+
+
+def libsumo_available():
+    """True if the libsumo Python bindings can be imported."""
+    try:
+        import libsumo  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def is_libsumo(api):
+    """True if `api` is the libsumo module."""
+    return getattr(api, '__name__', '') == 'libsumo'
+
+
+def get_backend(name='traci', gui=False):
+    """
+    Return the API module of a simulation backend.
+
+    Args:
+        name (str): 'traci' (TCP socket to a SUMO process, the default), 'libsumo'
+            (SUMO inside this process, no socket; one simulation per process),
+            'auto' (libsumo when installed and no GUI is requested, else traci) or
+            'fake' (a new FakeTraCI, no SUMO needed)
+        gui (bool): libsumo cannot drive sumo-gui, so the GUI always uses traci
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown simulation backend '{name}', expected one of {BACKENDS}")
+    if name == 'fake':
+        from src.env.fake_traci import FakeTraCI
+        return FakeTraCI()
+    if name in ('auto', 'libsumo') and not gui:
+        try:
+            import libsumo
+            return libsumo
+        except ImportError:
+            if name == 'libsumo':
+                print("[WARN] libsumo is not installed, falling back to TraCI")
+    elif name == 'libsumo':
+        print("[WARN] libsumo does not support the GUI, falling back to TraCI")
+    import traci
+    return traci
+
+
+def claim_libsumo(owner):
+    """Reserve the process' libsumo simulation for `owner`. Returns False if it is taken."""
+    global _libsumo_owner
+    with _libsumo_lock:
+        if _libsumo_owner is not None and _libsumo_owner is not owner:
+            return False
+        _libsumo_owner = owner
+        return True
+
+
+def release_libsumo(owner):
+    global _libsumo_owner
+    with _libsumo_lock:
+        if _libsumo_owner is owner:
+            _libsumo_owner = None
@@ -0,0 +1,355 @@
+import json
+import time
+import traci.constants as tc
+from traci.exceptions import FatalTraCIError
+
+
+class _Logic:
+    """Minimal stand-in for traci.trafficlight.Logic (only .phases is used)."""
+
+    def __init__(self, num_phases):
+        self.phases = tuple(range(num_phases))
+
+
+class FakeTraCI:
+    """
+    FakeTraCI
+    ---------
+    In-process stand-in for the ``traci`` module, for exercising SUMOInterface and
+    TrafficEnv without a SUMO installation.
+
+    Like traci, start(cmd, label) opens a labelled connection (a FakeConnection,
+    see getConnection) and makes it current; the module-level calls and domains
+    (``fake.lane``, ``fake.simulationStep()``, ...) act on the current connection.
+
+    start_delay / step_delay emulate process launch and simulation cost; the
+    starts, loads, state_saves and state_loads counters (summed over all
+    connections) show what a reset did.
+    """
+
+    def __init__(self, grid_size=2, num_vehicles=1000, depart_interval=2, trip_duration=60,
+                 start_delay=0.0, step_delay=0.0):
+        self._params = dict(grid_size=grid_size, num_vehicles=num_vehicles, depart_interval=depart_interval,
+                            trip_duration=trip_duration, step_delay=step_delay)
+        self.start_delay = start_delay
+        self.starts = self.loads = self.state_saves = self.state_loads = self.steps = 0
+        self._connections = {}
+        self._current = None
+
+        self.simulation = _CurrentDomain(self, 'simulation')
+        self.trafficlight = _CurrentDomain(self, 'trafficlight')
+        self.lane = _CurrentDomain(self, 'lane')
+        self.vehicle = _CurrentDomain(self, 'vehicle')
+
+    def network_tls_ids(self):
+        """Traffic lights of the simulated grid (the configured network file is ignored)."""
+        grid_size = self._params['grid_size']
+        return tuple(f"J{i}" for i in range(grid_size * grid_size))
+
+    def start(self, cmd, label="default", doSwitch=True, **kwargs):
+        if label in self._connections:
+            raise FatalTraCIError(f"Connection '{label}' is already active.")
+        if self.start_delay:
+            time.sleep(self.start_delay)
+        conn = FakeConnection(self, label, **self._params)
+        conn.load(list(cmd)[1:], count=False)
+        self.starts += 1
+        self._connections[label] = conn
+        if doSwitch:
+            self._current = conn
+        return conn
+
+    def getConnection(self, label="default"):
+        if label not in self._connections:
+            raise FatalTraCIError(f"Connection '{label}' is not known.")
+        return self._connections[label]
+
+    def switch(self, label):
+        self._current = self.getConnection(label)
+
+    def _check(self):
+        if self._current is None:
+            raise FatalTraCIError("Not connected.")
+        return self._current
+
+    def load(self, args):
+        self._check().load(args)
+
+    def simulationStep(self, step=0.0):
+        self._check().simulationStep(step)
+
+    def close(self, wait=True):
+        self._check().close(wait)
+
+    def _closed(self, conn):
+        self._connections.pop(conn.label, None)
+        if self._current is conn:
+            self._current = None
+
+
+class FakeConnection:
+    """
+    One fake SUMO simulation behind a labelled connection (traci.Connection API subset).
+
+    The toy network is a grid of 4-phase traffic lights with one incoming lane per
+    approach; vehicles depart every `depart_interval` seconds and cross a lane in
+    `trip_duration` seconds. The whole state is a function of (seed, time, signal
+    phases), so a saved state reloads exactly. As in SUMO, load and loadState drop
+    all subscriptions. kill() emulates a crashed SUMO process: every later call
+    raises FatalTraCIError.
+    """
+
+    NUM_PHASES = 4
+    PHASE_DURATION = 30
+
+    def __init__(self, owner, label, grid_size=2, num_vehicles=1000, depart_interval=2, trip_duration=60,
+                 step_delay=0.0):
+        self._owner = owner
+        self.label = label
+        self.tls_ids = owner.network_tls_ids()
+        self.lane_ids = tuple(f"{tls_id}_in{d}" for tls_id in self.tls_ids for d in 'NSEW')
+        self.num_vehicles = num_vehicles
+        self.depart_interval = depart_interval
+        self.trip_duration = trip_duration
+        self.step_delay = step_delay
+        self.config = None
+        self.route_file = None
+        self.connected = True
+        self._reset_simulation(seed=None)
+
+        self.simulation = _SimulationDomain(self)
+        self.trafficlight = _TrafficLightDomain(self)
+        self.lane = _LaneDomain(self)
+        self.vehicle = _VehicleDomain(self)
+
+    # --------------------------------------------------------------------------
+    # Connection
+    # --------------------------------------------------------------------------
+    def getLabel(self):
+        return self.label
+
+    def load(self, args, count=True):
+        self._check_connected()
+        args = list(args)
+        if '-c' in args:
+            self.config = args[args.index('-c') + 1]
+        # Like SUMO, the demand is fixed by the last start/load; loadState keeps it
+        self.route_file = args[args.index('-r') + 1] if '-r' in args else None
+        if count:
+            self._owner.loads += 1
+        self._reset_simulation(self._parse_seed(args))
+
+    def close(self, wait=True):
+        self._check_connected()
+        self.connected = False
+        self._owner._closed(self)
+
+    def kill(self):
+        self.connected = False
+
+    def simulationStep(self, step=0.0):
+        self._check_connected()
+        if self.step_delay:
+            time.sleep(self.step_delay)
+        self._owner.steps += 1
+        self.time += 1
+        for tls_id in self.tls_ids:
+            self.phase_time[tls_id] += 1
+            if self.phase_time[tls_id] >= self.PHASE_DURATION:
+                self.phases[tls_id] = (self.phases[tls_id] + 1) % self.NUM_PHASES
+                self.phase_time[tls_id] = 0
+        self._departed = [vid for vid in self._active_ids() if self._depart_time(vid) == self.time]
+        # SUMO drops the subscriptions of vehicles that left the network
+        active = set(self._active_ids())
+        for vid in [vid for vid in self.subscriptions['vehicle'] if vid not in active]:
+            del self.subscriptions['vehicle'][vid]
+
+    # --------------------------------------------------------------------------
+    # Toy network model
+    # --------------------------------------------------------------------------
+    @staticmethod
+    def _parse_seed(args):
+        args = list(args)
+        if '--seed' in args:
+            return int(args[args.index('--seed') + 1])
+        return None
+
+    def _check_connected(self):
+        if not self.connected:
+            raise FatalTraCIError("Connection closed by SUMO.")
+
+    def _reset_simulation(self, seed):
+        self.seed = 0 if seed is None else seed
+        self.time = 0
+        self.phases = {tls_id: 0 for tls_id in self.tls_ids}
+        self.phase_time = {tls_id: 0 for tls_id in self.tls_ids}
+        self._departed = []
+        self.subscriptions = {'lane': {}, 'trafficlight': {}, 'vehicle': {}, 'simulation': ()}
+
+    def _depart_time(self, vid):
+        return int(vid[3:]) * self.depart_interval + 1
+
+    def _active_ids(self):
+        first = max(0, (self.time - self.trip_duration) // self.depart_interval)
+        last = min(self.num_vehicles, (self.time - 1) // self.depart_interval + 1) if self.time > 0 else 0
+        return [f"veh{k}" for k in range(first, last)
+                if self._depart_time(f"veh{k}") <= self.time < self._depart_time(f"veh{k}") + self.trip_duration]
+
+    def _speed(self, vid):
+        k = int(vid[3:])
+        return 0.0 if (k * 7 + self.time + self.seed) % 5 == 0 else float((k * 3 + self.seed) % 12 + 2)
+
+    def _waiting(self, vid):
+        k = int(vid[3:])
+        return float((k + self.time + self.seed) % 5 == 0) * float((k + self.seed) % 30)
+
+    def _lane_vehicles(self, lane_id):
+        slot = self.lane_ids.index(lane_id)
+        return [vid for vid in self._active_ids() if int(vid[3:]) % len(self.lane_ids) == slot]
+
+    def _lane_values(self, lane_id):
+        vehicles = self._lane_vehicles(lane_id)
+        speeds = [self._speed(vid) for vid in vehicles]
+        return {
+            tc.LAST_STEP_VEHICLE_HALTING_NUMBER: sum(1 for s in speeds if s < 0.1),
+            tc.LAST_STEP_MEAN_SPEED: sum(speeds) / len(speeds) if speeds else 13.89,
+            tc.LAST_STEP_VEHICLE_NUMBER: len(vehicles),
+        }
+
+    def _snapshot(self):
+        return {'seed': self.seed, 'time': self.time, 'phases': self.phases, 'phase_time': self.phase_time}
+
+
+class _CurrentDomain:
+    """Module-level domain (``fake.lane``) that forwards to the current connection."""
+
+    def __init__(self, owner, name):
+        self._owner = owner
+        self._name = name
+
+    def __getattr__(self, attr):
+        # Resolved at call time, like traci's module-level domains
+        def call(*args, **kwargs):
+            return getattr(getattr(self._owner._check(), self._name), attr)(*args, **kwargs)
+        return call
+
+
+class _Domain:
+    def __init__(self, conn):
+        self._conn = conn
+
+    @property
+    def _sim(self):
+        self._conn._check_connected()
+        return self._conn
+
+
+class _SimulationDomain(_Domain):
+    def getTime(self):
+        return float(self._sim.time)
+
+    def getMinExpectedNumber(self):
+        sim = self._sim
+        departed = min(sim.num_vehicles, (sim.time - 1) // sim.depart_interval + 1) if sim.time > 0 else 0
+        return sim.num_vehicles - departed + len(sim._active_ids())
+
+    def getDepartedIDList(self):
+        return tuple(self._sim._departed)
+
+    def saveState(self, path):
+        with open(path, 'w') as f:
+            json.dump(self._sim._snapshot(), f)
+        self._sim._owner.state_saves += 1
+
+    def loadState(self, path):
+        sim = self._sim
+        with open(path) as f:
+            state = json.load(f)
+        sim._reset_simulation(state['seed'])
+        sim.time = state['time']
+        sim.phases.update(state['phases'])
+        sim.phase_time.update(state['phase_time'])
+        sim._owner.state_loads += 1
+
+    def subscribe(self, varIDs=(), *args, **kwargs):
+        self._sim.subscriptions['simulation'] = tuple(varIDs)
+
+    def getSubscriptionResults(self):
+        if tc.VAR_DEPARTED_VEHICLES_IDS in self._sim.subscriptions['simulation']:
+            return {tc.VAR_DEPARTED_VEHICLES_IDS: tuple(self._sim._departed)}
+        return {}
+
+
+class _TrafficLightDomain(_Domain):
+    def getIDList(self):
+        return self._sim.tls_ids
+
+    def getControlledLanes(self, tls_id):
+        # Two links (straight, turn) per incoming lane, as in TraCI link order
+        return tuple(lane for d in 'NSEW' for lane in (f"{tls_id}_in{d}",) * 2)
+
+    def getAllProgramLogics(self, tls_id):
+        return (_Logic(self._sim.NUM_PHASES),)
+
+    def getPhase(self, tls_id):
+        return self._sim.phases[tls_id]
+
+    def setPhase(self, tls_id, index):
+        self._sim.phases[tls_id] = index
+        self._sim.phase_time[tls_id] = 0
+
+    def subscribe(self, objectID, varIDs=(), *args, **kwargs):
+        self._sim.subscriptions['trafficlight'][objectID] = tuple(varIDs)
+
+    def getAllSubscriptionResults(self):
+        return {tls_id: {var: self._sim.phases[tls_id] for var in var_ids if var == tc.TL_CURRENT_PHASE}
+                for tls_id, var_ids in self._sim.subscriptions['trafficlight'].items()}
+
+
+class _LaneDomain(_Domain):
+    def getIDList(self):
+        return self._sim.lane_ids
+
+    def getLastStepHaltingNumber(self, lane_id):
+        return self._sim._lane_values(lane_id)[tc.LAST_STEP_VEHICLE_HALTING_NUMBER]
+
+    def getLastStepMeanSpeed(self, lane_id):
+        return self._sim._lane_values(lane_id)[tc.LAST_STEP_MEAN_SPEED]
+
+    def getLastStepVehicleNumber(self, lane_id):
+        return self._sim._lane_values(lane_id)[tc.LAST_STEP_VEHICLE_NUMBER]
+
+    def subscribe(self, objectID, varIDs=(), *args, **kwargs):
+        self._sim.subscriptions['lane'][objectID] = tuple(varIDs)
+
+    def getAllSubscriptionResults(self):
+        results = {}
+        for lane_id, var_ids in self._sim.subscriptions['lane'].items():
+            values = self._sim._lane_values(lane_id)
+            results[lane_id] = {var: values[var] for var in var_ids}
+        return results
+
+
+class _VehicleDomain(_Domain):
+    def getIDList(self):
+        return tuple(self._sim._active_ids())
+
+    def getIDCount(self):
+        return len(self._sim._active_ids())
+
+    def getSpeed(self, vid):
+        return self._sim._speed(vid)
+
+    def getWaitingTime(self, vid):
+        return self._sim._waiting(vid)
+
+    def subscribe(self, objectID, varIDs=(), *args, **kwargs):
+        self._sim.subscriptions['vehicle'][objectID] = tuple(varIDs)
+
+    def getAllSubscriptionResults(self):
+        sim = self._sim
+        results = {}
+        for vid, var_ids in sim.subscriptions['vehicle'].items():
+            values = {tc.VAR_SPEED: sim._speed(vid), tc.VAR_WAITING_TIME: sim._waiting(vid)}
+            results[vid] = {var: values[var] for var in var_ids}
+        return results
@@ -0,0 +1,36 @@
+import torch
+
+
+def agent_mask(counts, max_agents=None, device=None):
+    """
+    (K, max_agents) bool mask, True for the first counts[k] agents of row k.
+
+    Args:
+        counts (sequence of int): Real agent count of each environment
+        max_agents (int): Padded width (default max(counts))
+    """
+    counts = torch.as_tensor(list(counts), device=device)
+    width = int(counts.max()) if max_agents is None else max_agents
+    return torch.arange(width, device=device).unsqueeze(0) < counts.unsqueeze(1)
+
+
+def pad_agents(tensors, max_agents=None, fill=0.0):
+    """
+    Stack per-environment tensors with different agent counts.
+
+    Args:
+        tensors (sequence of Tensor): Shapes (A_k, *feature_shape), same feature shape
+        max_agents (int): Padded agent dimension (default max A_k)
+        fill: Value of the padding rows
+    Returns:
+        padded: Tensor (K, max_agents, *feature_shape)
+        mask: bool Tensor (K, max_agents), False on padding rows
+    """
+    counts = [t.shape[0] for t in tensors]
+    width = max(counts) if max_agents is None else max_agents
+    first = tensors[0]
+    padded = torch.full((len(tensors), width) + tuple(first.shape[1:]), fill,
+                        dtype=first.dtype, device=first.device)
+    for k, t in enumerate(tensors):
+        padded[k, :t.shape[0]] = t
+    return padded, agent_mask(counts, width, device=first.device)
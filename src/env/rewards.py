@@ -0,0 +1,37 @@
+import numpy as np
+
+
+MAX_SPEED = 13.89  # 50 km/h in m/s
+MAX_WAIT = 60.0    # 60 seconds
+
+METRICS_WINDOW = 100  # Steps after which the accumulated metrics are reset
+
+
+def reward_and_cost(total_waiting, stopped, total_speed, total_vehicles):
+    """
+    Global reward (R) and cost (C) from accumulated vehicle metrics.
+
+    Works on scalars or on NumPy arrays (one entry per environment); entries with
+    no vehicles get a reward and cost of 0.
+
+    Args:
+        total_waiting: Sum of the vehicles' waiting times
+        stopped: Number of stopped vehicle observations
+        total_speed: Sum of the vehicles' speeds
+        total_vehicles: Number of vehicle observations
+    """
+    total_vehicles = np.asarray(total_vehicles, dtype=np.float64)
+    denom = np.maximum(total_vehicles, 1.0)
+    avg_wait = np.asarray(total_waiting, dtype=np.float64) / denom
+    avg_stop_ratio = np.asarray(stopped, dtype=np.float64) / denom
+    avg_speed = np.asarray(total_speed, dtype=np.float64) / denom
+
+    W_norm = np.clip(avg_wait / MAX_WAIT, 0, 10)
+    S_norm = np.clip(avg_speed / MAX_SPEED, 0, 1)
+    R_norm = np.clip(avg_stop_ratio, 0, 1)
+
+    reward = (2.0 * S_norm) - (1.5 * W_norm) - (1.0 * R_norm)
+    cost = R_norm
+
+    empty = total_vehicles == 0
+    return np.where(empty, 0.0, reward), np.where(empty, 0.0, cost)
@@ -0,0 +1,263 @@
+import gzip
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import MAX_STEPS_PER_EPISODE, ROUTE_CACHE_DIR, get_sumo_config_file
+from src.env.topology import get_net_file
+
+
+# Seconds between generated departures (randomTrips -p), as in generate_routes.sh
+SCENARIO_PERIODS = {'low': 10.0, 'medium': 3.6, 'high': 2.0}
+FRINGE_FACTOR = 5
+DIGEST_MEMO_SIZE = 256   # Files whose content hash file_digest remembers
+
+# abspath -> (size, mtime_ns, sha1), least recently used first
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def find_random_trips():
+    """
+    Path of SUMO's tools/randomTrips.py, from SUMO_HOME or else the eclipse-sumo
+    package (libsumo's wheel points SUMO_HOME at its data files, which have no tools).
+    """
+    homes = [os.environ.get('SUMO_HOME')]
+    try:
+        import sumo
+        homes.append(sumo.SUMO_HOME)
+    except (ImportError, AttributeError):
+        pass
+    for sumo_home in homes:
+        script = os.path.join(sumo_home, 'tools', 'randomTrips.py') if sumo_home else None
+        if script is not None and os.path.exists(script):
+            return script
+    raise FileNotFoundError("randomTrips.py not found: set SUMO_HOME to your SUMO installation")
+
+
+def file_digest(path):
+    """
+    SHA-1 of a file's content, memoized until its size or mtime changes. Only the
+    latest version of the DIGEST_MEMO_SIZE most recently hashed files is kept.
+    """
+    stat = os.stat(path)
+    path = os.path.abspath(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        entry = _digests.get(path)
+    if entry is None or entry[:2] != version:
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        entry = version + (sha.hexdigest(),)
+    with _digests_lock:
+        _digests[path] = entry
+        _digests.move_to_end(path)
+        while len(_digests) > DIGEST_MEMO_SIZE:
+            _digests.popitem(last=False)
+    return entry[2]
+
+
+def generate_route_file(net_file, out_path, period, seed, end=MAX_STEPS_PER_EPISODE,
+                        fringe_factor=FRINGE_FACTOR):
+    """
+    Run randomTrips.py on `net_file` and write the validated trips gzip-compressed
+    to `out_path` (SUMO reads .rou.xml.gz directly). Runs in the pool's worker
+    processes; the file appears atomically, so readers never see a partial one.
+    """
+    with tempfile.TemporaryDirectory(prefix="routes-") as work_dir:
+        trips = os.path.join(work_dir, 'trips.rou.xml')
+        cmd = [
+            sys.executable, find_random_trips(),
+            "-n", os.path.abspath(net_file),
+            "-o", trips,
+            "-e", str(end),
+            "-p", str(period),
+            "--seed", str(seed),
+            "--fringe-factor", str(fringe_factor),
+            "--validate",
+        ]
+        # randomTrips writes its intermediate files to the working directory
+        result = subprocess.run(cmd, cwd=work_dir, capture_output=True, text=True)
+        if result.returncode != 0 or not os.path.exists(trips):
+            raise RuntimeError(f"randomTrips.py failed ({result.returncode}): {result.stderr.strip()[-500:]}")
+
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(os.path.abspath(out_path)),
+                                f".tmp{os.getpid()}_{os.path.basename(out_path)}")
+        try:
+            with open(trips, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, out_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return out_path
+
+
+class RouteCache:
+    """
+    RouteCache
+    ----------
+    Generates randomTrips route files per (city, scenario, seed, period) and keeps
+    them gzip-compressed on disk, so every demand is generated only once.
+
+    The file name carries a hash of the network file's content and of every
+    generation parameter, so an edited network or changed options never reuse a
+    stale file. Generation runs in a background process pool: submit() returns a
+    Future immediately, and prefetch() keeps a few episodes' routes ahead of the
+    trainer (see RoutePrefetcher).
+    """
+
+    def __init__(self, cache_dir=ROUTE_CACHE_DIR, max_workers=2, end=MAX_STEPS_PER_EPISODE,
+                 fringe_factor=FRINGE_FACTOR):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.end = end
+        self.fringe_factor = fringe_factor
+        self._executor = None
+        self._pending = {}       # path -> Future of a running generation
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _resolve(self, city, scenario, period=None, net_file=None):
+        if period is None:
+            period = SCENARIO_PERIODS.get(scenario, SCENARIO_PERIODS['medium'])
+        if net_file is None:
+            net_file = get_net_file(get_sumo_config_file(scenario, city))
+        return float(period), net_file
+
+    def path(self, city, scenario, seed, period=None, net_file=None):
+        """Cache file path of a (city, scenario, seed, period) demand."""
+        period, net_file = self._resolve(city, scenario, period, net_file)
+        key = f"{file_digest(net_file)}|{period}|{seed}|{self.end}|{self.fringe_factor}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+        return os.path.join(self.cache_dir, f"{city}_{scenario}_seed{seed}_p{period:g}_{digest}.rou.xml.gz")
+
+    def submit(self, city, scenario, seed, period=None, net_file=None):
+        """
+        Start generating a route file in the background (no-op if it is cached or
+        already being generated). Returns a Future of its path.
+        """
+        period, net_file = self._resolve(city, scenario, period, net_file)
+        path = self.path(city, scenario, seed, period, net_file)
+        with self._lock:
+            if path in self._pending:
+                return self._pending[path]
+            if os.path.exists(path):
+                self.hits += 1
+                future = Future()
+                future.set_result(path)
+                return future
+            self.misses += 1
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            future = self._executor.submit(generate_route_file, net_file, path, period, seed,
+                                           self.end, self.fringe_factor)
+            self._pending[path] = future
+        future.add_done_callback(lambda f, path=path: self._forget(path))
+        return future
+
+    def _forget(self, path):
+        with self._lock:
+            self._pending.pop(path, None)
+
+    def get(self, city, scenario, seed, period=None, net_file=None):
+        """Path of the route file, generating it first if needed (blocks)."""
+        return self.submit(city, scenario, seed, period, net_file).result()
+
+    def prefetch(self, city, scenario, seeds, period=None, ahead=2):
+        """
+        Iterator over the route files of `seeds` (any iterable, e.g. itertools.count()),
+        generating `ahead` of them in the background.
+
+        Args:
+            scenario (str or iterable): One level for every seed, or one per seed
+        """
+        if isinstance(scenario, str):
+            specs = ((city, scenario, seed, period) for seed in seeds)
+        else:
+            specs = ((city, level, seed, period) for level, seed in zip(scenario, seeds))
+        return RoutePrefetcher(self, specs, ahead=ahead)
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'pending': len(self._pending),
+        }
+
+    def clear(self):
+        """Delete every cached route file."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.rou.xml.gz'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def close(self):
+        """Stop the worker processes (running generations are finished first)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class RoutePrefetcher:
+    """
+    Keeps `ahead` route files of a (city, scenario, seed, period) sequence generating
+    in the background.
+
+    next(prefetcher) blocks until the next file is ready. poll() never blocks: it
+    returns the next file if it is ready and None otherwise, so TrafficEnv.reset can
+    keep the previous demand instead of waiting for the generator.
+    """
+
+    def __init__(self, cache, specs, ahead=2):
+        self.cache = cache
+        self._specs = iter(specs)
+        self.ahead = max(1, ahead)
+        self._queue = deque()
+        self.ready = 0
+        self.stalls = 0
+        self._fill()
+
+    def _fill(self):
+        while len(self._queue) < self.ahead:
+            spec = next(self._specs, None)
+            if spec is None:
+                return
+            self._queue.append(self.cache.submit(*spec))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._fill()
+        if not self._queue:
+            raise StopIteration
+        future = self._queue.popleft()
+        self._fill()
+        self.ready += 1
+        return future.result()
+
+    def poll(self):
+        """The next route file if it has been generated, else None (never blocks)."""
+        self._fill()
+        if not self._queue or not self._queue[0].done():
+            self.stalls += 1
+            return None
+        future = self._queue.popleft()
+        self._fill()
+        if future.exception() is not None:
+            print(f"[WARN] Route generation failed, keeping the current routes: {future.exception()}")
+            return None
+        self.ready += 1
+        return future.result()
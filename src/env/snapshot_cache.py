@@ -0,0 +1,91 @@
+import hashlib
+import os
+from contextlib import contextmanager
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import SNAPSHOT_DIR, SNAPSHOT_WARMUP_STEPS
+
+
+class SnapshotCache:
+    """
+    SnapshotCache
+    -------------
+    On-disk store of warmed-up SUMO states (simulation.saveState files), keyed by
+    (city, scenario, seed).
+
+    The SUMO configuration path, the route file overriding its demand (if any) and
+    the warm-up length are hashed into the file name, so two networks with the same
+    city name, different route files or a changed warm-up never share a snapshot.
+    Files are written to a temporary name and renamed into place, so a crash while
+    saving never leaves a truncated snapshot behind.
+
+    Lookups and reset latencies are counted for the hit-rate / latency report.
+    """
+
+    def __init__(self, cache_dir=SNAPSHOT_DIR, warmup_steps=SNAPSHOT_WARMUP_STEPS):
+        self.cache_dir = cache_dir
+        self.warmup_steps = warmup_steps
+        self.hits = 0
+        self.misses = 0
+        self.hit_latencies = []
+        self.miss_latencies = []
+
+    def path(self, city, scenario, seed, sumo_cfg_path='', route_file=None):
+        """Snapshot file path of a (city, scenario, seed) key."""
+        route_tag = os.path.abspath(route_file) if route_file else ''
+        key = f"{os.path.abspath(sumo_cfg_path)}|{route_tag}|{self.warmup_steps}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+        seed_tag = 'default' if seed is None else str(seed)
+        return os.path.join(self.cache_dir, f"{city}_{scenario}_seed{seed_tag}_{digest}.xml.gz")
+
+    def lookup(self, city, scenario, seed, sumo_cfg_path='', route_file=None):
+        """Return the snapshot path if it is cached, else None. Counts a hit or a miss."""
+        path = self.path(city, scenario, seed, sumo_cfg_path, route_file)
+        if os.path.exists(path):
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    @contextmanager
+    def writer(self, city, scenario, seed, sumo_cfg_path='', route_file=None):
+        """Yields a temporary path to save the snapshot to; it is moved into place on success."""
+        path = self.path(city, scenario, seed, sumo_cfg_path, route_file)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Keep the extension last: SUMO picks the state format from it
+        tmp_path = os.path.join(self.cache_dir, f".tmp{os.getpid()}_{os.path.basename(path)}")
+        try:
+            yield tmp_path
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def record_reset(self, latency, hit):
+        """Record the wall-clock duration of one reset."""
+        (self.hit_latencies if hit else self.miss_latencies).append(latency)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_stats(self):
+        """Hit rate and mean reset latency (seconds) of hits and misses."""
+        def mean(values):
+            return sum(values) / len(values) if values else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'hit_reset_latency': mean(self.hit_latencies),
+            'miss_reset_latency': mean(self.miss_latencies),
+        }
+
+    def clear(self):
+        """Delete every cached snapshot."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.xml.gz'):
+                os.remove(os.path.join(self.cache_dir, name))
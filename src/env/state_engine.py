@@ -0,0 +1,172 @@
+import numpy as np
+import traci.constants as tc
+
+
+# Variables needed to build the per-intersection state vector
+LANE_VARS = (
+    tc.LAST_STEP_VEHICLE_HALTING_NUMBER,
+    tc.LAST_STEP_MEAN_SPEED,
+    tc.LAST_STEP_VEHICLE_NUMBER,
+)
+TLS_VARS = (tc.TL_CURRENT_PHASE,)
+
+# Variables needed for the network-wide reward/cost metrics
+VEHICLE_VARS = (tc.VAR_SPEED, tc.VAR_WAITING_TIME)
+
+STOPPED_SPEED = 0.1  # m/s, a vehicle slower than this counts as stopped
+
+# TraCI domains that are objects (traci.lane, traci.vehicle, ...) rather than functions
+TRACI_DOMAINS = (
+    'trafficlight', 'lane', 'vehicle', 'simulation', 'edge',
+    'junction', 'person', 'route', 'vehicletype', 'inductionloop',
+)
+
+
+class TraCICallCounter:
+    """
+    TraCICallCounter
+    ----------------
+    Thin proxy around a TraCI-like API (the ``traci`` module, a ``traci.Connection``
+    or ``libsumo``) that counts every API call made through it.
+
+    ``counter.lane.getLastStepMeanSpeed(...)`` behaves exactly like the wrapped call
+    and increments ``counter.calls``.
+    """
+
+    def __init__(self, api):
+        self._api = api
+        self.calls = 0
+
+    def reset(self):
+        """Return the number of calls made since the last reset and restart the count."""
+        calls, self.calls = self.calls, 0
+        return calls
+
+    def bind(self, api):
+        """Point the proxy at another API object (e.g. a new connection), keeping the count."""
+        calls = self.calls
+        self.__dict__.clear()
+        self._api = api
+        self.calls = calls
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if name in TRACI_DOMAINS:
+            wrapped = _CountedDomain(attr, self)
+        elif callable(attr) and not isinstance(attr, type):
+            wrapped = self._count(attr)
+        else:
+            return attr
+        # Cache on the instance so subsequent lookups skip __getattr__
+        setattr(self, name, wrapped)
+        return wrapped
+
+    def _count(self, fn):
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return fn(*args, **kwargs)
+        return counted
+
+
+class _CountedDomain:
+    """Domain proxy (e.g. ``traci.lane``) that reports calls to its owning counter."""
+
+    def __init__(self, domain, counter):
+        self._domain = domain
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._domain, name)
+        if not callable(attr):
+            return attr
+        wrapped = self._counter._count(attr)
+        setattr(self, name, wrapped)
+        return wrapped
+
+
+class SubscriptionStateEngine:
+    """
+    SubscriptionStateEngine
+    -----------------------
+    Builds the (NUM_AGENTS, STATE_DIM) state matrix from TraCI variable subscriptions.
+
+    Every controlled lane and traffic light of the TopologyIndex is subscribed once;
+    SUMO then pushes the subscribed values with each ``simulationStep`` response, so
+    reading a step's state costs one ``getAllSubscriptionResults`` per domain instead
+    of a getter per lane.
+
+    The features are identical to ``SUMOInterface.get_state``:
+        [phase, queue_N, speed_N, queue_S, speed_S, queue_E, speed_E, queue_W, speed_W, 0, 0, 0]
+    """
+
+    def __init__(self, api, topology):
+        self._api = api
+        self.topology = topology
+        self.subscribe()
+
+    def subscribe(self):
+        """Subscribe to the lane and TLS variables used by the state vector."""
+        for lane in self.topology.lane_ids:
+            self._api.lane.subscribe(lane, LANE_VARS)
+        for tls_id in self.topology.tls_ids:
+            self._api.trafficlight.subscribe(tls_id, TLS_VARS)
+
+    def get_states(self, out=None):
+        """Assemble the state matrix from the latest subscription results (into `out` if given)."""
+        lane_results = self._api.lane.getAllSubscriptionResults()
+        tls_results = self._api.trafficlight.getAllSubscriptionResults()
+
+        lanes = [lane_results[lane] for lane in self.topology.lane_ids]
+        num_lanes = len(lanes)
+        halting = np.fromiter((v[tc.LAST_STEP_VEHICLE_HALTING_NUMBER] for v in lanes), np.float64, num_lanes)
+        mean_speed = np.fromiter((v[tc.LAST_STEP_MEAN_SPEED] for v in lanes), np.float64, num_lanes)
+        vehicle_count = np.fromiter((v[tc.LAST_STEP_VEHICLE_NUMBER] for v in lanes), np.float64, num_lanes)
+        phases = np.fromiter(
+            (tls_results[tls_id][tc.TL_CURRENT_PHASE] for tls_id in self.topology.tls_ids),
+            np.float64, len(self.topology),
+        )
+
+        return self.topology.compute_states(phases, halting, mean_speed, vehicle_count, out=out)
+
+
+class VehicleMetricsCollector:
+    """
+    VehicleMetricsCollector
+    -----------------------
+    Network-wide vehicle aggregates (total waiting, stopped count, speed sum,
+    vehicle count) from TraCI vehicle subscriptions.
+
+    Each vehicle is subscribed once, in the step it departs (learned from a
+    subscription to the simulation's departed-vehicle list), and SUMO drops the
+    subscription when it arrives. Speeds and waiting times of all vehicles are then
+    pushed with every ``simulationStep`` response, so the per-step TraCI traffic no
+    longer grows with the number of vehicles in the network.
+    """
+
+    def __init__(self, api):
+        self._api = api
+        self.subscribe()
+
+    def subscribe(self):
+        """Subscribe to departures and to every vehicle already in the network."""
+        self._api.simulation.subscribe([tc.VAR_DEPARTED_VEHICLES_IDS])
+        for vid in self._api.vehicle.getIDList():
+            self._api.vehicle.subscribe(vid, VEHICLE_VARS)
+
+    def collect(self):
+        """
+        Return (total_waiting, stopped, total_speed, vehicle_count) for the current step.
+        """
+        departed = self._api.simulation.getSubscriptionResults().get(tc.VAR_DEPARTED_VEHICLES_IDS, ())
+        for vid in departed:
+            self._api.vehicle.subscribe(vid, VEHICLE_VARS)
+
+        results = self._api.vehicle.getAllSubscriptionResults()
+        count = len(results)
+        if count == 0:
+            return 0.0, 0, 0.0, 0
+
+        values = results.values()
+        speeds = np.fromiter((v[tc.VAR_SPEED] for v in values), np.float64, count)
+        waiting = np.fromiter((v[tc.VAR_WAITING_TIME] for v in values), np.float64, count)
+        return float(waiting.sum()), int(np.count_nonzero(speeds < STOPPED_SPEED)), float(speeds.sum()), count
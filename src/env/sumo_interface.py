@@ -1,13 +1,18 @@
+import itertools
 import os
-import time
 import numpy as np
 import traci
 import sumolib
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from src.config import get_sumo_config_file, STATE_DIM, NUM_AGENTS
+from src.config import get_sumo_config_file, STATE_DIM, SUMO_BACKEND
+from src.env.state_engine import SubscriptionStateEngine, TraCICallCounter, VehicleMetricsCollector, STOPPED_SPEED
+from src.env.topology import TopologyIndex, get_net_file, traffic_light_ids
+from src.env.rewards import reward_and_cost, METRICS_WINDOW
+from src.env.backends import get_backend, is_libsumo, claim_libsumo, release_libsumo, TRACI_START_LOCK
 
 
+_LABELS = itertools.count()
 
 
 class SUMOInterface:
@@ -17,24 +22,61 @@ class SUMOInterface:
     Connects the SUMO traffic simulator with the Multi-Agent Reinforcement Learning environment.
 
     Features:
-        - SUMO startup and shutdown via TraCI
+        - SUMO startup and shutdown via TraCI, on a connection owned by this instance
+          (several interfaces can run side by side in one process or across threads)
+        - In-process libsumo backend (no socket round-trips) when installed
         - Automatic SUMO binary path detection (macOS compatible)
         - State extraction for each traffic light agent
+        - Subscription-based batched state extraction (one read per step)
+        - TraCI call counting for profiling
+        - Warm-started resets from cached simulation state snapshots
         - Reward and cost computation based on traffic performance
     """
 
-    def __init__(self, sumo_cfg_path=None, gui=False, scenario='medium'):
+    def __init__(self, sumo_cfg_path=None, gui=False, scenario='medium', use_subscriptions=True, api=None,
+                 pool=None, backend=SUMO_BACKEND):
+        """
+        Args:
+            backend (str): 'traci' (default), 'libsumo', 'auto' or 'fake' (see
+                backends.get_backend). libsumo runs one simulation per process: with
+                'libsumo' a second interface fails to start, with 'auto' it uses
+                TraCI instead.
+            api: TraCI-like module to drive the simulation with; overrides backend
+                (e.g. a shared FakeTraCI)
+            pool (SUMOProcessPool): Take the SUMO process from this pool and return it
+                on end() instead of launching and killing one per episode
+        """
         if sumo_cfg_path is None:
             sumo_cfg_path = get_sumo_config_file(scenario)
         self.sumo_cfg_path = os.path.abspath(sumo_cfg_path)
+        self.scenario = scenario
         self.gui = gui
         self.route_file = None
         self.tls_ids = []
+        self.use_subscriptions = use_subscriptions
+        self.topology = None
+        self.state_engine = None
+        self.metrics_collector = None
+        self.running = False
+        self.pool = pool
+        self.backend = backend
+        self._api = get_backend(backend, gui) if api is None else api
+        self._conn = None
+        # (config, route file) the running process was started or last loaded with
+        self._loaded_with = None
+        # All TraCI traffic goes through this counting proxy, bound to our connection in start()
+        self._traci = TraCICallCounter(self._api)
         self._initialize_metrics()
         self.step_count = 0
 
         # macOS-specific SUMO binary resolution
-        self.sumo_binary = self._find_sumo_binary(gui)
+        try:
+            self.sumo_binary = self._find_sumo_binary(gui)
+        except FileNotFoundError:
+            if is_libsumo(self._api) or getattr(self._api, '__name__', '') == 'traci':
+                raise
+            # Fake backends never launch the binary
+            self.sumo_binary = 'sumo-gui' if gui else 'sumo'
         print(f"[INFO] Using SUMO binary: {self.sumo_binary}")
 
     # --------------------------------------------------------------------------
@@ -85,11 +127,8 @@ class SUMOInterface:
     # --------------------------------------------------------------------------
     # SUMO Startup and Shutdown
     # --------------------------------------------------------------------------
-    def start(self, seed=None):
-        """Start the SUMO simulation."""
-        if not os.path.exists(self.sumo_cfg_path):
-            raise FileNotFoundError(f"SUMO configuration not found: {self.sumo_cfg_path}")
-
+    def _sumo_command(self, seed=None):
+        """Full SUMO command line (binary first) for this configuration."""
         sumo_cmd = [
             self.sumo_binary,
             "-c", self.sumo_cfg_path,
@@ -101,26 +140,131 @@ class SUMOInterface:
             "--time-to-teleport", "300",
             "--collision.action", "warn",
             "--emergencydecel.warning-threshold", "4.0",
+            "--save-state.rng", "true",
         ]
 
         if self.route_file:
             sumo_cmd.extend(["-r", self.route_file])
         if seed is not None:
             sumo_cmd.extend(["--seed", str(seed)])
+        return sumo_cmd
+
+    def start(self, seed=None):
+        """Start the SUMO simulation."""
+        if not os.path.exists(self.sumo_cfg_path):
+            raise FileNotFoundError(f"SUMO configuration not found: {self.sumo_cfg_path}")
 
-        print(f"[INFO] Starting SUMO simulation with config: {self.sumo_cfg_path}")
-        traci.start(sumo_cmd, label=str(time.time()))
-        self.tls_ids = traci.trafficlight.getIDList()
+        if self.pool is None and is_libsumo(self._api) and not claim_libsumo(self):
+            if self.backend == 'libsumo':
+                raise RuntimeError("libsumo is already running a simulation in this process")
+            print("[WARN] libsumo is busy in this process, using TraCI")
+            self._api = traci
+
+        if self.pool is not None:
+            # Reuse a pooled process
+            self._conn = self.pool.acquire(self._sumo_command(seed))
+        elif is_libsumo(self._api):
+            # In-process simulation: the module itself is the connection
+            print(f"[INFO] Starting SUMO (libsumo) with config: {self.sumo_cfg_path}")
+            self._api.start(self._sumo_command(seed))
+            self._conn = self._api
+        else:
+            print(f"[INFO] Starting SUMO simulation with config: {self.sumo_cfg_path}")
+            label = f"sumo-{os.getpid()}-{next(_LABELS)}"
+            with TRACI_START_LOCK:
+                # Don't switch the global traci connection; we only use our own
+                self._api.start(self._sumo_command(seed), label=label, doSwitch=False)
+                self._conn = self._api.getConnection(label)
+        self._traci.bind(self._conn)
+        self.running = True
+        self._loaded_with = (self.sumo_cfg_path, self.route_file)
+        self.tls_ids = self._traci.trafficlight.getIDList()
         print(f"[INFO] Detected {len(self.tls_ids)} traffic lights: {self.tls_ids}")
 
+        # Lane/approach index and phase counts never change during an episode
+        self.topology = TopologyIndex.from_traci(self._traci, self.tls_ids)
+        self._attach()
+
+    def _attach(self):
+        """(Re)subscribe the state engine and metrics collector and clear the metrics."""
+        if self.use_subscriptions:
+            self.state_engine = SubscriptionStateEngine(self._traci, self.topology)
+            self.metrics_collector = VehicleMetricsCollector(self._traci)
         self._initialize_metrics()
 
+    def detect_tls_ids(self):
+        """
+        Traffic light IDs of the loaded network: the live list while SUMO runs,
+        otherwise read from the network file (or the fake backend's own grid).
+        """
+        if self.running:
+            return list(self.tls_ids)
+        if hasattr(self._api, 'network_tls_ids'):
+            return list(self._api.network_tls_ids())
+        return traffic_light_ids(get_net_file(self.sumo_cfg_path))
+
+    @property
+    def city(self):
+        """Name of the network directory (scenarios/<city>/<scenario>/osm.sumocfg)."""
+        return os.path.basename(os.path.dirname(os.path.dirname(self.sumo_cfg_path)))
+
+    def warm_start(self, cache, seed=None):
+        """
+        Reset the simulation to a warmed-up state from the snapshot cache.
+
+        On a hit the cached state is loaded into the running SUMO process (which is
+        started first if needed). On a miss the network is reloaded from t=0 in the
+        running process (or a new one), simulated for cache.warmup_steps and saved.
+        A saved state does not carry the demand, so a process running with another
+        configuration or route file (update_route_file) is reloaded before the state
+        is loaded into it. Loading a state drops all subscriptions, so they are set
+        up again.
+
+        Args:
+            cache (SnapshotCache): Snapshot store
+            seed (int): SUMO seed, part of the cache key
+        Returns:
+            bool: True if a cached snapshot was loaded
+        """
+        path = cache.lookup(self.city, self.scenario, seed, self.sumo_cfg_path, self.route_file)
+        hit = path is not None
+        if not self.running:
+            self.start(seed=seed)
+        elif not hit or self._loaded_with != (self.sumo_cfg_path, self.route_file):
+            # Same process, network replayed from t=0 with the requested seed and demand
+            self._traci.load(self._sumo_command(seed)[1:])
+            self._loaded_with = (self.sumo_cfg_path, self.route_file)
+
+        if hit:
+            self._traci.simulation.loadState(path)
+        else:
+            for _ in range(cache.warmup_steps):
+                self._traci.simulationStep()
+            with cache.writer(self.city, self.scenario, seed, self.sumo_cfg_path, self.route_file) as tmp_path:
+                self._traci.simulation.saveState(tmp_path)
+
+        self._attach()
+        return hit
+
     def end(self):
         """Terminate SUMO safely."""
+        self.state_engine = None
+        self.metrics_collector = None
+        self.topology = None
+        self.running = False
+        self._loaded_with = None
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self.pool is not None:
+            self.pool.release(conn)
+            return
         try:
-            traci.close()
+            conn.close()
         except Exception as e:
             print(f"[WARN] Error closing TraCI: {e}")
+        if is_libsumo(conn):
+            release_libsumo(self)
 
     # --------------------------------------------------------------------------
     # Environment Interaction
@@ -133,11 +277,12 @@ class SUMOInterface:
         """
         try:
             if action == 1:  # Switch to next phase
-                current_phase = traci.trafficlight.getPhase(tls_id)
-                total_phases = len(traci.trafficlight.getAllProgramLogics(tls_id)[0].phases)
+                # Plain int: libsumo's bindings reject NumPy integers
+                total_phases = int(self.topology.num_phases[self.topology.tls_index[tls_id]])
                 if total_phases > 0:  # Only switch if we have valid phases
+                    current_phase = self._traci.trafficlight.getPhase(tls_id)
                     next_phase = (current_phase + 1) % total_phases
-                    traci.trafficlight.setPhase(tls_id, next_phase)
+                    self._traci.trafficlight.setPhase(tls_id, next_phase)
             # For action 0, we do nothing (stay in current phase)
         except Exception as e:
             print(f"[ERROR] Failed to apply action on {tls_id}: {e}")
@@ -146,10 +291,10 @@ class SUMOInterface:
         """Retrieve the state vector S_i(t) for intersection 'tls_id'."""
         try:
             state_features = []
-            current_phase = float(traci.trafficlight.getPhase(tls_id))
+            current_phase = float(self._traci.trafficlight.getPhase(tls_id))
             state_features.append(current_phase)
 
-            controlled_lanes = traci.trafficlight.getControlledLanes(tls_id)
+            controlled_lanes = self._traci.trafficlight.getControlledLanes(tls_id)
             approaches = {'N': [], 'S': [], 'E': [], 'W': []}
 
             for lane in controlled_lanes:
@@ -166,14 +311,14 @@ class SUMOInterface:
 
             for direction in ['N', 'S', 'E', 'W']:
                 lanes = approaches[direction]
-                queue = sum(traci.lane.getLastStepHaltingNumber(l) for l in lanes)
+                queue = sum(self._traci.lane.getLastStepHaltingNumber(l) for l in lanes)
                 state_features.append(float(queue))
 
                 total_speed = 0.0
                 num_vehicles = 0
                 for lane in lanes:
-                    speed = traci.lane.getLastStepMeanSpeed(lane)
-                    num_veh = traci.lane.getLastStepVehicleNumber(lane)
+                    speed = self._traci.lane.getLastStepMeanSpeed(lane)
+                    num_veh = self._traci.lane.getLastStepVehicleNumber(lane)
                     total_speed += speed * num_veh
                     num_vehicles += num_veh
 
@@ -192,30 +337,81 @@ class SUMOInterface:
             print(f"[ERROR] Failed to retrieve state for {tls_id}: {e}")
             return [0.0] * STATE_DIM
 
+    def get_all_states(self, out=None):
+        """
+        Retrieve the (NUM_AGENTS, STATE_DIM) state matrix for all intersections.
+
+        Uses the subscription engine when enabled, otherwise falls back to
+        querying each intersection with get_state(). With `out` (a float32
+        (NUM_AGENTS, STATE_DIM) array) the states are written into it and it is returned.
+        """
+        if self.state_engine is not None:
+            try:
+                return self.state_engine.get_states(out=out)
+            except Exception as e:
+                print(f"[ERROR] Subscription state read failed, falling back to per-lane queries: {e}")
+
+        if self.topology is None:
+            states = np.array([self.get_state(tls_id) for tls_id in self.tls_ids], dtype=np.float32)
+            if out is None:
+                return states
+            out[:] = states
+            return out
+
+        try:
+            # Query each unique lane once and reuse the topology gather/segment-sum
+            lane_api = self._traci.lane
+            lanes = self.topology.lane_ids
+            phases = [self._traci.trafficlight.getPhase(tls_id) for tls_id in self.topology.tls_ids]
+            halting = [lane_api.getLastStepHaltingNumber(lane) for lane in lanes]
+            mean_speed = [lane_api.getLastStepMeanSpeed(lane) for lane in lanes]
+            vehicle_count = [lane_api.getLastStepVehicleNumber(lane) for lane in lanes]
+            return self.topology.compute_states(phases, halting, mean_speed, vehicle_count, out=out)
+        except Exception as e:
+            print(f"[ERROR] Failed to retrieve states: {e}")
+            if out is None:
+                return np.zeros((len(self.tls_ids), STATE_DIM), dtype=np.float32)
+            out.fill(0)
+            return out
+
+    @property
+    def backend_name(self):
+        """Backend actually driving the simulation: 'libsumo', 'traci' or the api's type name."""
+        api = self._conn if self._conn is not None else self._api
+        if is_libsumo(api):
+            return 'libsumo'
+        module = getattr(api, '__module__', None) or getattr(api, '__name__', '')
+        if module.startswith('traci'):
+            return 'traci'
+        return 'fake' if module.endswith('fake_traci') else type(api).__name__
+
+    def get_min_expected_number(self):
+        """Vehicles still in or yet to enter the network (None if it cannot be queried)."""
+        try:
+            return self._traci.simulation.getMinExpectedNumber()
+        except Exception:
+            return None
+
+    @property
+    def traci_call_count(self):
+        """Cumulative number of TraCI calls issued by this interface."""
+        return self._traci.calls
+
     # --------------------------------------------------------------------------
     # Metrics and Reward Calculation
     # --------------------------------------------------------------------------
     def _update_metrics(self):
         """Update internal traffic performance metrics."""
         try:
-            vehicles = traci.vehicle.getIDList()
-            total_waiting = 0.0
-            stopped = 0
-            total_speed = 0.0
-            current_step_vehicle_count = len(vehicles)
+            if self.metrics_collector is not None:
+                total_waiting, stopped, total_speed, current_step_vehicle_count = self.metrics_collector.collect()
+            else:
+                total_waiting, stopped, total_speed, current_step_vehicle_count = self._poll_vehicle_metrics()
 
             if current_step_vehicle_count == 0:
                 self.step_count += 1
                 return
 
-            for vid in vehicles:
-                speed = traci.vehicle.getSpeed(vid)
-                waiting = traci.vehicle.getWaitingTime(vid)
-                total_waiting += waiting
-                total_speed += speed
-                if speed < 0.1:
-                    stopped += 1
-
             self.total_waiting_time += total_waiting
             self.stopped_vehicles += stopped
             self.total_speed += total_speed
@@ -225,27 +421,27 @@ class SUMOInterface:
         except Exception as e:
             print(f"[ERROR] Metric update failed: {e}")
 
+    def _poll_vehicle_metrics(self):
+        """Per-vehicle getter fallback for _update_metrics (two TraCI calls per vehicle)."""
+        vehicles = self._traci.vehicle.getIDList()
+        if len(vehicles) == 0:
+            return 0.0, 0, 0.0, 0
+
+        speeds = np.array([self._traci.vehicle.getSpeed(vid) for vid in vehicles], dtype=np.float64)
+        waiting = np.array([self._traci.vehicle.getWaitingTime(vid) for vid in vehicles], dtype=np.float64)
+        return float(waiting.sum()), int(np.count_nonzero(speeds < STOPPED_SPEED)), float(speeds.sum()), len(vehicles)
+
     def get_global_metrics(self):
         """Compute global reward (R) and cost (C)."""
         if self.total_vehicles == 0:
             return 0.0, 0.0
 
         try:
-            avg_wait = self.total_waiting_time / self.total_vehicles
-            avg_stop_ratio = self.stopped_vehicles / self.total_vehicles
-            avg_speed = self.total_speed / self.total_vehicles
-
-            MAX_SPEED = 13.89  # 50 km/h in m/s
-            MAX_WAIT = 60.0    # 60 seconds
-
-            W_norm = np.clip(avg_wait / MAX_WAIT, 0, 10)
-            S_norm = np.clip(avg_speed / MAX_SPEED, 0, 1)
-            R_norm = np.clip(avg_stop_ratio, 0, 1)
-
-            reward = (2.0 * S_norm) - (1.5 * W_norm) - (1.0 * R_norm)
-            cost = R_norm
+            reward, cost = reward_and_cost(
+                self.total_waiting_time, self.stopped_vehicles, self.total_speed, self.total_vehicles
+            )
 
-            if self.step_count >= 100:
+            if self.step_count >= METRICS_WINDOW:
                 self._initialize_metrics()
 
             return float(reward), float(cost)
@@ -260,7 +456,7 @@ class SUMOInterface:
     def step(self):
         """Advance the SUMO simulation by one step."""
         try:
-            traci.simulationStep()
+            self._traci.simulationStep()
             self._update_metrics()
         except Exception as e:
             print(f"[ERROR] Simulation step failed: {e}")
@@ -0,0 +1,167 @@
+import itertools
+import os
+import threading
+import traci
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.env.backends import TRACI_START_LOCK
+
+
+def _config_of(args):
+    """The -c/--configuration-file value of a SUMO command line (None if absent)."""
+    args = list(args)
+    for flag in ('-c', '--configuration-file'):
+        if flag in args:
+            return os.path.abspath(args[args.index(flag) + 1])
+    return None
+
+
+class SUMOProcessPool:
+    """
+    SUMOProcessPool
+    ---------------
+    Long-lived SUMO processes reused across episodes and scenarios.
+
+    acquire(cmd) hands out a labelled traci.Connection. An idle process started
+    with the same binary is reused by sending it `cmd` through Connection.load
+    (SUMO re-reads the network, routes, seed and options in place); one that ran
+    the same configuration is preferred. Only when no idle process exists is a new
+    one launched. release(conn) returns the process to the pool instead of
+    closing it.
+
+    Processes are health-checked before reuse and on release; a process that
+    died or fails to load is closed and replaced by a fresh launch.
+
+    All calls go through the connection objects, never through the global traci
+    connection, so several environments (or threads) can share one pool.
+    """
+
+    def __init__(self, api=traci, max_idle=None, label_prefix="sumo-pool"):
+        """
+        Args:
+            api: traci-like module used to launch processes (traci, or a FakeTraCI)
+            max_idle (int): Idle processes kept alive per binary (None: unlimited)
+        """
+        self._api = api
+        self.max_idle = max_idle
+        self.label_prefix = label_prefix
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._idle = []          # connections ready for reuse
+        self._info = {}          # label -> {'binary', 'config', 'episodes'}
+        self._in_use = {}        # label -> connection
+        self.launches = 0
+        self.reloads = 0
+        self.restarts = 0
+
+    def __len__(self):
+        return len(self._info)
+
+    # --------------------------------------------------------------------------
+    # Acquire / release
+    # --------------------------------------------------------------------------
+    def acquire(self, sumo_cmd):
+        """
+        Return a connection running `sumo_cmd` (binary followed by its arguments).
+        """
+        binary, args = sumo_cmd[0], list(sumo_cmd[1:])
+        config = _config_of(args)
+        while True:
+            conn = self._take_idle(binary, config)
+            if conn is None:
+                return self._launch(sumo_cmd)
+            label = conn.getLabel()
+            try:
+                conn.load(args)
+            except Exception as e:
+                print(f"[WARN] SUMO process '{label}' failed to reload, restarting: {e}")
+                self._discard(conn)
+                self.restarts += 1
+                continue
+            with self._lock:
+                info = self._info[label]
+                info['config'] = config
+                info['episodes'] += 1
+                self._in_use[label] = conn
+                self.reloads += 1
+            return conn
+
+    def release(self, conn):
+        """Return a connection to the pool (closed instead if it is unhealthy or surplus)."""
+        label = conn.getLabel()
+        with self._lock:
+            self._in_use.pop(label, None)
+            binary = self._info.get(label, {}).get('binary')
+            idle_same_binary = sum(1 for c in self._idle if self._info[c.getLabel()]['binary'] == binary)
+            keep = self.max_idle is None or idle_same_binary < self.max_idle
+        if keep and self.is_healthy(conn):
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            self._discard(conn)
+
+    def _take_idle(self, binary, config):
+        with self._lock:
+            candidates = [c for c in self._idle if self._info[c.getLabel()]['binary'] == binary]
+            if not candidates:
+                return None
+            same_config = [c for c in candidates if self._info[c.getLabel()]['config'] == config]
+            conn = (same_config or candidates)[0]
+            self._idle.remove(conn)
+        if not self.is_healthy(conn):
+            self._discard(conn)
+            self.restarts += 1
+            return self._take_idle(binary, config)
+        return conn
+
+    def _launch(self, sumo_cmd):
+        label = f"{self.label_prefix}-{next(self._ids)}"
+        # The slow launch holds only the start lock, so other threads keep acquiring and releasing
+        with TRACI_START_LOCK:
+            self._api.start(list(sumo_cmd), label=label, doSwitch=False)
+            conn = self._api.getConnection(label)
+        with self._lock:
+            self._info[label] = {'binary': sumo_cmd[0], 'config': _config_of(sumo_cmd[1:]), 'episodes': 1}
+            self._in_use[label] = conn
+            self.launches += 1
+        return conn
+
+    def _discard(self, conn):
+        label = conn.getLabel()
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._info.pop(label, None)
+            self._in_use.pop(label, None)
+
+    # --------------------------------------------------------------------------
+    # Health and shutdown
+    # --------------------------------------------------------------------------
+    @staticmethod
+    def is_healthy(conn):
+        """True if the SUMO process behind `conn` still answers."""
+        try:
+            conn.simulation.getTime()
+            return True
+        except Exception:
+            return False
+
+    def get_stats(self):
+        return {
+            'processes': len(self._info),
+            'idle': len(self._idle),
+            'in_use': len(self._in_use),
+            'launches': self.launches,
+            'reloads': self.reloads,
+            'restarts': self.restarts,
+        }
+
+    def close(self):
+        """Close every pooled process, idle or in use."""
+        with self._lock:
+            conns = self._idle + list(self._in_use.values())
+            self._idle = []
+        for conn in conns:
+            self._discard(conn)
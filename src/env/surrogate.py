@@ -0,0 +1,289 @@
+import numpy as np
+import torch
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import STATE_DIM, MAX_STEPS_PER_EPISODE, RunConfig, parse_grid_size
+from src.env.topology import APPROACHES, NUM_APPROACHES
+from src.env.rewards import reward_and_cost, MAX_SPEED, METRICS_WINDOW
+
+
+# Mean vehicle arrivals per second on each boundary approach lane
+SCENARIO_ARRIVAL_RATES = {'low': 0.02, 'medium': 0.05, 'high': 0.10}
+
+LANES_PER_APPROACH = 2   # Lanes per approach of the synthetic grid
+SATURATION_FLOW = 0.5    # veh/s per lane discharged on green (1800 veh/h)
+LINK_TRAVEL_TIME = 15.0  # Mean seconds between leaving a junction and queueing at the next
+GREEN_TIME = 31          # netconvert default green duration
+YELLOW_TIME = 4
+DEFAULT_NUM_PHASES = 4   # NS green, NS yellow, EW green, EW yellow
+
+# Grid offset (row, col) a vehicle moves by after crossing from each approach
+_TRAVEL_DIRECTION = {'N': (1, 0), 'S': (-1, 0), 'E': (0, -1), 'W': (0, 1)}
+
+
+class SurrogateTrafficSim:
+    """
+    SurrogateTrafficSim
+    -------------------
+    Vectorized queueing model of a signalized network, a fast offline stand-in for SUMO.
+
+    Every intersection has four approaches (N, S, E, W). Each step (1 s):
+        - vehicles arrive at the network boundary (Poisson, rate per scenario)
+        - moving vehicles reach the stop line after ~LINK_TRAVEL_TIME and queue up
+        - green approaches discharge up to SATURATION_FLOW veh/s per lane; on a grid
+          the discharged vehicles travel straight on to the next intersection
+        - signals cycle through their fixed-time program; action 1 switches to the
+          next phase as SUMOInterface.apply_action does
+
+    All state lives in (num_envs, num_intersections, 4) arrays, so one step call
+    advances every environment at once. States use the 12-dim layout of
+    TopologyIndex.compute_states and reward/cost follow SUMOInterface.get_global_metrics
+    (waiting time, stop ratio and speed averaged over a METRICS_WINDOW-step window).
+
+    Approach capacities and phase counts come from a TopologyIndex when one is given
+    (boundary arrivals on every approach, no routing between junctions), otherwise
+    from a synthetic cityNxN grid.
+    """
+
+    def __init__(self, num_envs=1, city='city4x4', scenario='medium', topology=None,
+                 max_steps=MAX_STEPS_PER_EPISODE, seed=None):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.scenario = scenario
+        self.rng = np.random.default_rng(seed)
+
+        if topology is None:
+            self.grid_size = parse_grid_size(city)
+            self._build_grid()
+        else:
+            self.grid_size = None
+            self._build_from_topology(topology)
+
+        # Phase i is green for N/S when i % 4 == 0, for E/W when i % 4 == 2, yellow otherwise
+        max_phases = max(1, int(self.num_phases.max()))
+        phase_ids = np.arange(max_phases)
+        self.phase_durations = np.where(phase_ids % 2 == 0, GREEN_TIME, YELLOW_TIME)
+        is_ns = np.array([d in ('N', 'S') for d in APPROACHES])
+        self._phase_green = np.stack([
+            (phase_ids % 4 == 0)[:, None] & is_ns,
+            (phase_ids % 4 == 2)[:, None] & ~is_ns,
+        ]).any(axis=0)  # (max_phases, 4)
+
+        self.capacity = self.lanes * SATURATION_FLOW
+        self._routed = self.downstream >= 0
+        self.reset()
+
+    # --------------------------------------------------------------------------
+    # Network construction
+    # --------------------------------------------------------------------------
+    def _build_grid(self):
+        n = self.grid_size
+        self.num_intersections = n * n
+        self.lanes = np.full((self.num_intersections, NUM_APPROACHES), LANES_PER_APPROACH, dtype=np.float64)
+        self.num_phases = np.full(self.num_intersections, DEFAULT_NUM_PHASES, dtype=np.int64)
+
+        # Flat (intersection * 4 + approach) index of the approach each one feeds, -1 = leaves the network
+        downstream = np.full((self.num_intersections, NUM_APPROACHES), -1, dtype=np.intp)
+        boundary = np.zeros((self.num_intersections, NUM_APPROACHES), dtype=bool)
+        for r in range(n):
+            for c in range(n):
+                i = r * n + c
+                for a, direction in enumerate(APPROACHES):
+                    dr, dc = _TRAVEL_DIRECTION[direction]
+                    nr, nc = r + dr, c + dc
+                    if 0 <= nr < n and 0 <= nc < n:
+                        downstream[i, a] = (nr * n + nc) * NUM_APPROACHES + a
+                    # Nothing feeds an approach whose upstream neighbour is off the grid
+                    if not (0 <= r - dr < n and 0 <= c - dc < n):
+                        boundary[i, a] = True
+        self.downstream = downstream.ravel()
+        self.boundary = boundary
+
+    def _build_from_topology(self, topology):
+        self.num_intersections = len(topology)
+        # Unique lanes per (intersection, approach) group
+        groups = np.unique(topology.link_lane * topology.num_groups + topology.link_group) % topology.num_groups
+        lanes = np.bincount(groups, minlength=topology.num_groups).astype(np.float64)
+        self.lanes = np.maximum(lanes, 1.0).reshape(self.num_intersections, NUM_APPROACHES)
+        self.num_phases = np.asarray(topology.num_phases, dtype=np.int64)
+        self.downstream = np.full(self.num_intersections * NUM_APPROACHES, -1, dtype=np.intp)
+        self.boundary = lanes.reshape(self.num_intersections, NUM_APPROACHES) > 0
+
+    # --------------------------------------------------------------------------
+    # Simulation
+    # --------------------------------------------------------------------------
+    def reset(self, seed=None, scenario=None):
+        """
+        Resets every environment to an empty network.
+
+        Returns:
+            states: ndarray (num_envs, num_intersections, STATE_DIM)
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        if scenario is not None:
+            self.scenario = scenario
+        rate = SCENARIO_ARRIVAL_RATES.get(self.scenario, SCENARIO_ARRIVAL_RATES['medium'])
+        self.arrival_rate = np.where(self.boundary, rate * self.lanes, 0.0)
+
+        shape = (self.num_envs, self.num_intersections, NUM_APPROACHES)
+        self.queue = np.zeros(shape, dtype=np.int64)
+        self.moving = np.zeros(shape, dtype=np.int64)
+        self.queue_wait = np.zeros(shape, dtype=np.float64)
+        self.phase = np.zeros((self.num_envs, self.num_intersections), dtype=np.int64)
+        self.phase_time = np.zeros((self.num_envs, self.num_intersections), dtype=np.int64)
+        self.current_step = 0
+
+        # Per-env metric accumulators, as SUMOInterface._initialize_metrics
+        self.total_waiting_time = np.zeros(self.num_envs)
+        self.stopped_vehicles = np.zeros(self.num_envs)
+        self.total_speed = np.zeros(self.num_envs)
+        self.total_vehicles = np.zeros(self.num_envs)
+        self.step_count = np.zeros(self.num_envs, dtype=np.int64)
+        return self.get_states()
+
+    def _reset_metrics(self, mask):
+        for accumulator in (self.total_waiting_time, self.stopped_vehicles, self.total_speed,
+                            self.total_vehicles, self.step_count):
+            accumulator[mask] = 0
+
+    def apply_actions(self, actions):
+        """actions: (num_envs, num_intersections) array, 1 = switch to the next phase."""
+        actions = np.asarray(actions).reshape(self.num_envs, self.num_intersections)
+        switch = (actions == 1) & (self.num_phases > 0)
+        self.phase = np.where(switch, (self.phase + 1) % np.maximum(self.num_phases, 1), self.phase)
+        self.phase_time[switch] = 0
+
+    def step(self, actions, states_out=None):
+        """
+        Applies the actions and advances every environment by one second.
+        The states are written into states_out if given (see get_states).
+
+        Returns:
+            states: ndarray (num_envs, num_intersections, STATE_DIM)
+            rewards, costs: ndarray (num_envs,)
+            done: bool (all environments share the episode clock)
+        """
+        self.apply_actions(actions)
+        rng = self.rng
+
+        # 1. Discharge green approaches; signals without a program never block
+        green = np.where((self.num_phases > 0)[..., None], self._phase_green[self.phase], True)
+        capacity = np.floor(self.capacity + rng.random(self.queue.shape)).astype(np.int64)
+        served = np.where(green, np.minimum(self.queue, capacity), 0)
+        # FIFO mean-field: served vehicles take their share of the accumulated waiting time
+        remaining = np.where(self.queue > 0, 1.0 - served / np.maximum(self.queue, 1), 1.0)
+        self.queue_wait *= remaining
+        self.queue -= served
+
+        # 2. Route discharged vehicles to the downstream approach (or out of the network)
+        flat_served = served.reshape(self.num_envs, -1)
+        if self._routed.any():
+            # Every approach has at most one upstream approach, so the targets are unique
+            self.moving.reshape(self.num_envs, -1)[:, self.downstream[self._routed]] += flat_served[:, self._routed]
+
+        # 3. Moving vehicles reach the stop line, new vehicles enter at the boundary
+        joining = rng.binomial(self.moving, 1.0 / LINK_TRAVEL_TIME)
+        self.moving -= joining
+        self.queue += joining
+        self.moving += rng.poisson(self.arrival_rate, size=self.moving.shape)
+
+        # 4. Queued vehicles wait; fixed-time program advances
+        self.queue_wait += self.queue
+        self.phase_time += 1
+        expired = (self.num_phases > 0) & (self.phase_time >= self.phase_durations[self.phase])
+        self.phase = np.where(expired, (self.phase + 1) % np.maximum(self.num_phases, 1), self.phase)
+        self.phase_time[expired] = 0
+
+        self.current_step += 1
+        rewards, costs = self._update_metrics()
+        done = self.current_step >= self.max_steps
+        return self.get_states(out=states_out), rewards, costs, done
+
+    def _update_metrics(self):
+        """Accumulates the windowed metrics and returns per-env (rewards, costs)."""
+        self.total_waiting_time += self.queue_wait.sum(axis=(1, 2))
+        self.stopped_vehicles += self.queue.sum(axis=(1, 2))
+        self.total_speed += self.moving.sum(axis=(1, 2)) * MAX_SPEED
+        self.total_vehicles += (self.queue + self.moving).sum(axis=(1, 2))
+        self.step_count += 1
+
+        rewards, costs = reward_and_cost(self.total_waiting_time, self.stopped_vehicles,
+                                         self.total_speed, self.total_vehicles)
+        self._reset_metrics((self.total_vehicles > 0) & (self.step_count >= METRICS_WINDOW))
+        return rewards, costs
+
+    def get_states(self, out=None):
+        """(num_envs, num_intersections, STATE_DIM) float32 state matrix, written into `out` if given."""
+        if out is None:
+            states = np.zeros((self.num_envs, self.num_intersections, STATE_DIM), dtype=np.float32)
+        else:
+            states = out
+            states[..., 1 + 2 * NUM_APPROACHES:] = 0
+        states[..., 0] = self.phase
+        states[..., 1:1 + 2 * NUM_APPROACHES:2] = self.queue
+        states[..., 2:2 + 2 * NUM_APPROACHES:2] = self.moving * MAX_SPEED / np.maximum(1, self.queue + self.moving)
+        return states
+
+
+class SurrogateVectorEnv:
+    """
+    VectorTrafficEnv-compatible wrapper around SurrogateTrafficSim.
+
+    All K environments are stepped by one in-process call. Like VectorTrafficEnv,
+    finished episodes are reset automatically and infos[k]['terminal_observation']
+    holds their last observation.
+    """
+
+    def __init__(self, num_envs, city='city4x4', scenario='medium', topology=None,
+                 max_steps=None, config=None):
+        """
+        Args:
+            max_steps (int): Episode length (default config.max_steps_per_episode)
+            config (RunConfig): Episode length default and device of the returned tensors
+        """
+        self.config = config or RunConfig()
+        self.device = self.config.device
+        if max_steps is None:
+            max_steps = self.config.max_steps_per_episode
+        self.sim = SurrogateTrafficSim(num_envs, city=city, scenario=scenario,
+                                       topology=topology, max_steps=max_steps)
+        self.num_envs = num_envs
+        self.num_agents = self.sim.num_intersections
+        if self.config.num_agents != self.num_agents:
+            self.config = self.config.override(num_agents=self.num_agents)
+        self.scenario = scenario
+        self._actions = None
+
+    def reset(self, seed=None, scenario=None):
+        return torch.as_tensor(self.sim.reset(seed=seed, scenario=scenario), device=self.device)
+
+    def step_async(self, actions):
+        if isinstance(actions, torch.Tensor):
+            actions = actions.detach().cpu().numpy()
+        self._actions = actions
+
+    def step_wait(self):
+        states, rewards, costs, done = self.sim.step(self._actions)
+        infos = [{'global_reward': float(r), 'global_cost': float(c), 'scenario': self.sim.scenario}
+                 for r, c in zip(rewards, costs)]
+        if done:
+            for k, info in enumerate(infos):
+                info['terminal_observation'] = states[k]
+            states = self.sim.reset()
+
+        shape = (self.num_envs, self.num_agents, 1)
+        return (
+            torch.as_tensor(states, device=self.device),
+            torch.as_tensor(rewards, dtype=torch.float32, device=self.device).view(-1, 1, 1).expand(shape).contiguous(),
+            torch.as_tensor(costs, dtype=torch.float32, device=self.device).view(-1, 1, 1).expand(shape).contiguous(),
+            torch.full((self.num_envs,), done, dtype=torch.bool, device=self.device),
+            infos,
+        )
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self):
+        pass
@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+import torch
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import DEVICE
+from src.env.traffic_env import TrafficEnv
+from src.env.padding import agent_mask, pad_agents
+
+
+class ThreadedVectorTrafficEnv:
+    """
+    Runs K TrafficEnv instances in one process, stepped concurrently by a thread pool.
+
+    Each environment talks to its own SUMO process through its own traci.Connection,
+    and the threads spend most of a step blocked on TraCI socket I/O, which releases
+    the GIL; the K SUMO processes therefore simulate in parallel without worker
+    processes, pipes or shared memory. Best suited to SUMO, where the Python side of
+    a step is small compared to the simulation.
+
+    The environments use the TraCI backend: libsumo allows only one simulation per
+    process and would hold the GIL while simulating.
+
+    Same interface as VectorTrafficEnv: (K, num_agents) actions in, stacked tensors
+    out, automatic reset with infos[k]['terminal_observation'] and infos[k]['step_time'].
+
+    With `cities` (one network per environment) the agent counts may differ: the
+    outputs are then padded to the largest count, and agent_mask (K, num_agents)
+    marks the real agents. Actions for padding slots are ignored.
+    """
+
+    def __init__(self, num_envs, gui=False, use_sumo=True, scenario='medium', pool=None, cities=None,
+                 **env_kwargs):
+        env_kwargs.setdefault('backend', 'traci')
+        cities = list(cities) if cities is not None else [env_kwargs.pop('city', 'city4x4')] * num_envs
+        if len(cities) != num_envs:
+            raise ValueError(f"Got {len(cities)} cities for {num_envs} environments")
+        self.num_envs = num_envs
+        self.scenario = scenario
+        self.envs = [TrafficEnv(gui=gui, use_sumo=use_sumo, scenario=scenario, pool=pool, city=city, **env_kwargs)
+                     for city in cities]
+        self._update_agent_counts()
+        self._executor = ThreadPoolExecutor(max_workers=num_envs, thread_name_prefix="traffic-env")
+        self._futures = None
+        self._seeds = [None] * num_envs
+        self._episodes = [0] * num_envs
+        self.closed = False
+
+    def _update_agent_counts(self):
+        # SUMO reports the final traffic light list once a simulation is loaded
+        counts = [env.num_agents for env in self.envs]
+        self.num_agents = max(counts)
+        self.padded = min(counts) != self.num_agents
+        self.agent_mask = agent_mask(counts, self.num_agents, device=DEVICE)
+
+    def _stack(self, tensors):
+        if self.padded:
+            return pad_agents(tensors, self.num_agents)[0].to(DEVICE)
+        return torch.stack(tensors).to(DEVICE)
+
+    def _map(self, fn, *iterables):
+        return list(self._executor.map(fn, *iterables))
+
+    def reset(self, seed=None, scenario=None):
+        """
+        Resets all environments. Environment k is seeded with seed + k.
+
+        Returns:
+            states: Tensor (K, num_agents, STATE_DIM)
+        """
+        self.scenario = scenario or self.scenario
+        self._seeds = [None if seed is None else seed + k for k in range(self.num_envs)]
+        self._episodes = [0] * self.num_envs
+        states = self._map(lambda env, s: env.reset(seed=s, scenario=self.scenario), self.envs, self._seeds)
+        self._update_agent_counts()
+        return self._stack(states)
+
+    def _step_env(self, k, actions):
+        env = self.envs[k]
+        t0 = time.perf_counter()
+        next_states, rewards, costs, done, info = env.step(actions)
+        info = dict(info, step_time=time.perf_counter() - t0)
+        if done:
+            info['terminal_observation'] = next_states.cpu().numpy()
+            self._episodes[k] += 1
+            seed = self._seeds[k]
+            episode_seed = None if seed is None else seed + self.num_envs * self._episodes[k]
+            next_states = env.reset(seed=episode_seed, scenario=self.scenario)
+        return next_states, rewards, costs, done, info
+
+    def step_async(self, actions):
+        """Starts stepping every environment with (K, num_agents) actions."""
+        actions = torch.as_tensor(actions).detach().cpu().reshape(self.num_envs, self.num_agents)
+        self._futures = [self._executor.submit(self._step_env, k, actions[k, :env.num_agents])
+                         for k, env in enumerate(self.envs)]
+
+    def step_wait(self):
+        """Waits for the step started by step_async and returns the stacked results."""
+        results = [future.result() for future in self._futures]
+        self._futures = None
+        next_states, rewards, costs, dones, infos = zip(*results)
+        return (
+            self._stack(next_states),
+            self._stack(rewards),
+            self._stack(costs),
+            torch.tensor(dones, dtype=torch.bool, device=DEVICE),
+            list(infos),
+        )
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self):
+        if self.closed:
+            return
+        if self._futures is not None:
+            for future in self._futures:
+                future.exception()
+        self._map(lambda env: env.close(), self.envs)
+        self._executor.shutdown(wait=True)
+        self.closed = True
+
+    def __del__(self):
+        if not getattr(self, 'closed', True):
+            self.close()
@@ -0,0 +1,193 @@
+import gzip
+import os
+import xml.etree.ElementTree as ET
+from types import MappingProxyType
+import numpy as np
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import STATE_DIM
+
+
+APPROACHES = ('N', 'S', 'E', 'W')
+NUM_APPROACHES = len(APPROACHES)
+
+
+def lane_approach(lane_id):
+    """Classify a lane into an N/S/E/W approach from its ID suffix (defaults to 'N')."""
+    for direction in APPROACHES:
+        if lane_id.endswith(direction):
+            return direction
+    return 'N'
+
+
+def get_net_file(sumo_cfg_path):
+    """Return the absolute path of the network file referenced by a .sumocfg."""
+    root = ET.parse(sumo_cfg_path).getroot()
+    node = root.find('./input/net-file')
+    if node is None:
+        raise ValueError(f"No <net-file> entry in SUMO configuration: {sumo_cfg_path}")
+    cfg_dir = os.path.dirname(os.path.abspath(sumo_cfg_path))
+    return os.path.join(cfg_dir, node.get('value'))
+
+
+def traffic_light_ids(net_path):
+    """
+    Sorted IDs of the traffic lights of a .net.xml(.gz), as TraCI lists them: every
+    <tlLogic> plus the rail signals, whose programs SUMO generates at load time.
+    Streams the file instead of building a sumolib net.
+    """
+    opener = gzip.open if net_path.endswith('.gz') else open
+    ids = set()
+    with opener(net_path, 'rb') as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == 'tlLogic' or (elem.tag == 'junction' and elem.get('type') == 'rail_signal'):
+                ids.add(elem.get('id'))
+            elem.clear()
+    return sorted(ids)
+
+
+def _readonly(array):
+    array.setflags(write=False)
+    return array
+
+
+class TopologyIndex:
+    """
+    TopologyIndex
+    -------------
+    Immutable lane/approach index of the controlled intersections of a network.
+
+    Built once per network load, it replaces the per-step getControlledLanes calls and
+    lane-suffix classification with flat integer arrays:
+
+        - lane_ids:    unique controlled lanes; a lane's position is its slot
+        - link_lane:   lane slot of every controlled link (TraCI link order, with
+                       the same lane repeated for each link it feeds)
+        - link_group:  approach group of every link, tls_index * 4 + approach
+        - num_phases:  phase count of the first program of each TLS
+        - approach_mask: (num_tls, 4) bool, True where the TLS controls lanes
+                       from that approach (False slots of the state are padding)
+
+    Per-step features are then a gather of lane values by link_lane followed by a
+    segment sum over link_group.
+    """
+
+    def __init__(self, tls_ids, controlled_lanes, num_phases):
+        """
+        Args:
+            tls_ids (sequence): Traffic light IDs, in agent order
+            controlled_lanes (dict): TLS ID -> list of controlled lanes (one per link)
+            num_phases (dict): TLS ID -> number of phases
+        """
+        self.tls_ids = tuple(tls_ids)
+        self.tls_index = MappingProxyType({tls_id: i for i, tls_id in enumerate(self.tls_ids)})
+
+        lane_slots = {}
+        link_lane, link_group = [], []
+        for i, tls_id in enumerate(self.tls_ids):
+            for lane in controlled_lanes[tls_id]:
+                if not lane:
+                    continue
+                slot = lane_slots.setdefault(lane, len(lane_slots))
+                link_lane.append(slot)
+                link_group.append(i * NUM_APPROACHES + APPROACHES.index(lane_approach(lane)))
+
+        self.lane_ids = tuple(lane_slots)
+        self.link_lane = _readonly(np.asarray(link_lane, dtype=np.intp))
+        self.link_group = _readonly(np.asarray(link_group, dtype=np.intp))
+        self.num_phases = _readonly(np.asarray([num_phases[t] for t in self.tls_ids], dtype=np.int64))
+        self.num_groups = len(self.tls_ids) * NUM_APPROACHES
+        self.approach_mask = _readonly(
+            (np.bincount(self.link_group, minlength=self.num_groups) > 0).reshape(-1, NUM_APPROACHES)
+        )
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            raise AttributeError(f"TopologyIndex is immutable; cannot reassign '{name}'")
+        super().__setattr__(name, value)
+
+    def __len__(self):
+        return len(self.tls_ids)
+
+    @property
+    def num_lanes(self):
+        return len(self.lane_ids)
+
+    # --------------------------------------------------------------------------
+    # Construction
+    # --------------------------------------------------------------------------
+    @classmethod
+    def from_traci(cls, api, tls_ids=None):
+        """Build the index from a running simulation (traci module, Connection or libsumo)."""
+        if tls_ids is None:
+            tls_ids = api.trafficlight.getIDList()
+        controlled_lanes, num_phases = {}, {}
+        for tls_id in tls_ids:
+            controlled_lanes[tls_id] = list(api.trafficlight.getControlledLanes(tls_id))
+            logics = api.trafficlight.getAllProgramLogics(tls_id)
+            num_phases[tls_id] = len(logics[0].phases) if logics else 0
+        return cls(tls_ids, controlled_lanes, num_phases)
+
+    @classmethod
+    def from_net_file(cls, net_path, tls_ids=None):
+        """
+        Build the index from a .net.xml(.gz) with sumolib, without starting SUMO.
+
+        Signals whose program SUMO generates at load time (e.g. rail signals) have
+        no <tlLogic> in the file and get a phase count of 0, as TraCI reports them.
+        """
+        import sumolib
+        net = sumolib.net.readNet(net_path, withPrograms=True)
+        lights = {tls.getID(): tls for tls in net.getTrafficLights()}
+        if tls_ids is None:
+            # TraCI lists traffic lights in sorted order
+            tls_ids = sorted(lights)
+
+        controlled_lanes, num_phases = {}, {}
+        for tls_id in tls_ids:
+            tls = lights[tls_id]
+            connections = tls.getConnections()
+            lanes = [''] * (max((link for _, _, link in connections), default=-1) + 1)
+            for in_lane, _, link in connections:
+                lanes[link] = in_lane.getID()
+            controlled_lanes[tls_id] = lanes
+
+            programs = list(tls.getPrograms().values())
+            num_phases[tls_id] = len(programs[0].getPhases()) if programs else 0
+        return cls(tls_ids, controlled_lanes, num_phases)
+
+    @classmethod
+    def from_sumo_config(cls, sumo_cfg_path, tls_ids=None):
+        """Build the index from the network referenced by a .sumocfg."""
+        return cls.from_net_file(get_net_file(sumo_cfg_path), tls_ids)
+
+    # --------------------------------------------------------------------------
+    # Feature computation
+    # --------------------------------------------------------------------------
+    def compute_states(self, phases, halting, mean_speed, vehicle_count, out=None):
+        """
+        Build the (num_tls, STATE_DIM) state matrix from per-lane arrays.
+
+        Args:
+            phases: Current phase per TLS, shape (num_tls,)
+            halting, mean_speed, vehicle_count: Per-lane values in lane slot order, shape (num_lanes,)
+            out: Optional float32 (num_tls, STATE_DIM) array to write the states into
+        """
+        count = np.asarray(vehicle_count, dtype=np.float64)[self.link_lane]
+        halt = np.asarray(halting, dtype=np.float64)[self.link_lane]
+        speed_sum = np.asarray(mean_speed, dtype=np.float64)[self.link_lane] * count
+
+        queues = np.bincount(self.link_group, weights=halt, minlength=self.num_groups)
+        speeds = np.bincount(self.link_group, weights=speed_sum, minlength=self.num_groups)
+        counts = np.bincount(self.link_group, weights=count, minlength=self.num_groups)
+
+        shape = (len(self.tls_ids), NUM_APPROACHES)
+        if out is None:
+            states = np.zeros((len(self.tls_ids), STATE_DIM), dtype=np.float32)
+        else:
+            states = out
+            states[:, 2 * NUM_APPROACHES + 1:] = 0
+        states[:, 0] = phases
+        states[:, 1:1 + 2 * NUM_APPROACHES:2] = queues.reshape(shape)
+        states[:, 2:2 + 2 * NUM_APPROACHES:2] = (speeds / np.maximum(1.0, counts)).reshape(shape)
+        return states
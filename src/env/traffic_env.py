@@ -1,23 +1,108 @@
 import os
+import time
+import numpy as np
 import torch
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from src.config import NUM_AGENTS, MAX_STEPS_PER_EPISODE, DEVICE, STATE_DIM, get_sumo_config_file
+from src.config import SUMO_BACKEND, RunConfig, get_sumo_config_file, parse_grid_size
 from src.env.sumo_interface import SUMOInterface
+from src.env.surrogate import SurrogateTrafficSim
+from src.env.topology import get_net_file, traffic_light_ids
+
+
+def detect_num_agents(use_sumo=True, scenario='medium', city='city4x4'):
+    """Agent (traffic light) count of the network a TrafficEnv with these arguments loads."""
+    if not use_sumo:
+        return parse_grid_size(city) ** 2
+    return len(traffic_light_ids(get_net_file(get_sumo_config_file(scenario, city))))
 
 
 class TrafficEnv:
-    """Multi-Agent Traffic Environment wrapper."""
-    def __init__(self, gui=False, use_sumo=True, scenario='medium'):
+    """
+    Multi-Agent Traffic Environment wrapper.
+
+    With use_sumo=False the environment runs on SurrogateTrafficSim, a NumPy queueing
+    model of the cityNxN grid given by `city`, instead of SUMO.
+
+    With a SnapshotCache, reset() loads a warmed-up simulation state into the running
+    SUMO process instead of relaunching SUMO (see SUMOInterface.warm_start). With a
+    SUMOProcessPool, each episode reuses a pooled SUMO process. `backend` selects how
+    SUMO is driven ('traci' by default, 'libsumo', 'auto' or 'fake', see SUMOInterface).
+
+    With a route_provider (a RoutePrefetcher from RouteCache.prefetch), each reset
+    switches to the next pre-generated route file if one is ready, and otherwise
+    keeps the current demand rather than waiting.
+
+    `config` (a RunConfig, default RunConfig()) gives the episode length and the
+    device of the returned tensors. The agent count is detected from the network
+    (its traffic lights, or the surrogate grid) and written back into self.config,
+    so PPOTrainer(config=env.config) sizes its buffer and batches to match.
+
+    With staging=True the observations, rewards and costs are written into two
+    preallocated slots that reset/step alternate between, so a step constructs no
+    new tensors: the simulator fills a (pinned, on CUDA) NumPy view of the slot in
+    place. The returned tensors are overwritten two steps later, so store or copy
+    them before then (a rollout loop that stores each transition right away is fine).
+    """
+    def __init__(self, gui=False, use_sumo=True, scenario='medium', city='city4x4',
+                 snapshot_cache=None, api=None, pool=None, backend=SUMO_BACKEND,
+                 route_provider=None, config=None, staging=False):
+        self.config = config or RunConfig()
+        self.device = self.config.device
+        self.max_steps = self.config.max_steps_per_episode
         self.use_sumo = use_sumo
         self.scenario = scenario
+        self.snapshot_cache = snapshot_cache
+        self.route_provider = route_provider
+        self.staging = staging
+        self._host_states = None
+        self._slot = 0
         if use_sumo:
-            self.sumo = SUMOInterface(gui=gui, scenario=scenario)
+            self.sumo = SUMOInterface(sumo_cfg_path=get_sumo_config_file(scenario, city), gui=gui,
+                                      scenario=scenario, api=api, pool=pool, backend=backend)
+            self._set_num_agents(len(self.sumo.detect_tls_ids()))
+        else:
+            self.surrogate = SurrogateTrafficSim(num_envs=1, city=city, scenario=scenario, max_steps=self.max_steps)
+            self._set_num_agents(self.surrogate.num_intersections)
         # Track whether SUMO is currently running for safe restarts
         self.sumo_running = False
         self.current_step = 0
-        self.num_agents = NUM_AGENTS
+        self._last_metrics = (0.0, 0.0)
         self._scenario = None
+
+    def _set_num_agents(self, num_agents):
+        self.num_agents = num_agents
+        if self.config.num_agents != num_agents:
+            self.config = self.config.override(num_agents=num_agents)
+        if self.staging and (self._host_states is None or self._host_states.shape[1] != num_agents):
+            self._allocate_staging()
+
+    def _allocate_staging(self):
+        """Two (num_agents, ·) slots for states, rewards and costs; see the class docstring."""
+        shape = (2, self.num_agents)
+        pinned = torch.device(self.device).type == 'cuda'
+        self._host_states = torch.zeros(shape + (self.config.state_dim,), dtype=torch.float32, pin_memory=pinned)
+        self._host_states_np = self._host_states.numpy()
+        self._states = torch.zeros_like(self._host_states, device=self.device) if pinned else self._host_states
+        self._rewards = torch.zeros(shape + (1,), dtype=torch.float32, device=self.device)
+        self._costs = torch.zeros(shape + (1,), dtype=torch.float32, device=self.device)
+
+    def _next_slot(self):
+        self._slot ^= 1
+        return self._slot
+
+    def _staged_states(self, slot):
+        """The slot's states on self.device (an async copy from pinned memory on CUDA)."""
+        if self._states is not self._host_states:
+            self._states[slot].copy_(self._host_states[slot], non_blocking=True)
+        return self._states[slot]
+
+    def _global_tensors(self, global_reward, global_cost, slot=None):
+        """(num_agents, 1) reward and cost tensors holding the global values."""
+        if slot is None:
+            return (torch.full((self.num_agents, 1), global_reward, device=self.device),
+                    torch.full((self.num_agents, 1), global_cost, device=self.device))
+        return self._rewards[slot].fill_(global_reward), self._costs[slot].fill_(global_cost)
         
     def reset(self, seed=None, scenario='medium'):
         """
@@ -27,8 +112,27 @@ class TrafficEnv:
             scenario (str): Traffic scenario ('low', 'medium', 'high')
         """
         self.current_step = 0
-        
-        if self.use_sumo:
+
+        if self.use_sumo and self.route_provider is not None:
+            route_file = self.route_provider.poll()
+            if route_file is not None:
+                self.sumo.update_route_file(route_file)
+
+        if self.use_sumo and self.snapshot_cache is not None:
+            self._scenario = scenario
+            t0 = time.perf_counter()
+            try:
+                hit = self.sumo.warm_start(self.snapshot_cache, seed=seed)
+                self.sumo_running = True
+                self._set_num_agents(len(self.sumo.tls_ids))
+            except Exception as e:
+                print(f"Error warm-starting SUMO: {e}")
+                raise
+            latency = time.perf_counter() - t0
+            self.snapshot_cache.record_reset(latency, hit)
+            print(f"[INFO] Reset {'from snapshot' if hit else 'with warm-up'} in {latency:.3f}s "
+                  f"(snapshot hit rate {self.snapshot_cache.hit_rate:.0%})")
+        elif self.use_sumo:
             if hasattr(self, 'sumo') and self.sumo_running:
                 try:
                     self.sumo.end()
@@ -43,47 +147,67 @@ class TrafficEnv:
                 # 2. Start SUMO with the scenario-specific config
                 self.sumo.start(seed=seed)
                 self.sumo_running = True
+                self._set_num_agents(len(self.sumo.tls_ids))
             except Exception as e:
                 print(f"Error starting SUMO: {e}")
                 raise
-                
+        else:
+            self._scenario = scenario
+            self._last_metrics = (0.0, 0.0)
+            self.surrogate.reset(seed=seed, scenario=scenario)
+
         return self._get_all_agent_states()
 
     def _get_all_agent_states(self):
         """Collects and stacks states for all traffic light agents."""
+        slot = self._next_slot() if self.staging else None
         if not self.use_sumo:
-            # Return dummy states for testing
-            return torch.zeros((self.num_agents, STATE_DIM), device=DEVICE)
+            if slot is not None:
+                self.surrogate.get_states(out=self._host_states_np[slot][None])
+                return self._staged_states(slot)
+            return torch.as_tensor(self.surrogate.get_states()[0], device=self.device)
         
-        states = []
         try:
-            for tls_id in self.sumo.tls_ids:
-                raw_state = self.sumo.get_state(tls_id)
-                state_tensor = torch.tensor(raw_state, dtype=torch.float32, device=DEVICE)
-                states.append(state_tensor)
+            if slot is not None:
+                self.sumo.get_all_states(out=self._host_states_np[slot])
+                return self._staged_states(slot)
+            states = self.sumo.get_all_states()
         except Exception as e:
             print(f"Error getting states: {e}")
             raise
-            
-        # Stack to a single tensor: (NUM_AGENTS, STATE_DIM)
-        return torch.stack(states)
+
+        # Single tensor: (num_agents, STATE_DIM)
+        return torch.as_tensor(states, dtype=torch.float32, device=self.device)
 
     def step(self, actions):
         """
         Performs a simulation step.
-        actions: (NUM_AGENTS) tensor of action indices.
+        actions: (num_agents) tensor of action indices; extra trailing entries
+        (padding from a batch of mixed networks) are ignored.
         """
         self.current_step += 1
         
         if not self.use_sumo:
-            # Return dummy values for testing
-            next_states = torch.zeros((self.num_agents, STATE_DIM), device=DEVICE)
-            rewards = torch.zeros((self.num_agents, 1), device=DEVICE)
-            costs = torch.zeros((self.num_agents, 1), device=DEVICE)
-            done = self.current_step >= MAX_STEPS_PER_EPISODE
-            return next_states, rewards, costs, done, {}
+            if isinstance(actions, torch.Tensor):
+                actions = actions.detach().cpu().numpy()
+            actions = np.asarray(actions).reshape(-1)[:self.num_agents]
+            slot = self._next_slot() if self.staging else None
+            states_out = None if slot is None else self._host_states_np[slot][None]
+            states, rewards, costs, _ = self.surrogate.step(actions.reshape(1, -1), states_out=states_out)
+            global_reward, global_cost = float(rewards[0]), float(costs[0])
+            self._last_metrics = (global_reward, global_cost)
+            if slot is None:
+                next_states = torch.as_tensor(states[0], device=self.device)
+            else:
+                next_states = self._staged_states(slot)
+            rewards, costs = self._global_tensors(global_reward, global_cost, slot)
+            done = self.current_step >= self.max_steps
+            info = {'global_reward': global_reward, 'global_cost': global_cost, 'scenario': self._scenario}
+            return next_states, rewards, costs, done, info
             
         try:
+            calls_before = self.sumo.traci_call_count
+
             # 1. Apply actions to SUMO
             for i, tls_id in enumerate(self.sumo.tls_ids):
                 # Ensure action is an integer for TraCI
@@ -100,31 +224,24 @@ class TrafficEnv:
             # The reward and cost are global metrics calculated over the entire network.
             global_reward, global_cost = self.sumo.get_global_metrics()
 
-            # Rewards/Costs are applied to all agents: (NUM_AGENTS, 1)
-            rewards = torch.full((self.num_agents, 1), global_reward, device=DEVICE)
-            costs = torch.full((self.num_agents, 1), global_cost, device=DEVICE)
+            # Rewards/Costs are applied to all agents: (num_agents, 1), in the states' slot
+            rewards, costs = self._global_tensors(global_reward, global_cost, self._slot if self.staging else None)
             
             # 5. Check if episode is done
-            # Check for expected vehicles in the network. Import TraCI lazily
-            # so that the module can be imported even when TraCI is not installed.
-            min_expected = None
-            try:
-                import traci as _traci
-                min_expected = _traci.simulation.getMinExpectedNumber()
-            except Exception:
-                # If TraCI isn't available or the call fails, we don't
-                # use the min_expected criterion to end the episode.
-                min_expected = None
+            # Vehicles still expected in this env's own simulation; None if the
+            # query fails, in which case only the step limit ends the episode.
+            min_expected = self.sumo.get_min_expected_number()
 
             if min_expected is None:
-                done = self.current_step >= MAX_STEPS_PER_EPISODE
+                done = self.current_step >= self.max_steps
             else:
-                done = self.current_step >= MAX_STEPS_PER_EPISODE or min_expected == 0
+                done = self.current_step >= self.max_steps or min_expected == 0
             
             info = {
                 'global_reward': global_reward,
                 'global_cost': global_cost,
-                'scenario': self._scenario
+                'scenario': self._scenario,
+                'traci_calls': self.sumo.traci_call_count - calls_before,
             }
             
             return next_states, rewards, costs, done, info
@@ -143,13 +260,13 @@ class TrafficEnv:
                 print(f"Error closing SUMO: {e}")
                 
     def get_global_metrics(self):
-        """Return global reward and cost from the SUMO interface or dummy values.
+        """Return global reward and cost from the SUMO interface or the surrogate simulator.
 
         Returns:
             (reward: float, cost: float)
         """
         if not self.use_sumo:
-            return 0.0, 0.0
+            return self._last_metrics
 
         try:
             return self.sumo.get_global_metrics()
@@ -0,0 +1,234 @@
+import multiprocessing as mp
+import time
+import traceback
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import torch
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import RunConfig
+
+
+def _shared_specs(num_envs, num_agents, state_dim):
+    """Shape and dtype of every array exchanged through shared memory."""
+    return {
+        'states': ((num_envs, num_agents, state_dim), np.float32),
+        'actions': ((num_envs, num_agents), np.int64),
+        'rewards': ((num_envs, num_agents, 1), np.float32),
+        'costs': ((num_envs, num_agents, 1), np.float32),
+        'dones': ((num_envs,), np.bool_),
+    }
+
+
+def _attach(shm_names, specs):
+    """Map the named shared memory blocks to NumPy arrays."""
+    handles, arrays = {}, {}
+    for key, (shape, dtype) in specs.items():
+        handles[key] = SharedMemory(name=shm_names[key])
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=handles[key].buf)
+    return handles, arrays
+
+
+def _worker(rank, num_envs, num_agents, state_dim, remote, parent_remote, shm_names, env_kwargs):
+    """Worker process loop: owns one TrafficEnv and writes its results into shared memory."""
+    from src.env.traffic_env import TrafficEnv
+
+    parent_remote.close()
+    torch.set_num_threads(1)
+    handles, arrays = _attach(shm_names, _shared_specs(num_envs, num_agents, state_dim))
+    env = None
+    seed, scenario, episodes = None, env_kwargs.get('scenario', 'medium'), 0
+
+    def write_states(states):
+        arrays['states'][rank] = states.cpu().numpy()
+
+    try:
+        env = TrafficEnv(**env_kwargs)
+        while True:
+            cmd, data = remote.recv()
+            try:
+                if cmd == 'step':
+                    actions = torch.from_numpy(arrays['actions'][rank].copy())
+                    t0 = time.perf_counter()
+                    next_states, rewards, costs, done, info = env.step(actions)
+                    info = dict(info, step_time=time.perf_counter() - t0)
+                    arrays['rewards'][rank] = rewards.cpu().numpy()
+                    arrays['costs'][rank] = costs.cpu().numpy()
+                    arrays['dones'][rank] = done
+                    if done:
+                        # Auto-reset; the terminal observation travels with the info dict
+                        info['terminal_observation'] = next_states.cpu().numpy()
+                        episodes += 1
+                        episode_seed = None if seed is None else seed + num_envs * episodes
+                        next_states = env.reset(seed=episode_seed, scenario=scenario)
+                    write_states(next_states)
+                    remote.send((True, info))
+                elif cmd == 'reset':
+                    seed, scenario = data
+                    episodes = 0
+                    write_states(env.reset(seed=seed, scenario=scenario))
+                    remote.send((True, None))
+                elif cmd == 'close':
+                    remote.send((True, None))
+                    break
+                else:
+                    raise ValueError(f"Unknown command: {cmd}")
+            except Exception:
+                remote.send((False, traceback.format_exc()))
+    finally:
+        if env is not None:
+            env.close()
+        for handle in handles.values():
+            handle.close()
+        remote.close()
+
+
+class VectorTrafficEnv:
+    """
+    Runs K TrafficEnv instances in parallel worker processes.
+
+    Actions go in as a (K, num_agents) tensor; observations, rewards, costs and dones
+    come back stacked as (K, num_agents, STATE_DIM), (K, num_agents, 1),
+    (K, num_agents, 1) and (K,), with num_agents detected from the network of `city`.
+    States, actions, rewards, costs and dones are exchanged through shared memory,
+    only small info dicts go through the pipes.
+
+    `config` (a RunConfig) is passed to every worker's TrafficEnv; the stacked
+    tensors are returned on config.device.
+
+    Environments whose episode ends are reset automatically; the last observation of
+    the finished episode is returned as infos[k]['terminal_observation']. Each info
+    also carries the worker-side duration of env.step as 'step_time'.
+    """
+
+    def __init__(self, num_envs, gui=False, use_sumo=True, scenario='medium', start_method=None,
+                 city='city4x4', config=None):
+        from src.env.traffic_env import detect_num_agents
+
+        self.num_envs = num_envs
+        self.num_agents = detect_num_agents(use_sumo, scenario, city)
+        self.config = (config or RunConfig()).override(num_agents=self.num_agents)
+        self.device = self.config.device
+        self.scenario = scenario
+        self.closed = True
+        self._waiting = False
+
+        specs = _shared_specs(num_envs, self.num_agents, self.config.state_dim)
+        self._shm = {}
+        self._arrays = {}
+        for key, (shape, dtype) in specs.items():
+            nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            self._shm[key] = SharedMemory(create=True, size=nbytes)
+            self._arrays[key] = np.ndarray(shape, dtype=dtype, buffer=self._shm[key].buf)
+            self._arrays[key].fill(0)
+        shm_names = {key: shm.name for key, shm in self._shm.items()}
+
+        ctx = mp.get_context(start_method)
+        # Workers only exchange host arrays, so their environments stay on the CPU
+        env_kwargs = {'gui': gui, 'use_sumo': use_sumo, 'scenario': scenario, 'city': city,
+                      'config': self.config.override(device='cpu')}
+        self._remotes, self._processes = [], []
+        for rank in range(num_envs):
+            remote, worker_remote = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(rank, num_envs, self.num_agents, self.config.state_dim, worker_remote, remote, shm_names,
+                      env_kwargs),
+                daemon=True,
+            )
+            process.start()
+            worker_remote.close()
+            self._remotes.append(remote)
+            self._processes.append(process)
+        self.closed = False
+
+    # --------------------------------------------------------------------------
+    # Worker communication
+    # --------------------------------------------------------------------------
+    def _receive(self):
+        results = []
+        errors = []
+        for rank, remote in enumerate(self._remotes):
+            ok, payload = remote.recv()
+            if ok:
+                results.append(payload)
+            else:
+                errors.append(f"[env {rank}]\n{payload}")
+        if errors:
+            raise RuntimeError("Worker failure:\n" + "\n".join(errors))
+        return results
+
+    def _states(self):
+        # Copy out of shared memory: workers overwrite it on the next step
+        return torch.tensor(self._arrays['states'], dtype=torch.float32, device=self.device)
+
+    # --------------------------------------------------------------------------
+    # Environment API
+    # --------------------------------------------------------------------------
+    def reset(self, seed=None, scenario=None):
+        """
+        Resets all environments. Environment k is seeded with seed + k.
+
+        Returns:
+            states: Tensor (K, num_agents, STATE_DIM)
+        """
+        scenario = scenario or self.scenario
+        for rank, remote in enumerate(self._remotes):
+            remote.send(('reset', (None if seed is None else seed + rank, scenario)))
+        self._receive()
+        return self._states()
+
+    def step_async(self, actions):
+        """Sends (K, num_agents) actions to the workers without waiting for the results."""
+        if isinstance(actions, torch.Tensor):
+            actions = actions.detach().cpu().numpy()
+        self._arrays['actions'][:] = np.asarray(actions).reshape(self.num_envs, self.num_agents)
+        for remote in self._remotes:
+            remote.send(('step', None))
+        self._waiting = True
+
+    def step_wait(self):
+        """Waits for the step started by step_async and returns the stacked results."""
+        try:
+            infos = self._receive()
+        finally:
+            # _receive reads every worker's reply, even when one of them failed
+            self._waiting = False
+        next_states = self._states()
+        rewards = torch.tensor(self._arrays['rewards'], device=self.device)
+        costs = torch.tensor(self._arrays['costs'], device=self.device)
+        dones = torch.tensor(self._arrays['dones'], device=self.device)
+        return next_states, rewards, costs, dones, infos
+
+    def step(self, actions):
+        """
+        Performs one simulation step in every environment.
+        actions: (K, num_agents) tensor of action indices.
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self):
+        """Stops the workers and releases the shared memory."""
+        if self.closed:
+            return
+        try:
+            if self._waiting:
+                self._receive()
+            for remote in self._remotes:
+                remote.send(('close', None))
+            self._receive()
+        except (EOFError, BrokenPipeError, RuntimeError) as e:
+            print(f"[WARN] Error closing vector env workers: {e}")
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        for shm in self._shm.values():
+            shm.close()
+            shm.unlink()
+        self.closed = True
+
+    def __del__(self):
+        if not getattr(self, 'closed', True):
+            self.close()
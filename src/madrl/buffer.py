@@ -1,115 +1,332 @@
-import numpy as np
+import time
 import torch
-from src.config import BUFFER_SIZE, STATE_DIM, DEVICE, GAMMA, GAE_LAMBDA
+from src.config import RunConfig
+
+STATE_DTYPES = {'float32': torch.float32, 'float16': torch.float16, 'bfloat16': torch.bfloat16}
+
+
+def packed_fields(state_dim, masked=False):
+    """Column layout of the packed minibatch storage: (field, width) pairs."""
+    fields = (
+        ('states', state_dim),
+        ('actions', 1),
+        ('log_probs', 1),
+        ('advantages', 1),
+        ('returns', 1),
+        ('cost_advantages', 1),
+        ('cost_returns', 1),
+    )
+    return fields + (('masks', 1),) if masked else fields
+
+
+def reverse_discounted_scan(deltas: torch.Tensor, discounts: torch.Tensor) -> torch.Tensor:
+    """
+    Solves A[t] = deltas[t] + discounts[t] * A[t + 1] (with A[T] = 0) along dim 0.
+
+    The recurrence is an associative scan over (discount, delta) pairs, so it is
+    evaluated in ceil(log2(T)) vectorized doubling steps instead of T sequential ones.
+    A zero discount (episode end) cuts the sum exactly, without any division.
+    """
+    T = deltas.shape[0]
+    acc = deltas.clone()
+    coef = discounts.expand_as(deltas).clone()
+    shift = 1
+    while shift < T:
+        # Combine each position with the partial sum starting `shift` steps later
+        acc[:T - shift] = acc[:T - shift] + coef[:T - shift] * acc[shift:]
+        coef[:T - shift] = coef[:T - shift] * coef[shift:]
+        shift *= 2
+    return acc
+
+
+_scripted_scan = None
+
+
+def _get_scripted_scan():
+    """TorchScript-compiled reverse_discounted_scan, compiled on first use."""
+    global _scripted_scan
+    if _scripted_scan is None:
+        _scripted_scan = torch.jit.script(reverse_discounted_scan)
+    return _scripted_scan
+
 
 class ExperienceBuffer:
-    """PPO Buffer for storing trajectories of multiple agents."""
-    def __init__(self, num_agents):
-        # All tensors stored in shape: (BUFFER_SIZE, NUM_AGENTS, *)
-        self.states = torch.zeros((BUFFER_SIZE, num_agents, STATE_DIM), dtype=torch.float32, device=DEVICE)
-        self.actions = torch.zeros((BUFFER_SIZE, num_agents, 1), dtype=torch.long, device=DEVICE)
-        self.log_probs = torch.zeros((BUFFER_SIZE, num_agents, 1), dtype=torch.float32, device=DEVICE)
-        self.rewards = torch.zeros((BUFFER_SIZE, num_agents, 1), dtype=torch.float32, device=DEVICE)
-        self.costs = torch.zeros((BUFFER_SIZE, num_agents, 1), dtype=torch.float32, device=DEVICE)
-        self.values = torch.zeros((BUFFER_SIZE, num_agents, 1), dtype=torch.float32, device=DEVICE)
-        self.cost_values = torch.zeros((BUFFER_SIZE, num_agents, 1), dtype=torch.float32, device=DEVICE)
-        self.dones = torch.zeros((BUFFER_SIZE, num_agents, 1), dtype=torch.bool, device=DEVICE) 
+    """
+    PPO Buffer for storing trajectories of multiple agents.
+
+    Capacity (buffer_size), state size, GAE parameters and device come from
+    `config` (a RunConfig, default RunConfig()); num_agents is the real agent
+    count of the environment(s), so memory scales with the network.
+
+    With masked=True the buffer also stores an agent mask per step, for batches
+    of environments padded to a common agent count (see env.padding). Minibatches
+    then carry an 8th field, the float mask column, and padding rows are excluded
+    from the losses.
+
+    With config.compact_buffer the storage is compact: uint8 actions, and one
+    done flag, reward and cost per environment and step (they are global, so
+    identical for all agents of an environment) that are broadcast to the agents
+    when read (see agent_view). config.buffer_state_dtype ('float16' or
+    'bfloat16') stores states at half precision; minibatches are float32 either
+    way. num_envs is the number of environments whose agents share a step.
+
+    config.gae_torchscript runs the GAE scan through its TorchScript-compiled
+    version; use_torchscript overrides it for this buffer.
+    """
+    def __init__(self, num_agents, use_torchscript=None, config=None, masked=False, num_envs=1):
+        self.config = config or RunConfig()
+        self.buffer_size = self.config.buffer_size
+        self.device = device = self.config.device
+        self.compact = self.config.compact_buffer
+        if num_agents % num_envs:
+            raise ValueError(f"{num_agents} agents cannot be split evenly over {num_envs} environments")
+        self.num_envs = num_envs
+        size = self.buffer_size
+        state_dtype = STATE_DTYPES[self.config.buffer_state_dtype]
+        # Global per-environment quantities get one slot per environment in compact mode
+        per_step = num_envs if self.compact else num_agents
+        if self.compact and self.config.action_dim > 256:
+            raise ValueError(f"uint8 actions cannot hold action_dim={self.config.action_dim}")
+
+        # All tensors stored in shape: (buffer_size, num_agents or num_envs, *)
+        self.states = torch.zeros((size, num_agents, self.config.state_dim), dtype=state_dtype, device=device)
+        self.actions = torch.zeros((size, num_agents, 1), dtype=torch.uint8 if self.compact else torch.long,
+                                   device=device)
+        self.log_probs = torch.zeros((size, num_agents, 1), dtype=torch.float32, device=device)
+        self.rewards = torch.zeros((size, per_step, 1), dtype=torch.float32, device=device)
+        self.costs = torch.zeros((size, per_step, 1), dtype=torch.float32, device=device)
+        self.values = torch.zeros((size, num_agents, 1), dtype=torch.float32, device=device)
+        self.cost_values = torch.zeros((size, num_agents, 1), dtype=torch.float32, device=device)
+        self.dones = torch.zeros((size, per_step, 1), dtype=torch.bool, device=device)
+        self.masks = torch.ones((size, num_agents, 1), dtype=torch.bool, device=device) if masked else None
         
         self.ptr = 0
         self.num_agents = num_agents
+        self.use_torchscript = self.config.gae_torchscript if use_torchscript is None else use_torchscript
+
+        # Minibatch sampling state: packed once per update, reused across epochs
+        self.masked = masked
+        self.packed_fields = packed_fields(self.config.state_dim, masked)
+        self.packed_width = sum(width for _, width in self.packed_fields)
+        self._packed = None
+        self._perm = torch.empty(size * num_agents, dtype=torch.long, device=device)
+        self._batch = None
+        self.sampling_times = []
+
+    @classmethod
+    def from_storage(cls, states, actions, log_probs, rewards, costs, dones, values, cost_values,
+                     config=None, num_envs=1):
+        """
+        A full buffer whose storage is the given (T, ...) tensors, used without copying
+        (e.g. views of memory-mapped trajectory files, see madrl.trajectory).
+
+        states, actions, log_probs, values and cost_values are (T, num_agents, ·);
+        rewards, costs and dones are (T, num_agents, 1) or, as in compact storage,
+        (T, num_envs, 1).
+        """
+        T, num_agents = states.shape[:2]
+        config = (config or RunConfig()).override(num_agents=num_agents, state_dim=states.shape[-1],
+                                                   device=str(states.device))
+        buffer = cls(num_agents, config=config.override(buffer_size=0), num_envs=num_envs)
+        buffer.config = config.override(buffer_size=T)
+        buffer.buffer_size = T
+        buffer.states, buffer.actions, buffer.log_probs = states, actions, log_probs
+        buffer.rewards, buffer.costs, buffer.dones = rewards, costs, dones
+        buffer.values, buffer.cost_values = values, cost_values
+        buffer._perm = torch.empty(T * num_agents, dtype=torch.long, device=buffer.device)
+        buffer.ptr = T
+        return buffer
+
+    def _per_agent(self, name, tensor, width):
+        """Reshape a (num_agents, ...) or (K, A, ...) tensor to (num_agents, width), checking its size."""
+        tensor = torch.as_tensor(tensor, device=self.device)
+        if tensor.numel() != self.num_agents * width:
+            raise ValueError(f"{name} of shape {tuple(tensor.shape)} does not match the buffer's "
+                             f"{self.num_agents} agents x {width}")
+        return tensor.reshape(self.num_agents, width)
+
+    def store(self, state, action, log_prob, reward, cost, value, cost_value, done, agent_mask=None):
+        """
+        Stores a single step for all agents.
 
-    def store(self, state, action, log_prob, reward, cost, value, cost_value, done):
-        """Stores a single step for all agents."""
-        if self.ptr < BUFFER_SIZE:
-            # State has shape (NUM_AGENTS, STATE_DIM), we store it as (1, NUM_AGENTS, STATE_DIM) implicitly
-            self.states[self.ptr] = state
-            # Ensure action, log_prob are correctly shaped (NUM_AGENTS, 1)
-            self.actions[self.ptr] = action.unsqueeze(-1) if action.dim() == 1 else action
-            self.log_probs[self.ptr] = log_prob.unsqueeze(-1) if log_prob.dim() == 1 else log_prob
-            
+        Inputs may be (num_agents, ...) or, for K environments, (K, A, ...) with
+        K * A == num_agents; done is a scalar or one flag per environment.
+        agent_mask (K, A) marks the real agents of padded inputs (masked buffers only).
+        """
+        if self.ptr < self.buffer_size:
+            self.states[self.ptr] = self._per_agent('state', state, self.states.shape[-1])
+            self.actions[self.ptr] = self._per_agent('action', action, 1)
+            self.log_probs[self.ptr] = self._per_agent('log_prob', log_prob, 1)
+
+            reward = self._per_agent('reward', reward, 1)
+            cost = self._per_agent('cost', cost, 1)
+            if self.compact:
+                # Global values: keep the first agent of each environment
+                reward = reward.view(self.num_envs, -1)[:, :1]
+                cost = cost.view(self.num_envs, -1)[:, :1]
             self.rewards[self.ptr] = reward
             self.costs[self.ptr] = cost
-            self.values[self.ptr] = value
-            self.cost_values[self.ptr] = cost_value
-            self.dones[self.ptr] = torch.full((self.num_agents, 1), done, device=DEVICE)
+            self.values[self.ptr] = self._per_agent('value', value, 1)
+            self.cost_values[self.ptr] = self._per_agent('cost_value', cost_value, 1)
+            # One flag per environment covers all of its agents; written in place
+            if isinstance(done, torch.Tensor) or getattr(done, 'ndim', 0):
+                done = torch.as_tensor(done, device=self.device).reshape(-1, 1)
+                self.dones[self.ptr].view(done.shape[0], -1).copy_(done)
+            else:
+                self.dones[self.ptr].fill_(bool(done))
+            if agent_mask is not None:
+                if self.masks is None:
+                    raise ValueError("agent_mask given to an ExperienceBuffer created with masked=False")
+                self.masks[self.ptr] = self._per_agent('agent_mask', agent_mask, 1)
             self.ptr += 1
         else:
             raise IndexError("Buffer is full!")
 
+    def agent_view(self, tensor):
+        """
+        A (T, num_envs, ·) slice of the compact per-environment storage broadcast to
+        (T, num_agents, ·); per-agent tensors are returned unchanged.
+        """
+        if tensor.shape[1] == self.num_agents:
+            return tensor
+        if tensor.shape[1] == 1:
+            return tensor.expand(-1, self.num_agents, -1)
+        return tensor.repeat_interleave(self.num_agents // tensor.shape[1], dim=1)
+
+    def memory_bytes(self):
+        """Bytes held by the per-step storage tensors."""
+        tensors = [self.states, self.actions, self.log_probs, self.rewards, self.costs,
+                   self.values, self.cost_values, self.dones]
+        if self.masks is not None:
+            tensors.append(self.masks)
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def bytes_per_transition(self):
+        """Storage bytes per stored step of all agents, and per agent-step."""
+        per_step = self.memory_bytes() / self.buffer_size
+        return per_step, per_step / self.num_agents
+
+    def valid(self, tensor):
+        """Entries of a filled (T, num_agents, ·) slice that belong to real agents, flattened."""
+        if self.masks is None:
+            return tensor.reshape(-1, tensor.shape[-1])
+        return tensor[self.masks[:tensor.shape[0]].squeeze(-1)]
+
     def compute_advantages_and_returns(self, next_v, next_cv):
         """Calculates GAE Advantages and Returns (R_t, C_t)."""
         # Only compute over the filled portion of the buffer
         T = self.ptr
         if T == 0:
             # Nothing to compute
-            self.returns = torch.zeros_like(self.values, device=DEVICE)
-            self.cost_returns = torch.zeros_like(self.cost_values, device=DEVICE)
-            self.advantages = torch.zeros_like(self.rewards, device=DEVICE)
-            self.cost_advantages = torch.zeros_like(self.costs, device=DEVICE)
+            self.returns = torch.zeros_like(self.values)
+            self.cost_returns = torch.zeros_like(self.cost_values)
+            self.advantages = torch.zeros_like(self.values)
+            self.cost_advantages = torch.zeros_like(self.cost_values)
             return
 
         # Slice to valid entries
-        values = torch.cat([self.values[:T], next_v.unsqueeze(0)], dim=0)
-        cost_values = torch.cat([self.cost_values[:T], next_cv.unsqueeze(0)], dim=0)
-
-        not_dones = ~self.dones[:T]
-        deltas = self.rewards[:T] + GAMMA * values[1:] * not_dones - values[:-1]
-        cost_deltas = self.costs[:T] + GAMMA * cost_values[1:] * not_dones - cost_values[:-1]
+        # Bootstrap values may come as (num_agents, 1) or (K, A, 1)
+        next_v = next_v.reshape(1, self.num_agents, 1)
+        next_cv = next_cv.reshape(1, self.num_agents, 1)
+        values = torch.cat([self.values[:T], next_v], dim=0)
+        cost_values = torch.cat([self.cost_values[:T], next_cv], dim=0)
 
-        advantages = torch.zeros_like(deltas, device=DEVICE)
-        cost_advantages = torch.zeros_like(cost_deltas, device=DEVICE)
+        gamma, gae_lambda = self.config.gamma, self.config.gae_lambda
+        not_dones = ~self.agent_view(self.dones[:T])
+        deltas = self.agent_view(self.rewards[:T]) + gamma * values[1:] * not_dones - values[:-1]
+        cost_deltas = self.agent_view(self.costs[:T]) + gamma * cost_values[1:] * not_dones - cost_values[:-1]
 
-        # Generalized Advantage Estimation (GAE)
-        last_lambda = torch.zeros((self.num_agents, 1), device=DEVICE)
-        last_cost_lambda = torch.zeros((self.num_agents, 1), device=DEVICE)
-
-        for t in reversed(range(T)):
-            advantages[t] = deltas[t] + GAMMA * GAE_LAMBDA * not_dones[t] * last_lambda
-            last_lambda = advantages[t]
-
-            cost_advantages[t] = cost_deltas[t] + GAMMA * GAE_LAMBDA * not_dones[t] * last_cost_lambda
-            last_cost_lambda = cost_advantages[t]
+        # Generalized Advantage Estimation (GAE): both streams in one reverse scan
+        scan = _get_scripted_scan() if self.use_torchscript else reverse_discounted_scan
+        fused = scan(
+            torch.cat([deltas, cost_deltas], dim=-1),
+            gamma * gae_lambda * not_dones.to(deltas.dtype),
+        )
+        advantages, cost_advantages = fused[..., :1], fused[..., 1:]
 
         # Returns = Advantage + Value
         self.returns = advantages + self.values[:T]
         self.cost_returns = cost_advantages + self.cost_values[:T]
         self.advantages = advantages
         self.cost_advantages = cost_advantages
-        
-    def get(self, batch_size):
-        """Flattens the data and yields minibatches for optimization."""
-        def flatten(data, T):
-            # Reshape from (T, NUM_AGENTS, *) to (T * NUM_AGENTS, *)
-            return data[:T].reshape(-1, data.shape[-1])
+        self._packed = None
+
+    def _pack(self):
+        """
+        Packs the fields used for optimization into one contiguous
+        (T, NUM_AGENTS, packed_width) float tensor, once per update.
+        """
+        if self._packed is None:
+            T = self.ptr
+            fields = [getattr(self, name)[:T].to(torch.float32) for name, _ in self.packed_fields]
+            self._packed = torch.cat(fields, dim=-1).contiguous()
+        return self._packed
+
+    def _unpack(self, batch):
+        """Splits a (batch, packed_width) tensor into column views, in packed_fields order."""
+        out = []
+        col = 0
+        for name, width in self.packed_fields:
+            view = batch[:, col:col + width]
+            out.append(view.long() if name == 'actions' else view)
+            col += width
+        return tuple(out)
 
+    def get(self, batch_size, whole_timesteps=False):
+        """
+        Yields shuffled minibatches for optimization.
+
+        The buffer is packed into one contiguous tensor once per update; each minibatch
+        is an index_select from it into a preallocated batch tensor, and the yielded
+        fields are column views of that tensor. They are overwritten by the next
+        minibatch, so use (or clone) them before advancing the generator.
+
+        Args:
+            batch_size (int): Transitions (agent-steps) per minibatch
+            whole_timesteps (bool): Sample whole timesteps, keeping all agents of a
+                step in the same minibatch (batch_size // NUM_AGENTS steps per batch)
+
+        The time spent sampling during each call is appended to self.sampling_times.
+        """
         T = self.ptr
         if T == 0:
             return
 
-        flat_states = flatten(self.states, T)
-        flat_actions = flatten(self.actions, T)
-        flat_log_probs = flatten(self.log_probs, T)
-        flat_advantages = flatten(self.advantages, T)
-        flat_returns = flatten(self.returns, T)
-        flat_cost_advantages = flatten(self.cost_advantages, T)
-        flat_cost_returns = flatten(self.cost_returns, T)
-
-        dataset_size = flat_states.shape[0]
-        indices = np.arange(dataset_size)
-        np.random.shuffle(indices)
-
-        for start in range(0, dataset_size, batch_size):
-            batch_indices = indices[start:start + batch_size]
-
-            yield (
-                flat_states[batch_indices],
-                flat_actions[batch_indices],
-                flat_log_probs[batch_indices],
-                flat_advantages[batch_indices],
-                flat_returns[batch_indices],
-                flat_cost_advantages[batch_indices],
-                flat_cost_returns[batch_indices],
-            )
-            
+        elapsed = 0.0
+        t0 = time.perf_counter()
+        packed = self._pack()
+        if whole_timesteps:
+            # One row per timestep: (T, NUM_AGENTS * packed_width)
+            rows = packed.view(T, -1)
+            rows_per_batch = max(1, batch_size // self.num_agents)
+        else:
+            rows = packed.view(-1, self.packed_width)
+            rows_per_batch = batch_size
+
+        num_rows = rows.shape[0]
+        perm = self._perm[:num_rows]
+        torch.randperm(num_rows, out=perm)
+        # Transitions in a full minibatch (rows_per_batch timesteps of every agent with whole_timesteps)
+        needed = rows_per_batch * rows.shape[1] // self.packed_width
+        if self._batch is None or self._batch.shape[0] < needed:
+            self._batch = torch.empty((needed, self.packed_width), dtype=torch.float32, device=self.device)
+
+        try:
+            for start in range(0, num_rows, rows_per_batch):
+                index = perm[start:start + rows_per_batch]
+                n = index.shape[0] * rows.shape[1] // self.packed_width
+                batch = self._batch[:n]
+                torch.index_select(rows, 0, index, out=batch.view(index.shape[0], -1))
+                minibatch = self._unpack(batch)
+                elapsed += time.perf_counter() - t0
+
+                yield minibatch
+
+                t0 = time.perf_counter()
+            elapsed += time.perf_counter() - t0
+        finally:
+            self.sampling_times.append(elapsed)
+
     def clear(self):
-        self.ptr = 0
\ No newline at end of file
+        self.ptr = 0
+        self._packed = None
\ No newline at end of file
@@ -0,0 +1,245 @@
+import hashlib
+import itertools
+import math
+import os
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import torch
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import METRICS_LOG_DIR, MODEL_DIR, SUMO_BACKEND, RunConfig
+from src.agents.actor_critic import load_policy
+from src.agents.baselines import ActuatedController, FixedTimeController
+from src.madrl.metrics_log import MetricsReader, MetricsWriter, run_path
+from src.env.route_cache import file_digest
+from src.env.traffic_env import TrafficEnv
+
+SCENARIOS = ('low', 'medium', 'high')
+# RunConfig fields an evaluation episode depends on (num_agents follows the city)
+EVAL_CONFIG_FIELDS = ('state_dim', 'action_dim', 'max_steps_per_episode')
+# Controllers that can be evaluated next to the checkpoints, by name
+BASELINES = {'fixed_time': FixedTimeController, 'actuated': ActuatedController}
+# Two-sided 95% Student t critical values by degrees of freedom (1.96 beyond the table)
+_T95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+        10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042, 60: 2.000, 120: 1.980}
+
+
+def t_critical(df):
+    """Two-sided 95% t critical value (the next smaller tabulated df, so never too narrow)."""
+    if df <= 0:
+        return float('nan')
+    known = [d for d in _T95 if d <= df]
+    return _T95[max(known)] if df <= 120 else 1.96
+
+
+def mean_ci(values):
+    """(mean, half-width of the 95% confidence interval) of a sample."""
+    n = len(values)
+    mean = statistics.fmean(values)
+    if n < 2:
+        return mean, float('nan')
+    return mean, t_critical(n - 1) * statistics.stdev(values) / math.sqrt(n)
+
+
+def checkpoint_key(checkpoint):
+    """Identity of a checkpoint for the result cache: a baseline name, or the file's content hash."""
+    if checkpoint in BASELINES:
+        return checkpoint
+    return f"{os.path.splitext(os.path.basename(checkpoint))[0]}:{file_digest(checkpoint)[:12]}"
+
+
+def config_digest(config):
+    """Short hash of the EVAL_CONFIG_FIELDS of a RunConfig, part of the result cache key."""
+    values = '|'.join(f"{name}={getattr(config, name)!r}" for name in EVAL_CONFIG_FIELDS)
+    return hashlib.sha1(values.encode()).hexdigest()[:12]
+
+
+def evaluate_job(checkpoint, city, scenario, seed, use_sumo=True, backend=None, config=None):
+    """
+    One deterministic episode of a checkpoint (or a BASELINES controller) on one
+    (city, scenario, seed). Runs in the harness's worker processes.
+    """
+    torch.set_num_threads(1)
+    config = config or RunConfig(device='cpu')
+    env_kwargs = {'backend': backend} if backend else {}
+    env = TrafficEnv(use_sumo=use_sumo, scenario=scenario, city=city, config=config, **env_kwargs)
+    if checkpoint in BASELINES:
+        controller = BASELINES[checkpoint](env.config)
+        policy = lambda states: controller.act(states)[0]
+    else:
+        actor = load_policy(checkpoint, env.config)
+        policy = lambda states: actor.get_action_and_log_prob(states, deterministic=True)[0]
+
+    t0 = time.perf_counter()
+    total_reward = total_cost = 0.0
+    steps = 0
+    try:
+        states = env.reset(seed=seed, scenario=scenario)
+        done = False
+        with torch.no_grad():
+            while not done:
+                states, _, _, done, info = env.step(policy(states))
+                total_reward += info['global_reward']
+                total_cost += info['global_cost']
+                steps += 1
+    finally:
+        env.close()
+    return {
+        'checkpoint': checkpoint_key(checkpoint), 'city': city, 'scenario': scenario, 'seed': seed,
+        'reward': total_reward, 'avg_reward': total_reward / max(1, steps),
+        'avg_cost': total_cost / max(1, steps), 'steps': steps,
+        'seconds': time.perf_counter() - t0, 'simulator': 'sumo' if use_sumo else 'surrogate',
+        'backend': (backend or SUMO_BACKEND) if use_sumo else None,
+        'max_steps': config.max_steps_per_episode, 'config': config_digest(config),
+    }
+
+
+def _job_key(record):
+    return tuple(record.get(name) for name in
+                 ('checkpoint', 'city', 'scenario', 'seed', 'simulator', 'backend', 'max_steps', 'config'))
+
+
+class EvaluationHarness:
+    """
+    Parallel (checkpoint x city x scenario x seed) evaluation sweep.
+
+    Every job is one deterministic episode (evaluate_job) in a process pool worker.
+    Results are appended to the sweep's metrics log (<log_dir>/<sweep>.jsonl, see
+    madrl.metrics_log) as they complete, so an interrupted sweep resumes where it
+    stopped: jobs whose (checkpoint content, city, scenario, seed, simulator,
+    backend, episode length, config_digest) is already in the log are not run
+    again. A failed job is logged as an 'evaluation_error' record and run again by
+    the next sweep. summary() aggregates this sweep's results per (checkpoint,
+    city, scenario) with 95% confidence intervals over the seeds.
+
+    checkpoints are actor_*.pt paths or BASELINES names ('fixed_time', 'actuated').
+    """
+
+    def __init__(self, checkpoints, cities=('city4x4',), scenarios=SCENARIOS, seeds=(0, 1, 2),
+                 sweep='evaluation', log_dir=METRICS_LOG_DIR, max_workers=None, use_sumo=True,
+                 backend=None, config=None):
+        self.checkpoints = list(checkpoints)
+        self.jobs = list(itertools.product(self.checkpoints, cities, scenarios, seeds))
+        self.log_path = run_path(sweep, log_dir)
+        self.sweep = sweep
+        self.log_dir = log_dir
+        self.max_workers = max_workers or os.cpu_count()
+        self.use_sumo = use_sumo
+        self.backend = backend
+        self.config = config or RunConfig(device='cpu')
+
+    def job_key(self, job):
+        """Cache key of a (checkpoint, city, scenario, seed) job under this harness' settings."""
+        checkpoint, city, scenario, seed = job
+        return (checkpoint_key(checkpoint), city, scenario, seed, 'sumo' if self.use_sumo else 'surrogate',
+                (self.backend or SUMO_BACKEND) if self.use_sumo else None,
+                self.config.max_steps_per_episode, config_digest(self.config))
+
+    def cached(self):
+        """Results already in the sweep's log, by job key."""
+        return {_job_key(r): r for r in MetricsReader(self.log_path).records(kind='evaluation')}
+
+    def pending(self):
+        done = self.cached()
+        return [job for job in self.jobs if self.job_key(job) not in done]
+
+    def run(self):
+        """
+        Run the pending jobs; yields each result as it completes (cached results are
+        not yielded). Every finished job is logged before the next is awaited; if any
+        job failed, RuntimeError is raised once all the others are done.
+        """
+        pending = self.pending()
+        if not pending:
+            return
+        failed = 0
+        with MetricsWriter(self.sweep, self.log_dir, flush_every=1) as writer, \
+                ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending))) as pool:
+            futures = {pool.submit(evaluate_job, *job, use_sumo=self.use_sumo, backend=self.backend,
+                                   config=self.config): job for job in pending}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        checkpoint, city, scenario, seed = futures[future]
+                        print(f"[ERROR] Evaluation of {checkpoint} on {city}/{scenario} seed {seed} failed: {e!r}")
+                        writer.log(kind='evaluation_error', checkpoint=checkpoint_key(checkpoint), city=city,
+                                   scenario=scenario, seed=seed, error=repr(e))
+                        failed += 1
+                        continue
+                    writer.log(result, kind='evaluation')
+                    yield result
+            finally:
+                # Left early: don't start the jobs still queued
+                for future in futures:
+                    future.cancel()
+        if failed:
+            raise RuntimeError(f"{failed} of {len(pending)} evaluation jobs failed "
+                               f"(see the 'evaluation_error' records in {self.log_path})")
+
+    def results(self):
+        """Every result of this sweep's jobs (under this harness' settings), from the log."""
+        cached = self.cached()
+        return [cached[key] for key in dict.fromkeys(self.job_key(job) for job in self.jobs) if key in cached]
+
+    def summary(self, metric='reward'):
+        """
+        Tidy rows, one per (checkpoint, city, scenario): seeds, then mean and 95% CI
+        half-width of `metric` and of avg_cost, sorted by checkpoint, city, scenario.
+        """
+        groups = defaultdict(list)
+        for r in self.results():
+            groups[(r['checkpoint'], r['city'], r['scenario'])].append(r)
+        rows = []
+        for (checkpoint, city, scenario), results in sorted(groups.items()):
+            mean, ci = mean_ci([r[metric] for r in results])
+            cost, cost_ci = mean_ci([r['avg_cost'] for r in results])
+            rows.append({'checkpoint': checkpoint, 'city': city, 'scenario': scenario, 'seeds': len(results),
+                         metric: mean, f'{metric}_ci95': ci, 'avg_cost': cost, 'avg_cost_ci95': cost_ci})
+        return rows
+
+
+def format_table(rows, metric='reward'):
+    lines = [f"{'Checkpoint':>26} | {'City':>8} | {'Scenario':>8} | {'n':>3} | {metric:>22} | {'avg_cost':>20}",
+             "-" * 100]
+    for row in rows:
+        lines.append(f"{row['checkpoint']:>26} | {row['city']:>8} | {row['scenario']:>8} | {row['seeds']:3d} | "
+                     f"{row[metric]:11.3f} ± {row[f'{metric}_ci95']:8.3f} | "
+                     f"{row['avg_cost']:9.4f} ± {row['avg_cost_ci95']:8.4f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Evaluate checkpoints over scenarios, cities and seeds in parallel")
+    parser.add_argument("--checkpoints", nargs="+", default=sorted(glob.glob(os.path.join(MODEL_DIR, "actor_*.pt"))),
+                        help=f"actor_*.pt files or baseline names {sorted(BASELINES)}")
+    parser.add_argument("--cities", nargs="+", default=["city4x4"])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0, 1, 2])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sweep", default="evaluation", help="Name of the resumable results log")
+    parser.add_argument("--surrogate", action="store_true", help="Evaluate on the surrogate instead of SUMO")
+    parser.add_argument("--max-steps", type=int, default=None, help="Episode length (default MAX_STEPS_PER_EPISODE)")
+    args = parser.parse_args()
+
+    config = RunConfig(device='cpu')
+    if args.max_steps:
+        config = config.override(max_steps_per_episode=args.max_steps)
+    harness = EvaluationHarness(args.checkpoints, args.cities, args.scenarios, args.seeds, sweep=args.sweep,
+                                max_workers=args.workers, use_sumo=not args.surrogate, config=config)
+    print(f"{len(harness.jobs)} jobs, {len(harness.pending())} to run")
+    try:
+        for result in harness.run():
+            print(f"  {result['checkpoint']:>26} {result['city']} {result['scenario']:>6} seed {result['seed']}: "
+                  f"reward {result['reward']:.2f}, cost {result['avg_cost']:.4f} ({result['seconds']:.1f}s)")
+    except RuntimeError as e:
+        print(f"[ERROR] {e}")
+        print(format_table(harness.summary()))
+        sys.exit(1)
+    print(format_table(harness.summary()))
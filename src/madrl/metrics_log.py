@@ -0,0 +1,218 @@
+import csv
+import json
+import mmap
+import os
+import time
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import BASELINE_RESULTS_PATH, METRICS_LOG_DIR, METRICS_PATH
+
+INDEX_FILE = 'index.jsonl'
+
+
+def run_path(run_id, log_dir=METRICS_LOG_DIR):
+    return os.path.join(log_dir, f"{run_id}.jsonl")
+
+
+def _append_durably(path, data):
+    """Append bytes to a file and fsync them."""
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _repair(path):
+    """Truncate a partial last line left by a crash mid-write; returns the file size."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return size
+        # Scan back to the end of the last complete record
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            chunk = f.read(end - start)
+            newline = chunk.rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+        return end
+
+
+class MetricsWriter:
+    """
+    Append-only JSON Lines metrics sink, one file per run (<log_dir>/<run_id>.jsonl).
+
+    Records are buffered and appended in batches of flush_every (and on flush/close),
+    each batch with one write and an fsync, so saving never rewrites earlier
+    episodes. A crash loses at most the unflushed batch: a partially written last
+    line is ignored by MetricsReader and truncated when the run is reopened. The
+    run is registered once in <log_dir>/index.jsonl with its start time and `info`.
+    """
+
+    def __init__(self, run_id, log_dir=METRICS_LOG_DIR, flush_every=32, info=None):
+        os.makedirs(log_dir, exist_ok=True)
+        self.run_id = run_id
+        self.log_dir = log_dir
+        self.path = run_path(run_id, log_dir)
+        self.flush_every = flush_every
+        self._pending = []
+        self.records_written = 0
+        existed = os.path.exists(self.path)
+        _repair(self.path)
+        if not existed:
+            entry = {'run': run_id, 'path': os.path.basename(self.path), 'started': time.time(), **(info or {})}
+            _append_durably(os.path.join(log_dir, INDEX_FILE), (json.dumps(entry) + '\n').encode())
+            open(self.path, 'ab').close()
+
+    def log(self, record=None, **fields):
+        """Queue one record (a dict and/or keyword fields); flushes every flush_every records."""
+        record = {**(record or {}), **fields}
+        self._pending.append(json.dumps(record, separators=(',', ':')))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        _append_durably(self.path, ('\n'.join(self._pending) + '\n').encode())
+        self.records_written += len(self._pending)
+        self._pending = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MetricsReader:
+    """
+    Reader of a MetricsWriter run file.
+
+    records() memory-maps the file and decodes it line by line; last(n) seeks from
+    the end, so the latest point costs the same however long the run is; read_new()
+    returns only the records appended since the previous call (tail -f style, see
+    follow()). Incomplete trailing lines are never returned.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+
+    @classmethod
+    def for_run(cls, run_id, log_dir=METRICS_LOG_DIR):
+        return cls(run_path(run_id, log_dir))
+
+    def records(self, kind=None):
+        """All complete records (only those whose 'kind' is `kind`, if given)."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start, size = 0, len(mm)
+            while start < size:
+                end = mm.find(b'\n', start)
+                if end < 0:
+                    break
+                record = json.loads(mm[start:end])
+                start = end + 1
+                if kind is None or record.get('kind') == kind:
+                    yield record
+
+    def last(self, n=1):
+        """The last n complete records, oldest first."""
+        if n <= 0 or not os.path.exists(self.path):
+            return []
+        with open(self.path, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            tail = b''
+            # n + 1 newlines (or the start of the file) make the first wanted line complete
+            while pos > 0 and tail.count(b'\n') <= n:
+                start = max(0, pos - 4096)
+                f.seek(start)
+                tail = f.read(pos - start) + tail
+                pos = start
+        lines = tail[:tail.rfind(b'\n') + 1].splitlines()
+        if pos > 0:
+            lines = lines[1:]
+        return [json.loads(line) for line in lines[-n:]]
+
+    def read_new(self):
+        """Records appended since the previous read_new() call."""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]
+        self.offset += len(complete)
+        return [json.loads(line) for line in complete.splitlines()]
+
+    def follow(self, poll_interval=1.0, stop=None):
+        """Yield records as they are appended; stop() returning True ends the generator."""
+        while True:
+            for record in self.read_new():
+                yield record
+            if stop is not None and stop():
+                return
+            time.sleep(poll_interval)
+
+
+def list_runs(log_dir=METRICS_LOG_DIR):
+    """Index entries of all runs in log_dir, in start order."""
+    path = os.path.join(log_dir, INDEX_FILE)
+    return list(MetricsReader(path).records()) if os.path.exists(path) else []
+
+
+def convert_legacy(metrics_path=METRICS_PATH, baseline_path=BASELINE_RESULTS_PATH, run_id='legacy',
+                   log_dir=METRICS_LOG_DIR):
+    """
+    One-shot conversion of a monolithic metrics.json (and baseline_results.csv) into
+    a MetricsWriter run: one 'episode' record per episode, one 'baseline' record per
+    CSV row and a final 'summary' record with best_reward/best_episode.
+
+    Returns the number of records written.
+    """
+    if os.path.exists(run_path(run_id, log_dir)):
+        raise FileExistsError(f"run {run_id!r} already exists in {log_dir}")
+    with MetricsWriter(run_id, log_dir, flush_every=1024, info={'converted_from': metrics_path}) as writer:
+        summary = {}
+        if metrics_path and os.path.exists(metrics_path):
+            with open(metrics_path) as f:
+                legacy = json.load(f)
+            for episode in legacy.get('episodes', []):
+                writer.log(episode, kind='episode')
+            summary = {k: v for k, v in legacy.items() if k != 'episodes'}
+        if baseline_path and os.path.exists(baseline_path):
+            with open(baseline_path, newline='') as f:
+                for row in csv.DictReader(f):
+                    writer.log(method=row['Method'], avg_reward=float(row['Avg Reward']),
+                               avg_cost=float(row['Avg Cost']), kind='baseline')
+        if summary:
+            writer.log(summary, kind='summary')
+    return writer.records_written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert metrics.json/baseline_results.csv to a JSON Lines run")
+    parser.add_argument("--metrics", default=METRICS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_RESULTS_PATH)
+    parser.add_argument("--run-id", default="legacy")
+    parser.add_argument("--log-dir", default=METRICS_LOG_DIR)
+    args = parser.parse_args()
+    count = convert_legacy(args.metrics, args.baseline, args.run_id, args.log_dir)
+    print(f"Wrote {count} records to {run_path(args.run_id, args.log_dir)}")
@@ -0,0 +1,149 @@
+import math
+import os
+import random
+import torch
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.agents.actor_critic import load_policy
+from src.config import RunConfig
+from src.madrl.trajectory import TrajectoryDataset, TrajectoryRecorder
+
+
+class TrajectoryStream(IterableDataset):
+    """
+    Windows of up to `steps` steps from many recorded trajectories.
+
+    Every (recording, chunk, start) window is one item, a dict of tensors as
+    TrajectoryDataset.batches() yields them. Under a DataLoader with workers the
+    windows are dealt round-robin to the workers, each of which maps the files
+    itself, so reading (page faults on the memory-mapped chunks) runs in parallel;
+    without workers the items are zero-copy views of the files.
+
+    With shuffle, the window order is reshuffled every pass (seeded by seed + pass).
+    """
+
+    def __init__(self, directories, steps=256, shuffle=True, seed=0):
+        self.directories = list(directories)
+        self.steps = steps
+        self.shuffle = shuffle
+        self.seed = seed
+        self.passes = 0
+        self.windows = []
+        for d, directory in enumerate(self.directories):
+            manifest = TrajectoryDataset(directory).manifest
+            for c, chunk in enumerate(manifest['chunks']):
+                self.windows.extend((d, c, start) for start in range(0, chunk['rows'], steps))
+
+    def __len__(self):
+        return len(self.windows)
+
+    def __iter__(self):
+        windows = list(self.windows)
+        if self.shuffle:
+            random.Random(self.seed + self.passes).shuffle(windows)
+        self.passes += 1
+        worker = get_worker_info()
+        if worker is not None:
+            windows = windows[worker.id::worker.num_workers]
+        datasets = {}
+        for d, c, start in windows:
+            if d not in datasets:
+                datasets[d] = TrajectoryDataset(self.directories[d])
+            yield datasets[d].window(c, start, self.steps)
+
+
+def trajectory_loader(directories, steps=256, num_workers=0, shuffle=True, seed=0, gamma=None):
+    """
+    DataLoader over TrajectoryStream(directories, steps); with gamma, the recordings'
+    returns are computed first (TrajectoryDataset.compute_returns) so the batches
+    carry 'returns' and 'cost_returns'.
+    """
+    if gamma is not None:
+        for directory in directories:
+            TrajectoryDataset(directory).compute_returns(gamma)
+    stream = TrajectoryStream(directories, steps, shuffle, seed)
+    return DataLoader(stream, batch_size=None, num_workers=num_workers,
+                      persistent_workers=num_workers > 0)
+
+
+def record_controller(controller, env, steps, city, scenario, seed, root=None, chunk_steps=None):
+    """
+    Run `controller` (e.g. agents.baselines.ActuatedController) on a TrafficEnv for
+    `steps` steps, resetting at episode ends, and record it as a trajectory whose
+    checkpoint name is controller.name. Returns the recording's directory.
+    """
+    kwargs = {k: v for k, v in (('root', root), ('chunk_steps', chunk_steps)) if v is not None}
+    recorder = TrajectoryRecorder(city, scenario, seed, controller.name, config=env.config, **kwargs)
+    controller.reset()
+    states = env.reset(seed=seed, scenario=scenario)
+    with recorder:
+        for _ in range(steps):
+            actions, log_probs = controller.act(states)
+            next_states, rewards, costs, done, _ = env.step(actions)
+            recorder.record(states, actions, log_probs, rewards, costs, done)
+            states = next_states
+            if done:
+                controller.reset()
+                states = env.reset(seed=seed, scenario=scenario)
+    return recorder.directory
+
+
+def importance_weighted_evaluation(actor, batches, clip=None):
+    """
+    Off-policy estimate of `actor`'s mean per-step reward and cost from behaviour data.
+
+    Each recorded step of each environment is weighted by its one-step joint
+    importance ratio, exp(sum over the agents of log pi(a|s) - log mu(a|s)), with
+    mu the recorded behaviour log-probabilities (optionally clipped at `clip`), and
+    the self-normalized weighted mean is returned. This corrects for the actions the
+    actor would take in the recorded states but not for the different states it
+    would reach, so it is a triage estimate; ess (the effective sample size of the
+    weights) shows how much of the data supports it.
+
+    Returns dict: reward, cost, behaviour_reward, behaviour_cost, ess, samples.
+    """
+    device = next(actor.parameters()).device
+    sum_w = sum_w2 = sum_wr = sum_wc = sum_r = sum_c = 0.0
+    samples = 0
+    with torch.no_grad():
+        for batch in batches:
+            states = batch['states'].to(device, torch.float32)
+            actions = batch['actions'].to(device).long().squeeze(-1)
+            envs = batch['dones'].shape[1]
+            log_pi = torch.log_softmax(actor(states), dim=-1).gather(-1, actions.unsqueeze(-1)).squeeze(-1)
+            log_ratio = (log_pi - batch['log_probs'].to(device).squeeze(-1))
+            # One joint ratio per (step, environment); rewards and costs are global per environment
+            log_ratio = log_ratio.reshape(log_ratio.shape[0], envs, -1).sum(-1).double()
+            rewards = batch['rewards'].to(device).reshape(log_ratio.shape[0], envs, -1)[..., 0].double()
+            costs = batch['costs'].to(device).reshape(log_ratio.shape[0], envs, -1)[..., 0].double()
+            if clip is not None:
+                log_ratio = log_ratio.clamp(max=math.log(clip))
+            w = log_ratio.exp()
+            sum_w += w.sum().item()
+            sum_w2 += (w * w).sum().item()
+            sum_wr += (w * rewards).sum().item()
+            sum_wc += (w * costs).sum().item()
+            sum_r += rewards.sum().item()
+            sum_c += costs.sum().item()
+            samples += w.numel()
+    nan = float('nan')
+    return {
+        'reward': sum_wr / sum_w if sum_w > 0 else nan,
+        'cost': sum_wc / sum_w if sum_w > 0 else nan,
+        'behaviour_reward': sum_r / samples if samples else nan,
+        'behaviour_cost': sum_c / samples if samples else nan,
+        'ess': sum_w ** 2 / sum_w2 if sum_w2 > 0 else 0.0,
+        'samples': samples,
+    }
+
+
+def evaluate_checkpoint(actor_path, directories, config=None, steps=1024, num_workers=0, clip=None):
+    """
+    importance_weighted_evaluation of an actor_*.pt checkpoint (plain or shared-trunk,
+    see load_policy) on recorded trajectories, without SUMO.
+    """
+    config = config or RunConfig()
+    actor = load_policy(actor_path, config)
+    batches = trajectory_loader(directories, steps, num_workers, shuffle=False)
+    return importance_weighted_evaluation(actor, batches, clip)
@@ -1,13 +1,34 @@
+import os
+import time
 import torch
 import torch.optim as optim
 import torch.nn as nn
 import torch.nn.functional as F
-from agents.actor import Actor
-from agents.critic import Critic
-from madrl.buffer import ExperienceBuffer
-from config import NUM_AGENTS, LEARNING_RATE_ACTOR, LEARNING_RATE_CRITIC, PPO_EPOCHS, CLIP_EPSILON, BATCH_SIZE, DEVICE,COST_LIMIT, LAGRANGE_LR, LAGRANGE_INIT, LAGRANGE_MAX, MODEL_DIR,MAX_GRAD_NORM
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.agents.actor import Actor
+from src.agents.critic import Critic
+from src.agents.actor_critic import SharedActorCritic
+from src.madrl.buffer import ExperienceBuffer
+from src.config import RunConfig
 
 
+def _masked_mean(x, mask):
+    """Mean of x over the rows where mask is 1 (all rows if mask is None)."""
+    if mask is None:
+        return x.mean()
+    return (x * mask).sum() / mask.sum().clamp_min(1.0)
+
+
+def _normalize(x, mask):
+    if mask is None:
+        return (x - x.mean()) / (x.std() + 1e-8)
+    # Unbiased, like Tensor.std
+    count = mask.sum()
+    mean = (x * mask).sum() / count.clamp_min(1.0)
+    std = (((x - mean) ** 2 * mask).sum() / (count - 1.0).clamp_min(1.0)).sqrt()
+    return (x - mean) / (std + 1e-8)
+
 
 class PPOTrainer:
     """
@@ -15,24 +36,65 @@ class PPOTrainer:
 
     The method alternates between policy optimization (θ update) and
     Lagrange multiplier update (λ update) to enforce safety constraints.
+
+    All hyperparameters, the agent count and the device come from a RunConfig,
+    so trainers with different settings can share one process. Build it from
+    the environment's config (PPOTrainer(config=env.config)) so the buffer
+    matches the detected agent count.
     """
 
-    def __init__(self):
-        # Actor–Critic initialization
-        self.actor = Actor().to(DEVICE)
-        self.critic = Critic().to(DEVICE)
+    def __init__(self, shared_trunk: bool = False, compile_update: bool = False, config=None,
+                 masked: bool = False, num_envs: int = 1, recorder=None):
+        """
+        Args:
+            shared_trunk: Use one SharedActorCritic network (shared feature trunk,
+                policy and value heads) instead of separate Actor and Critic networks.
+            compile_update: Compile the minibatch loss computation with torch.compile.
+            config: RunConfig (default RunConfig()). config.target_kl stops the PPO
+                epochs of an update once an epoch's mean approximate KL exceeds
+                1.5 * target_kl (None disables early stopping).
+            masked: Store an agent mask with every step and leave padding agents out of
+                the losses, for environments padded to a common agent count.
+            num_envs: Number of environments whose agents are stacked in one step; with
+                config.compact_buffer the buffer keeps one reward/cost/done per environment.
+            recorder: Optional madrl.trajectory.TrajectoryRecorder; every stored
+                transition is also streamed to disk, so it outlives buffer.clear().
+        """
+        self.config = config = config or RunConfig()
+        self.device = config.device
+        self.shared_trunk = shared_trunk
+        self.target_kl = config.target_kl
+        self.recorder = recorder
 
-        self.actor_optimizer = optim.Adam(self.actor.parameters(), lr=LEARNING_RATE_ACTOR)
-        self.critic_optimizer = optim.Adam(self.critic.parameters(), lr=LEARNING_RATE_CRITIC)
+        # Actor–Critic initialization
+        if shared_trunk:
+            self.actor = SharedActorCritic(config).to(self.device)
+            # The value heads are served by the same network
+            self.critic = self.actor.value
+            self.actor_optimizer = optim.Adam([
+                {"params": list(self.actor.trunk.parameters()) + list(self.actor.policy_head.parameters()),
+                 "lr": config.learning_rate_actor},
+                {"params": list(self.actor.value_head.parameters()) + list(self.actor.cost_head.parameters()),
+                 "lr": config.learning_rate_critic},
+            ])
+            self.critic_optimizer = None
+        else:
+            self.actor = Actor(config).to(self.device)
+            self.critic = Critic(config).to(self.device)
+
+            self.actor_optimizer = optim.Adam(self.actor.parameters(), lr=config.learning_rate_actor)
+            self.critic_optimizer = optim.Adam(self.critic.parameters(), lr=config.learning_rate_critic)
+
+        self._loss_fn = torch.compile(self._compute_losses) if compile_update else self._compute_losses
 
         # Experience replay buffer for multi-agent collection
-        self.buffer = ExperienceBuffer(NUM_AGENTS)
+        self.buffer = ExperienceBuffer(config.num_agents, config=config, masked=masked, num_envs=num_envs)
 
         # Lagrange multiplier (λ) – learnable constraint coefficient
         self.lagrange_multiplier = torch.tensor(
-            LAGRANGE_INIT, dtype=torch.float32, device=DEVICE, requires_grad=True
+            config.lagrange_init, dtype=torch.float32, device=self.device, requires_grad=True
         )
-        self.lagrange_optimizer = optim.Adam([self.lagrange_multiplier], lr=LAGRANGE_LR)
+        self.lagrange_optimizer = optim.Adam([self.lagrange_multiplier], lr=config.lagrange_lr)
 
         # Episode-level cost tracking
         self.current_episode_cost_sum = 0.0
@@ -45,32 +107,32 @@ class PPOTrainer:
         """
         Collects (action, log_prob, value, cost_value) tuples for all agents.
 
+        All agents share the actor, so the whole state matrix goes through one
+        batched forward pass and one sampling draw. states may be
+        (N_agents, STATE_DIM) or (K_envs, N_agents, STATE_DIM).
+
         Returns:
-            actions: Tensor [N_agents]
-            log_probs: Tensor [N_agents]
+            actions: Tensor [N_agents] (or [K_envs, N_agents])
+            log_probs: Tensor [N_agents, 1] (or [K_envs, N_agents, 1])
             values, cost_values: Critics’ outputs
         """
         with torch.no_grad():
             values, cost_values = self.critic(states)
-
-            actions, log_probs = [], []
-            for i in range(NUM_AGENTS):
-                action, log_prob, _ = self.actor.get_action_and_log_prob(
-                    states[i], deterministic=deterministic
-                )
-                actions.append(action)
-                log_probs.append(log_prob)
-
-            actions = torch.stack(actions)
-            log_probs = torch.stack(log_probs).unsqueeze(-1)
+            actions, log_probs = self.actor.sample_actions(states, deterministic=deterministic)
+            log_probs = log_probs.unsqueeze(-1)
 
         return actions, log_probs, values, cost_values
 
-    def store(self, state, action, log_prob, reward, cost, value, cost_value, done):
+    def store(self, state, action, log_prob, reward, cost, value, cost_value, done, agent_mask=None):
         """Stores transitions in buffer and accumulates cost for constraint evaluation."""
-        self.buffer.store(state, action, log_prob, reward, cost, value, cost_value, done)
-        # Note: reward and cost tensors have shape (NUM_AGENTS, 1)
-        self.current_episode_cost_sum += cost.mean().item()
+        self.buffer.store(state, action, log_prob, reward, cost, value, cost_value, done, agent_mask)
+        if self.recorder is not None:
+            self.recorder.record(state, action, log_prob, reward, cost, done)
+        # Note: reward and cost tensors have shape (num_agents, 1)
+        if agent_mask is None:
+            self.current_episode_cost_sum += cost.mean().item()
+        else:
+            self.current_episode_cost_sum += cost.reshape(-1)[agent_mask.reshape(-1)].mean().item()
         self.current_episode_steps += 1
 
     # ---------------------------------------------------------------------- #
@@ -80,11 +142,15 @@ class PPOTrainer:
         """
         Updates the Lagrange multiplier λ to enforce cost constraint.
         """
-        # Average cost over the whole buffer (Buffer_Size * NUM_AGENTS steps)
-        avg_cost = self.buffer.costs.mean()
+        # Average cost over the whole buffer (buffer_size * num_agents steps)
+        if self.buffer.masked:
+            avg_cost = self.buffer.valid(self.buffer.agent_view(self.buffer.costs)).mean()
+        else:
+            # Every environment has the same agent count, so the per-environment mean is the same
+            avg_cost = self.buffer.costs.mean()
         
         # Loss function L_λ = −λ (E[C(τ)] − C_limit)
-        lagrange_loss = -(self.lagrange_multiplier * (avg_cost - COST_LIMIT))
+        lagrange_loss = -(self.lagrange_multiplier * (avg_cost - self.config.cost_limit))
 
         self.lagrange_optimizer.zero_grad()
         lagrange_loss.backward()
@@ -92,7 +158,7 @@ class PPOTrainer:
 
         # Project λ into [0, LAGRANGE_MAX]
         with torch.no_grad():
-            self.lagrange_multiplier.data.clamp_(0.0, LAGRANGE_MAX)
+            self.lagrange_multiplier.data.clamp_(0.0, self.config.lagrange_max)
 
         return avg_cost.item()
 
@@ -119,51 +185,41 @@ class PPOTrainer:
         current_lambda = self.lagrange_multiplier.item()
 
         # 4. PPO optimization epochs
-        for epoch in range(PPO_EPOCHS):
-            for (
-                    states, actions, old_log_probs,
-                    advantages, returns,
-                    cost_advantages, cost_returns
-                ) in self.buffer.get(BATCH_SIZE):
-
-                # Normalize advantages for stability
-                advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
-                cost_advantages = (cost_advantages - cost_advantages.mean()) / (cost_advantages.std() + 1e-8)
-
-                # ---------- POLICY LOSS (C-PPO Objective) ----------
-                
-                # Reshape actions/states for policy input: [Batch_Size * N_agents] -> [Batch_Size]
-                # Note: The buffer flattens everything, so states/actions are already flattened.
-                
-                # states: (batch, STATE_DIM), actions: (batch, 1)
-                new_log_probs = self.actor.get_log_prob(states, actions.squeeze(-1)).unsqueeze(-1)
-
-                ratio = torch.exp(new_log_probs - old_log_probs)
-
-                surr1 = ratio * advantages
-                surr2 = torch.clamp(ratio, 1.0 - CLIP_EPSILON, 1.0 + CLIP_EPSILON) * advantages
-
-                # Constrained objective: J(θ) = min(surr1, surr2) − λ * cost_advantage
-                # The gradient w.r.t λ is handled by the Lagrange update, here λ is treated as a constant factor.
-                policy_loss = -(torch.min(surr1, surr2) - current_lambda * cost_advantages).mean()
-
-                # ---------- VALUE LOSS (Critic Update) ----------
-                values, cost_values = self.critic(states)
-                value_loss = F.mse_loss(values, returns)
-                cost_value_loss = F.mse_loss(cost_values, cost_returns)
-                critic_loss = value_loss + cost_value_loss
-
-                # Gradient updates
-                self.actor_optimizer.zero_grad()
-                # Apply gradient clipping before stepping the optimizer
-                policy_loss.backward(retain_graph=True)
-                nn.utils.clip_grad_norm_(self.actor.parameters(), MAX_GRAD_NORM)
-                self.actor_optimizer.step()
-
-                self.critic_optimizer.zero_grad()
-                critic_loss.backward()
-                nn.utils.clip_grad_norm_(self.critic.parameters(), MAX_GRAD_NORM)
-                self.critic_optimizer.step()
+        # λ is passed as a tensor so a compiled loss is not specialized on its value
+        lagrange = self.lagrange_multiplier.detach()
+        self.buffer.sampling_times.clear()
+        approx_kls, clip_fractions, explained_variances, epoch_times = [], [], [], []
+        ppo_epochs = self.config.ppo_epochs
+        for epoch in range(ppo_epochs):
+            epoch_start = time.perf_counter()
+            kl_sum, clip_sum, num_batches = 0.0, 0.0, 0
+            values, returns = [], []
+            for batch in self.buffer.get(self.config.batch_size,
+                                         whole_timesteps=self.config.whole_timestep_minibatches):
+                policy_loss, critic_loss, approx_kl, clip_fraction, batch_values = self._update_minibatch(batch, lagrange)
+                kl_sum = kl_sum + approx_kl
+                clip_sum = clip_sum + clip_fraction
+                num_batches += 1
+                if self.buffer.masked:
+                    real = batch[7].squeeze(-1) > 0
+                    values.append(batch_values[real])
+                    returns.append(batch[4][real])
+                else:
+                    values.append(batch_values)
+                    returns.append(batch[4].clone())
+
+            approx_kls.append((kl_sum / num_batches).item())
+            clip_fractions.append((clip_sum / num_batches).item())
+            explained_variances.append(self._explained_variance(torch.cat(values), torch.cat(returns)))
+            epoch_times.append(time.perf_counter() - epoch_start)
+
+            if self.target_kl is not None and approx_kls[-1] > 1.5 * self.target_kl:
+                break
+
+        epochs_run = len(epoch_times)
+        epochs_skipped = ppo_epochs - epochs_run
+        sampling_times = self.buffer.sampling_times
+        sampling_time_per_epoch = sum(sampling_times) / max(1, len(sampling_times))
 
         # Clear buffer after each update cycle
         self.buffer.clear()
@@ -173,6 +229,183 @@ class PPOTrainer:
             "critic_loss": critic_loss.item(),
             "avg_cost": avg_cost_buffer,
             "lagrange_multiplier": current_lambda,
+            "sampling_time_per_epoch": sampling_time_per_epoch,
+            "approx_kl": approx_kls[-1],
+            "clip_fraction": clip_fractions[-1],
+            "explained_variance": explained_variances[-1],
+            "approx_kl_per_epoch": approx_kls,
+            "clip_fraction_per_epoch": clip_fractions,
+            "explained_variance_per_epoch": explained_variances,
+            "epochs_run": epochs_run,
+            "epochs_skipped": epochs_skipped,
+            # Estimated from the mean duration of the epochs that did run
+            "time_saved": epochs_skipped * sum(epoch_times) / epochs_run,
+        }
+
+    def _compute_losses(self, states, actions, old_log_probs, advantages, returns,
+                        cost_advantages, cost_returns, lagrange, mask=None):
+        """
+        C-PPO policy loss and critic loss for one minibatch, in a single graph.
+
+        states: (batch, STATE_DIM), actions and all other tensors: (batch, 1).
+        mask (batch, 1), if given, weights every mean: padding rows count as 0.
+        """
+        # Normalize advantages for stability
+        advantages = _normalize(advantages, mask)
+        cost_advantages = _normalize(cost_advantages, mask)
+
+        # One trunk pass for the shared network, one pass per network otherwise
+        if self.shared_trunk:
+            logits, values, cost_values = self.actor.evaluate(states)
+        else:
+            logits = self.actor(states)
+            values, cost_values = self.critic(states)
+
+        # ---------- POLICY LOSS (C-PPO Objective) ----------
+        new_log_probs = torch.log_softmax(logits, dim=-1).gather(-1, actions)
+
+        log_ratio = new_log_probs - old_log_probs
+        ratio = torch.exp(log_ratio)
+
+        surr1 = ratio * advantages
+        clip_epsilon = self.config.clip_epsilon
+        surr2 = torch.clamp(ratio, 1.0 - clip_epsilon, 1.0 + clip_epsilon) * advantages
+
+        # Constrained objective: J(θ) = min(surr1, surr2) − λ * cost_advantage
+        # The gradient w.r.t λ is handled by the Lagrange update, here λ is treated as a constant factor.
+        policy_loss = -_masked_mean(torch.min(surr1, surr2) - lagrange * cost_advantages, mask)
+
+        # ---------- VALUE LOSS (Critic Update) ----------
+        if mask is None:
+            value_loss = F.mse_loss(values, returns)
+            cost_value_loss = F.mse_loss(cost_values, cost_returns)
+        else:
+            value_loss = _masked_mean((values - returns) ** 2, mask)
+            cost_value_loss = _masked_mean((cost_values - cost_returns) ** 2, mask)
+        critic_loss = value_loss + cost_value_loss
+
+        # ---------- DIAGNOSTICS ----------
+        with torch.no_grad():
+            # k3 estimator of KL(old || new): E[(r - 1) - log r]
+            approx_kl = _masked_mean((ratio - 1.0) - log_ratio, mask)
+            clip_fraction = _masked_mean(((ratio - 1.0).abs() > clip_epsilon).float(), mask)
+
+        return policy_loss, critic_loss, approx_kl, clip_fraction, values.detach()
+
+    def _update_minibatch(self, batch, lagrange):
+        """
+        One gradient step on both networks with a single backward pass.
+
+        Returns (policy_loss, critic_loss, approx_kl, clip_fraction, values), all detached.
+
+        Actor and critic parameters are disjoint, so backpropagating the summed loss
+        gives each network exactly the gradient of its own loss; gradients are then
+        clipped separately per network (for the shared network, once over all of it).
+        """
+        states, actions, old_log_probs, advantages, returns, cost_advantages, cost_returns = batch[:7]
+        # Masked buffers append the agent mask column
+        mask = batch[7] if len(batch) > 7 else None
+        policy_loss, critic_loss, approx_kl, clip_fraction, values = self._loss_fn(
+            states, actions, old_log_probs, advantages, returns, cost_advantages, cost_returns, lagrange, mask
+        )
+
+        self.actor_optimizer.zero_grad()
+        if self.critic_optimizer is not None:
+            self.critic_optimizer.zero_grad()
+
+        (policy_loss + critic_loss).backward()
+
+        # Apply gradient clipping before stepping the optimizers
+        max_grad_norm = self.config.max_grad_norm
+        nn.utils.clip_grad_norm_(self.actor.parameters(), max_grad_norm)
+        self.actor_optimizer.step()
+        if self.critic_optimizer is not None:
+            nn.utils.clip_grad_norm_(self.critic.parameters(), max_grad_norm)
+            self.critic_optimizer.step()
+
+        return policy_loss.detach(), critic_loss.detach(), approx_kl, clip_fraction, values
+
+    @staticmethod
+    def _explained_variance(values, returns):
+        """1 - Var(returns - values) / Var(returns); 1 is a perfect value fit."""
+        var_returns = returns.var()
+        if var_returns.item() == 0:
+            return float('nan')
+        return (1.0 - (returns - values).var() / var_returns).item()
+
+    # ---------------------------------------------------------------------- #
+    #  OFFLINE PRETRAINING
+    # ---------------------------------------------------------------------- #
+    def pretrain_actor(self, batches):
+        """
+        Behaviour cloning: one actor step per batch minimizing the cross-entropy of the
+        recorded actions (e.g. fixed-time or actuated controller logs, see madrl.offline).
+
+        batches: iterable of dicts with 'states' (T, A, STATE_DIM) and 'actions' (T, A, 1),
+            e.g. madrl.offline.trajectory_loader(...)
+        Returns dict: bc_loss (mean over batches), bc_accuracy, batches.
+        """
+        total_loss, correct, count, num_batches = 0.0, 0, 0, 0
+        for batch in batches:
+            states = batch['states'].to(self.device, torch.float32).reshape(-1, self.config.state_dim)
+            actions = batch['actions'].to(self.device).reshape(-1).long()
+            logits = self.actor(states)
+            loss = F.cross_entropy(logits, actions)
+
+            self.actor_optimizer.zero_grad()
+            loss.backward()
+            nn.utils.clip_grad_norm_(self.actor.parameters(), self.config.max_grad_norm)
+            self.actor_optimizer.step()
+
+            total_loss += loss.item()
+            correct += (logits.argmax(-1) == actions).sum().item()
+            count += actions.numel()
+            num_batches += 1
+        return {
+            "bc_loss": total_loss / max(1, num_batches),
+            "bc_accuracy": correct / max(1, count),
+            "batches": num_batches,
+        }
+
+    def fit_critic(self, batches):
+        """
+        Regress the value and cost-value heads on recorded discounted returns.
+
+        batches: iterable of dicts with 'states', 'returns' and 'cost_returns', e.g.
+            madrl.offline.trajectory_loader(..., gamma=config.gamma)
+        Returns dict: critic_loss (mean over batches), explained_variance (of the value
+        head over all batches, before each batch's step), batches.
+        """
+        optimizer = self.critic_optimizer or self.actor_optimizer
+        parameters = list(self.critic.parameters() if self.critic_optimizer is not None else self.actor.parameters())
+        total_loss, num_batches = 0.0, 0
+        # Running sums of returns and residuals, for the explained variance of the whole pass
+        sums = torch.zeros(5, dtype=torch.float64)
+        for batch in batches:
+            states = batch['states'].to(self.device, torch.float32)
+            returns = batch['returns'].to(self.device)
+            cost_returns = batch['cost_returns'].to(self.device)
+            values, cost_values = self.critic(states)
+            loss = F.mse_loss(values, returns) + F.mse_loss(cost_values, cost_returns)
+
+            optimizer.zero_grad()
+            loss.backward()
+            nn.utils.clip_grad_norm_(parameters, self.config.max_grad_norm)
+            optimizer.step()
+
+            total_loss += loss.item()
+            num_batches += 1
+            residual = (returns - values.detach()).double()
+            r = returns.double()
+            sums += torch.stack([r.new_tensor(r.numel()), r.sum(), (r * r).sum(), residual.sum(), (residual * residual).sum()]).cpu()
+        n, r_sum, r_sq, e_sum, e_sq = sums.tolist()
+        var_returns = r_sq / max(n, 1) - (r_sum / max(n, 1)) ** 2
+        var_residual = e_sq / max(n, 1) - (e_sum / max(n, 1)) ** 2
+        explained_variance = 1.0 - var_residual / var_returns if var_returns > 0 else float('nan')
+        return {
+            "critic_loss": total_loss / max(1, num_batches),
+            "explained_variance": explained_variance,
+            "batches": num_batches,
         }
 
     # ---------------------------------------------------------------------- #
@@ -189,5 +422,9 @@ class PPOTrainer:
 
     def save_models(self, path_prefix="final"):
         """Saves trained Actor and Critic model weights."""
-        torch.save(self.actor.state_dict(), f"{MODEL_DIR}/actor_{path_prefix}.pt")
-        torch.save(self.critic.state_dict(), f"{MODEL_DIR}/critic_{path_prefix}.pt")
\ No newline at end of file
+        model_dir = self.config.model_dir
+        os.makedirs(model_dir, exist_ok=True)
+        torch.save(self.actor.state_dict(), f"{model_dir}/actor_{path_prefix}.pt")
+        if not self.shared_trunk:
+            # The shared network already holds the value heads
+            torch.save(self.critic.state_dict(), f"{model_dir}/critic_{path_prefix}.pt")
\ No newline at end of file
@@ -0,0 +1,142 @@
+import time
+import torch
+from src.env.vector_env import VectorTrafficEnv
+
+
+class AsyncRolloutRunner:
+    """
+    Double-buffered rollout collection that overlaps SUMO simulation with policy inference.
+
+    The environments are split into two groups (A and B), each a VectorTrafficEnv. While
+    group A simulates step t, the policy computes the actions of group B, and vice versa,
+    so the simulator workers and the networks are busy at the same time.
+
+    policy_fn(states) receives a (K_group, NUM_AGENTS, STATE_DIM) tensor and returns
+    either a (K_group, NUM_AGENTS) action tensor or a tuple whose first element is the
+    action tensor (e.g. actions, log_probs, values, cost_values); the full output is
+    handed back with the transition so it can be stored in a buffer.
+    """
+
+    def __init__(self, num_envs, policy_fn, gui=False, use_sumo=True, scenario='medium', start_method=None,
+                 city='city4x4'):
+        if num_envs < 2:
+            raise ValueError("AsyncRolloutRunner needs at least 2 environments (one per buffer)")
+        half = num_envs // 2
+        self.num_envs = num_envs
+        self.policy_fn = policy_fn
+        self.groups = [
+            VectorTrafficEnv(size, gui=gui, use_sumo=use_sumo, scenario=scenario, start_method=start_method,
+                             city=city)
+            for size in (half, num_envs - half)
+        ]
+        self._states = [None, None]
+        self._pending = [None, None]
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.policy_time = 0.0   # main process, inside policy_fn
+        self.wait_time = 0.0     # main process, blocked in step_wait
+        self.sim_time = 0.0      # slowest worker of each group step, summed
+        self.wall_time = 0.0
+        self.env_steps = 0
+
+    def reset(self, seed=None, scenario=None):
+        """Resets both groups. Returns the states of group A and group B."""
+        offset = self.groups[0].num_envs
+        self._states = [
+            self.groups[0].reset(seed=seed, scenario=scenario),
+            self.groups[1].reset(seed=None if seed is None else seed + offset, scenario=scenario),
+        ]
+        return tuple(self._states)
+
+    def _launch(self, g):
+        """Runs the policy on group g's latest states and starts its simulation step."""
+        states = self._states[g]
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            output = self.policy_fn(states)
+        self.policy_time += time.perf_counter() - t0
+
+        actions = output[0] if isinstance(output, tuple) else output
+        self.groups[g].step_async(actions)
+        self._pending[g] = (states, output)
+
+    def _wait(self, g):
+        """Waits for group g's simulation step and returns its transition."""
+        # No longer in flight once its replies are read, even if a worker failed
+        states, output = self._pending[g]
+        self._pending[g] = None
+        t0 = time.perf_counter()
+        try:
+            next_states, rewards, costs, dones, infos = self.groups[g].step_wait()
+        except Exception:
+            # The group's states are unknown after a worker failure: the next run() resets
+            self._states[g] = None
+            raise
+        self.wait_time += time.perf_counter() - t0
+        self.sim_time += max(info.get('step_time', 0.0) for info in infos)
+        self.env_steps += self.groups[g].num_envs
+
+        self._states[g] = next_states
+        return g, states, output, next_states, rewards, costs, dones, infos
+
+    def _settle(self, g):
+        """Waits for group g's in-flight step and drops its transition (not counted in the stats)."""
+        self._pending[g] = None
+        try:
+            self._states[g] = self.groups[g].step_wait()[0]
+        except Exception as e:
+            print(f"[WARN] Dropped group {g} step failed: {e}")
+            self._states[g] = None
+
+    def run(self, num_steps):
+        """
+        Advances every environment by num_steps steps.
+
+        Yields (group, states, policy_output, next_states, rewards, costs, dones, infos)
+        once per group step, alternating A, B, A, B, ...
+
+        If the consumer stops early, the group step already in flight is waited for
+        (its transition is dropped) so the next run() starts from settled workers.
+        """
+        if self._states[0] is None or self._states[1] is None:
+            self.reset()
+
+        total = 2 * num_steps
+        start = time.perf_counter()
+        try:
+            self._launch(0)
+            for i in range(total):
+                # Compute the next group's actions while group i % 2 is simulating
+                if i + 1 < total:
+                    self._launch((i + 1) % 2)
+                yield self._wait(i % 2)
+        finally:
+            for g in (0, 1):
+                if self._pending[g] is not None:
+                    self._settle(g)
+            self.wall_time += time.perf_counter() - start
+
+    def get_stats(self):
+        """
+        Throughput and overlap of the collected steps.
+
+        overlap_ratio is the share of the shorter of (simulation, inference) that was
+        hidden behind the other: 0 for a fully sequential loop, 1 for perfect overlap.
+        """
+        hidden = self.sim_time + self.policy_time - self.wall_time
+        shorter = min(self.sim_time, self.policy_time)
+        overlap = min(1.0, max(0.0, hidden / shorter)) if shorter > 0 else 0.0
+        return {
+            'env_steps': self.env_steps,
+            'wall_time': self.wall_time,
+            'policy_time': self.policy_time,
+            'sim_time': self.sim_time,
+            'wait_time': self.wait_time,
+            'steps_per_sec': self.env_steps / self.wall_time if self.wall_time > 0 else 0.0,
+            'overlap_ratio': overlap,
+        }
+
+    def close(self):
+        for group in self.groups:
+            group.close()
@@ -0,0 +1,250 @@
+import glob
+import json
+import os
+import time
+import numpy as np
+import torch
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.config import TRAJECTORY_DIR, RunConfig
+from src.madrl.buffer import ExperienceBuffer, reverse_discounted_scan
+
+MANIFEST = 'manifest.json'
+CHUNK_STEPS = 4096
+RETURN_COLUMNS = ('returns', 'cost_returns')
+# Recorded per step: (field, per-step shape from (num_agents, num_envs, state_dim))
+COLUMNS = (
+    ('states', lambda a, e, s: (a, s)),
+    ('actions', lambda a, e, s: (a,)),
+    ('log_probs', lambda a, e, s: (a,)),
+    ('rewards', lambda a, e, s: (a,)),
+    ('costs', lambda a, e, s: (a,)),
+    ('dones', lambda a, e, s: (e,)),
+)
+
+
+def trajectory_dir(city, scenario, seed, checkpoint, root=TRAJECTORY_DIR):
+    """Directory of the recording of one (city, scenario, seed, policy checkpoint)."""
+    checkpoint = os.path.splitext(os.path.basename(str(checkpoint)))[0]
+    return os.path.join(root, city, scenario, f"seed{seed}", checkpoint)
+
+
+def _write_json_atomic(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _numpy(x):
+    return x.detach().cpu().numpy() if isinstance(x, torch.Tensor) else np.asarray(x)
+
+
+class TrajectoryRecorder:
+    """
+    Streams every stored transition to chunked memory-mapped .npy files.
+
+    Each column (states, actions, log_probs, rewards, costs, dones) is written
+    row by row into a preallocated `chunk_steps`-row .npy file opened with
+    np.lib.format.open_memmap; a full chunk is flushed and the manifest (city,
+    scenario, seed, checkpoint, shapes, dtypes and rows per chunk) is rewritten
+    atomically, so a crash keeps every completed chunk readable. close() trims
+    the last chunk to its rows.
+
+    Attach it to a trainer (PPOTrainer(recorder=...)) to record what
+    PPOTrainer.store() receives; actions are stored as uint8 when action_dim
+    allows, dones as one flag per environment.
+    """
+
+    def __init__(self, city, scenario, seed, checkpoint, config=None, num_envs=1,
+                 root=TRAJECTORY_DIR, chunk_steps=CHUNK_STEPS):
+        self.config = config = config or RunConfig()
+        self.directory = trajectory_dir(city, scenario, seed, checkpoint, root)
+        if os.path.exists(os.path.join(self.directory, MANIFEST)):
+            raise FileExistsError(f"a trajectory is already recorded in {self.directory}")
+        os.makedirs(self.directory, exist_ok=True)
+        self.chunk_steps = chunk_steps
+        self.num_envs = num_envs
+        action_dtype = np.uint8 if config.action_dim <= 256 else np.int64
+        dtypes = {'actions': action_dtype, 'dones': np.bool_}
+        self.columns = {
+            name: (shape(config.num_agents, num_envs, config.state_dim), np.dtype(dtypes.get(name, np.float32)))
+            for name, shape in COLUMNS
+        }
+        self.manifest = {
+            'city': city, 'scenario': scenario, 'seed': seed, 'checkpoint': str(checkpoint),
+            'num_agents': config.num_agents, 'num_envs': num_envs, 'state_dim': config.state_dim,
+            'created': time.time(), 'steps': 0,
+            'columns': {name: {'shape': list(shape), 'dtype': dtype.str} for name, (shape, dtype) in self.columns.items()},
+            'chunks': [],
+        }
+        self._chunk = None
+        self._row = 0
+
+    def _open_chunk(self):
+        index = len(self.manifest['chunks'])
+        self._chunk = {
+            name: np.lib.format.open_memmap(self._chunk_path(index, name), mode='w+', dtype=dtype,
+                                            shape=(self.chunk_steps,) + shape)
+            for name, (shape, dtype) in self.columns.items()
+        }
+        self._row = 0
+
+    def _chunk_path(self, index, name):
+        return os.path.join(self.directory, f"{name}.{index:05d}.npy")
+
+    def record(self, state, action, log_prob, reward, cost, done):
+        """Append one step (the arguments of PPOTrainer.store)."""
+        if self._chunk is None:
+            self._open_chunk()
+        row = self._row
+        for name, value in zip(self.columns, (state, action, log_prob, reward, cost, done)):
+            shape, _ = self.columns[name]
+            column = self._chunk[name]
+            if name == 'dones' and np.ndim(value) == 0:
+                column[row] = bool(value)
+            else:
+                column[row] = _numpy(value).reshape(shape)
+        self._row += 1
+        self.manifest['steps'] += 1
+        if self._row == self.chunk_steps:
+            self._close_chunk()
+
+    def _close_chunk(self):
+        index = len(self.manifest['chunks'])
+        rows = self._row
+        for name, column in self._chunk.items():
+            column.flush()
+            if rows < self.chunk_steps:
+                # Trim the last chunk: replace it with just its filled rows
+                path = self._chunk_path(index, name)
+                with open(f"{path}.tmp", 'wb') as f:
+                    np.save(f, column[:rows])
+                os.replace(f"{path}.tmp", path)
+        self._chunk = None
+        self.manifest['chunks'].append({'index': index, 'rows': rows})
+        _write_json_atomic(os.path.join(self.directory, MANIFEST), self.manifest)
+
+    def close(self):
+        if self._chunk is not None and self._row > 0:
+            self._close_chunk()
+        elif not self.manifest['chunks']:
+            _write_json_atomic(os.path.join(self.directory, MANIFEST), self.manifest)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryDataset:
+    """
+    A recorded trajectory, served from its memory-mapped chunks.
+
+    batches() yields dicts of torch tensors that are views of the mapped files
+    (np.load(mmap_mode='c'), so nothing is read into RAM until it is touched and
+    the files are never written); to_buffer() turns one into a full
+    ExperienceBuffer, recomputing values with the given critic. After
+    compute_returns(gamma) the batches also carry 'returns' and 'cost_returns'.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.num_agents = self.manifest['num_agents']
+        self.num_envs = self.manifest['num_envs']
+        self._chunks = None
+
+    def __len__(self):
+        return self.manifest['steps']
+
+    @property
+    def column_names(self):
+        derived = RETURN_COLUMNS if 'returns' in self.manifest else ()
+        return tuple(self.manifest['columns']) + derived
+
+    @property
+    def chunks(self):
+        """Per chunk, a dict of column name -> memory-mapped array."""
+        if self._chunks is None:
+            self._chunks = [
+                {name: np.load(os.path.join(self.directory, f"{name}.{chunk['index']:05d}.npy"), mmap_mode='c')
+                 for name in self.column_names}
+                for chunk in self.manifest['chunks']
+            ]
+        return self._chunks
+
+    def compute_returns(self, gamma):
+        """
+        Discounted reward and cost returns of every recorded step, written next to the
+        recording as 'returns'/'cost_returns' chunk columns (recomputed only when gamma
+        changes). Chunks are processed last to first, carrying the return across chunk
+        boundaries; the recording's final step bootstraps with 0.
+        """
+        if self.manifest.get('returns', {}).get('gamma') == gamma:
+            return
+        self.manifest.pop('returns', None)
+        self._chunks = None
+        carry = torch.zeros(self.num_agents, 2)
+        for chunk, arrays in reversed(list(zip(self.manifest['chunks'], self.chunks))):
+            rewards = torch.from_numpy(arrays['rewards'])
+            costs = torch.from_numpy(arrays['costs'])
+            dones = torch.from_numpy(arrays['dones']).repeat_interleave(self.num_agents // self.num_envs, dim=1)
+            discounts = gamma * (~dones).to(torch.float32)
+            returns = reverse_discounted_scan(torch.stack([rewards, costs], dim=-1), discounts.unsqueeze(-1))
+            # R_t also collects the discounted return carried in from the next chunk
+            tail = discounts.flip(0).cumprod(0).flip(0)
+            returns += tail.unsqueeze(-1) * carry
+            carry = returns[0]
+            for k, name in enumerate(RETURN_COLUMNS):
+                np.save(os.path.join(self.directory, f"{name}.{chunk['index']:05d}.npy"), returns[..., k].numpy())
+        self.manifest['returns'] = {'gamma': gamma}
+        _write_json_atomic(os.path.join(self.directory, MANIFEST), self.manifest)
+        self._chunks = None
+
+    def batches(self, steps=None):
+        """
+        Consecutive windows of at most `steps` steps (default: whole chunks) as dicts of
+        zero-copy tensors: states (T, A, S), actions/log_probs/rewards/costs (T, A, 1),
+        dones (T, num_envs, 1). Windows do not cross chunk boundaries.
+        """
+        for c, chunk in enumerate(self.chunks):
+            rows = chunk['states'].shape[0]
+            step = steps or rows
+            for start in range(0, rows, step):
+                yield self.window(c, start, step)
+
+    def window(self, chunk, start, steps):
+        """Rows start:start + steps of one chunk, as batches() yields them."""
+        return {
+            name: torch.from_numpy(array[start:start + steps]).view(
+                (-1,) + array.shape[1:] + (() if name == 'states' else (1,)))
+            for name, array in self.chunks[chunk].items()
+        }
+
+    def to_buffer(self, batch, critic, config=None, next_states=None):
+        """
+        A full ExperienceBuffer over one batch. Values and cost values are computed with
+        `critic` (recorded data carries none); the other fields stay views of the files.
+        Returns (buffer, next_v, next_cv): the bootstrap values for
+        compute_advantages_and_returns, from next_states (zeros if None).
+        """
+        states = batch['states']
+        with torch.no_grad():
+            values, cost_values = critic(states.to(torch.float32))
+            if next_states is None:
+                next_v, next_cv = torch.zeros_like(values[0]), torch.zeros_like(cost_values[0])
+            else:
+                next_v, next_cv = critic(next_states)
+        buffer = ExperienceBuffer.from_storage(
+            states, batch['actions'], batch['log_probs'], batch['rewards'], batch['costs'], batch['dones'],
+            values, cost_values, config=config, num_envs=self.num_envs)
+        return buffer, next_v, next_cv
+
+
+def find_trajectories(root=TRAJECTORY_DIR, city='*', scenario='*', seed='*', checkpoint='*'):
+    """Directories of the recorded trajectories matching the given keys ('*' matches any)."""
+    pattern = os.path.join(root, city, scenario, f"seed{seed}", checkpoint, MANIFEST)
+    return sorted(os.path.dirname(path) for path in glob.glob(pattern))
@@ -0,0 +1,78 @@
+"""Simulation backend selection, and TrafficEnv / SUMOInterface on the fake backend."""
+import os
+import sys
+
+import pytest
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import SUMO_BACKEND, get_sumo_config_file
+from src.env import backends
+from src.env.backends import claim_libsumo, get_backend, is_libsumo, libsumo_available, release_libsumo
+from src.env.fake_traci import FakeTraCI
+from src.env.sumo_interface import SUMOInterface
+from src.env.traffic_env import TrafficEnv
+
+
+def test_traci_is_the_default():
+    assert SUMO_BACKEND == 'traci'
+    assert get_backend().__name__ == 'traci'
+    assert get_backend('traci').__name__ == 'traci'
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_backend('sumo-rpc')
+
+
+def test_fake_backend_is_a_fresh_fake_traci():
+    first, second = get_backend('fake'), get_backend('fake')
+    assert isinstance(first, FakeTraCI) and first is not second
+
+
+def test_gui_never_uses_libsumo():
+    assert not is_libsumo(get_backend('libsumo', gui=True))
+    assert not is_libsumo(get_backend('auto', gui=True))
+
+
+@pytest.mark.skipif(not libsumo_available(), reason="libsumo is not installed")
+def test_libsumo_is_opt_in():
+    assert is_libsumo(get_backend('libsumo'))
+    assert is_libsumo(get_backend('auto'))
+
+
+def test_libsumo_claim_is_exclusive(monkeypatch):
+    monkeypatch.setattr(backends, '_libsumo_owner', None)
+    first, second = object(), object()
+    assert claim_libsumo(first)
+    assert claim_libsumo(first)
+    assert not claim_libsumo(second)
+    release_libsumo(second)
+    assert not claim_libsumo(second)
+    release_libsumo(first)
+    assert claim_libsumo(second)
+    release_libsumo(second)
+
+
+def test_sumo_interface_on_the_fake_backend():
+    sumo = SUMOInterface(sumo_cfg_path=get_sumo_config_file('medium'), backend='fake')
+    sumo.start(seed=7)
+    assert sumo.tls_ids == FakeTraCI().network_tls_ids()
+    states = sumo.get_all_states()
+    assert states.shape == (len(sumo.tls_ids), 12)
+    assert sumo._api.starts == 1
+    sumo.end()
+    assert not sumo.running
+
+
+def test_traffic_env_on_the_fake_backend():
+    env = TrafficEnv(use_sumo=True, scenario='medium', backend='fake')
+    states = env.reset(seed=0)
+    assert states.shape == (env.num_agents, 12)
+    for _ in range(5):
+        actions = torch.ones(env.num_agents, dtype=torch.long)
+        states, rewards, costs, done, info = env.step(actions)
+    assert rewards.shape == (env.num_agents, 1)
+    assert not done
+    env.close()
@@ -0,0 +1,55 @@
+"""Rule-based baseline controllers and their behaviour log probabilities."""
+import math
+import os
+import sys
+
+import pytest
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.agents.baselines import ActuatedController, BaselineController, FixedTimeController
+from src.config import RunConfig
+
+
+@pytest.fixture
+def config():
+    return RunConfig(num_agents=4, device='cpu')
+
+
+def test_baseline_controller_is_abstract(config):
+    with pytest.raises(TypeError):
+        BaselineController(config)
+
+    class Incomplete(BaselineController):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(config)
+
+
+def test_epsilon_mixture_log_probs(config):
+    torch.manual_seed(0)
+    controller = FixedTimeController(config, epsilon=0.5)
+    actions, log_probs = controller.act(torch.rand(2000, config.num_agents, config.state_dim))
+    assert actions.shape == log_probs.shape == (2000, config.num_agents)
+    # Rule action 0 with probability 1 - eps + eps / 2, the other with eps / 2
+    assert (actions == 1).float().mean().item() == pytest.approx(0.25, abs=0.02)
+    assert torch.equal(log_probs == math.log(0.75), actions == 0)
+    assert torch.equal(log_probs == math.log(0.25), actions == 1)
+
+    greedy, greedy_log_probs = FixedTimeController(config).act(torch.rand(3, config.num_agents, config.state_dim))
+    assert not greedy.any() and not greedy_log_probs.any()
+
+
+def test_actuated_controller_gaps_out(config):
+    controller = ActuatedController(config, min_green=4, max_green=10, gap=2)
+    states = torch.zeros(config.num_agents, config.state_dim)
+    first_switch = {}
+    for t in range(12):
+        # Agent 0's queue stays put (the green no longer discharges), the others drain theirs
+        states[:, 1] = torch.tensor([5.0, 12.0 - t, 12.0 - t, 12.0 - t])
+        for agent in controller.act(states)[0].nonzero().flatten().tolist():
+            first_switch.setdefault(agent, t)
+    # Gap-out once min_green steps have passed; the draining greens run to max_green
+    assert first_switch == {0: 3, 1: 9, 2: 9, 3: 9}
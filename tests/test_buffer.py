@@ -0,0 +1,100 @@
+"""GAE of ExperienceBuffer against the per-step reverse recurrence it replaces."""
+import os
+import sys
+
+import pytest
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.madrl.buffer import ExperienceBuffer, reverse_discounted_scan
+
+T, NUM_ENVS, AGENTS_PER_ENV = 50, 2, 4
+NUM_AGENTS = NUM_ENVS * AGENTS_PER_ENV
+
+
+def reference_gae(rewards, costs, values, cost_values, dones, next_v, next_cv, gamma, gae_lambda):
+    """The sequential reverse loop, in float64: (advantages, returns, cost_advantages, cost_returns)."""
+    def gae(rewards, values, next_value):
+        advantages = torch.zeros_like(values)
+        running = torch.zeros_like(values[0])
+        for t in reversed(range(T)):
+            not_done = 1.0 - dones[t]
+            following = next_value if t == T - 1 else values[t + 1]
+            delta = rewards[t] + gamma * following * not_done - values[t]
+            running = delta + gamma * gae_lambda * not_done * running
+            advantages[t] = running
+        return advantages, advantages + values
+
+    return gae(rewards, values, next_v) + gae(costs, cost_values, next_cv)
+
+
+@pytest.fixture
+def rollout():
+    """T steps of 2 environments x 4 agents; rewards, costs and dones are per environment."""
+    generator = torch.Generator().manual_seed(0)
+    env_rewards = torch.randn(T, NUM_ENVS, 1, generator=generator)
+    env_costs = torch.rand(T, NUM_ENVS, 1, generator=generator) * 5
+    env_dones = torch.zeros(T, NUM_ENVS, 1)
+    # Episode ends mid-sequence, at different steps in each environment, and at the last step
+    env_dones[[7, 23, 24], 0] = 1
+    env_dones[[15, T - 1], 1] = 1
+    per_agent = lambda x: x.repeat_interleave(AGENTS_PER_ENV, dim=1)
+    return {
+        'states': torch.randn(T, NUM_AGENTS, 12, generator=generator),
+        'actions': torch.randint(0, 4, (T, NUM_AGENTS, 1), generator=generator),
+        'log_probs': torch.randn(T, NUM_AGENTS, 1, generator=generator),
+        'rewards': per_agent(env_rewards), 'costs': per_agent(env_costs), 'dones': per_agent(env_dones),
+        'env_dones': env_dones.reshape(T, NUM_ENVS),
+        'values': torch.randn(T, NUM_AGENTS, 1, generator=generator),
+        'cost_values': torch.rand(T, NUM_AGENTS, 1, generator=generator) * 20,
+        'next_v': torch.randn(NUM_AGENTS, 1, generator=generator),
+        'next_cv': torch.rand(NUM_AGENTS, 1, generator=generator) * 20,
+    }
+
+
+def fill(buffer, rollout):
+    for t in range(T):
+        buffer.store(rollout['states'][t], rollout['actions'][t], rollout['log_probs'][t],
+                     rollout['rewards'][t], rollout['costs'][t], rollout['values'][t],
+                     rollout['cost_values'][t], rollout['env_dones'][t])
+    buffer.compute_advantages_and_returns(rollout['next_v'], rollout['next_cv'])
+
+
+@pytest.mark.parametrize('compact', [False, True], ids=['full', 'compact'])
+@pytest.mark.parametrize('use_torchscript', [False, True], ids=['eager', 'torchscript'])
+def test_gae_matches_reverse_loop(rollout, compact, use_torchscript):
+    config = RunConfig(num_agents=NUM_AGENTS, buffer_size=T, compact_buffer=compact,
+                       gae_torchscript=use_torchscript, device='cpu')
+    buffer = ExperienceBuffer(NUM_AGENTS, config=config, num_envs=NUM_ENVS)
+    assert buffer.use_torchscript == use_torchscript
+    fill(buffer, rollout)
+
+    expected = reference_gae(*(rollout[k].double() for k in
+                               ('rewards', 'costs', 'values', 'cost_values', 'dones', 'next_v', 'next_cv')),
+                             config.gamma, config.gae_lambda)
+    actual = (buffer.advantages, buffer.returns, buffer.cost_advantages, buffer.cost_returns)
+    for name, a, e in zip(('advantages', 'returns', 'cost_advantages', 'cost_returns'), actual, expected):
+        assert a.shape == (T, NUM_AGENTS, 1), name
+        torch.testing.assert_close(a.double(), e, rtol=1e-5, atol=1e-4, msg=name)
+
+
+def test_done_cuts_the_scan_exactly():
+    # Nothing after an episode end may leak into the advantages before it
+    deltas = torch.arange(1.0, 9.0).reshape(8, 1, 1)
+    discounts = torch.full((8, 1, 1), 0.5)
+    discounts[3] = 0.0
+    scanned = reverse_discounted_scan(deltas, discounts)
+    assert scanned[3].item() == 4.0
+    assert scanned[2].item() == 3.0 + 0.5 * 4.0
+    changed = deltas.clone()
+    changed[4:] += 100.0
+    assert torch.equal(reverse_discounted_scan(changed, discounts)[:4], scanned[:4])
+
+
+def test_use_torchscript_argument_overrides_the_config():
+    config = RunConfig(num_agents=4, buffer_size=8, gae_torchscript=True, device='cpu')
+    assert ExperienceBuffer(4, config=config).use_torchscript
+    assert not ExperienceBuffer(4, use_torchscript=False, config=config).use_torchscript
+    assert not ExperienceBuffer(4, config=config.override(gae_torchscript=False)).use_torchscript
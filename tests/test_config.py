@@ -0,0 +1,57 @@
+"""RunConfig defaults and the single src.config import root."""
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src import config
+from src.config import RunConfig
+
+
+def test_library_modules_share_one_config_module():
+    # Fresh interpreter, with src/ on sys.path as the training scripts set it up
+    code = (
+        "import sys; sys.path.insert(0, 'src')\n"
+        "import src.madrl.evaluation, src.madrl.offline, src.madrl.ppo_trainer, src.madrl.trajectory\n"
+        "import src.env.traffic_env, src.env.vector_env, src.agents.baselines\n"
+        "assert 'config' not in sys.modules, 'bare config module imported'\n"
+        "assert 'madrl.buffer' not in sys.modules, 'second ExperienceBuffer module imported'\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True)
+
+
+def test_constant_overrides_reach_the_defaults(monkeypatch):
+    from src.madrl.buffer import ExperienceBuffer
+    from src.madrl.ppo_trainer import PPOTrainer
+    monkeypatch.setattr(config, 'BUFFER_SIZE', 64)
+    monkeypatch.setattr(config, 'NUM_AGENTS', 9)
+    run = RunConfig(device='cpu')
+    assert (run.buffer_size, run.num_agents) == (64, 9)
+    trainer = PPOTrainer(config=run)
+    assert isinstance(trainer.buffer, ExperienceBuffer)
+    assert trainer.buffer.states.shape[:2] == (64, 9)
+
+
+def test_for_city_sets_the_agent_count():
+    assert RunConfig.for_city('city3x3').num_agents == 9
+    assert RunConfig.for_city('city5x5', buffer_size=32).override(device='cpu').buffer_size == 32
+
+
+def test_kl_early_stopping_is_opt_in():
+    import torch
+    from src.madrl.ppo_trainer import PPOTrainer
+    assert RunConfig().target_kl is None
+
+    def epochs_run(**overrides):
+        torch.manual_seed(0)
+        trainer = PPOTrainer(config=RunConfig(num_agents=4, buffer_size=32, batch_size=32, ppo_epochs=4,
+                                              device='cpu', **overrides))
+        for _ in range(32):
+            states = torch.rand(4, trainer.config.state_dim)
+            trainer.buffer.store(states, torch.randint(0, trainer.config.action_dim, (4,)), torch.zeros(4),
+                                 torch.randn(4), torch.rand(4), torch.zeros(4), torch.zeros(4), False)
+        return trainer.train_step(torch.rand(4, trainer.config.state_dim), False)['epochs_run']
+
+    assert epochs_run() == 4
+    assert epochs_run(target_kl=1e-9) == 1
@@ -0,0 +1,75 @@
+"""Parallel, resumable checkpoint evaluation (madrl.evaluation) on the surrogate."""
+import json
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.madrl.evaluation import EvaluationHarness, mean_ci, t_critical
+from src.madrl.ppo_trainer import PPOTrainer
+
+
+def make_harness(tmp_path, checkpoints, steps=5, seeds=(0, 1), **kwargs):
+    config = RunConfig(max_steps_per_episode=steps, device='cpu')
+    return EvaluationHarness(checkpoints, scenarios=('low', 'high'), seeds=seeds, sweep='test',
+                             log_dir=str(tmp_path / "logs"), max_workers=2, use_sumo=False, config=config, **kwargs)
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    trainer = PPOTrainer(shared_trunk=True, config=RunConfig(device='cpu', model_dir=str(tmp_path)))
+    trainer.save_models('shared')
+    return os.path.join(str(tmp_path), 'actor_shared.pt')
+
+
+def test_sweep_resumes_from_the_log(tmp_path, checkpoint):
+    harness = make_harness(tmp_path, [checkpoint, 'fixed_time'])
+    assert len(list(harness.run())) == 8
+    assert all(r['steps'] == 5 for r in harness.results())
+
+    extended = make_harness(tmp_path, [checkpoint, 'fixed_time'], seeds=(0, 1, 2))
+    assert len(extended.pending()) == 4
+    assert len(list(extended.run())) == 4
+    rows = extended.summary()
+    assert len(rows) == 4 and all(row['seeds'] == 3 for row in rows)
+
+
+def test_changed_settings_are_not_served_from_the_cache(tmp_path):
+    short = make_harness(tmp_path, ['fixed_time'], steps=5)
+    list(short.run())
+    longer = make_harness(tmp_path, ['fixed_time'], steps=12)
+    assert len(longer.pending()) == 4
+    list(longer.run())
+    assert {r['steps'] for r in longer.results()} == {12}
+    assert {r['steps'] for r in short.results()} == {5}
+    assert len(make_harness(tmp_path, ['fixed_time'], steps=5).pending()) == 0
+
+
+def test_failed_jobs_do_not_discard_finished_results(tmp_path, checkpoint):
+    missing = str(tmp_path / "actor_missing.pt")
+    open(missing, 'wb').close()   # unreadable checkpoint
+    harness = make_harness(tmp_path, [checkpoint, missing])
+    finished = []
+    with pytest.raises(RuntimeError, match="4 of 8"):
+        for result in harness.run():
+            finished.append(result)
+    assert len(finished) == 4
+    assert len(harness.results()) == 4
+    with open(harness.log_path) as f:
+        kinds = [json.loads(line)['kind'] for line in f]
+    assert kinds.count('evaluation_error') == 4
+    # Only the failed jobs are pending again
+    assert {job[0] for job in harness.pending()} == {missing}
+
+
+def test_confidence_intervals():
+    assert t_critical(1) == pytest.approx(12.706)
+    assert t_critical(11) == pytest.approx(2.228)
+    assert t_critical(500) == pytest.approx(1.96)
+    mean, ci = mean_ci([1.0, 2.0, 3.0])
+    assert mean == pytest.approx(2.0)
+    assert ci == pytest.approx(4.303 * 1.0 / 3 ** 0.5)
+    assert mean_ci([4.0])[1] != mean_ci([4.0])[1]   # NaN for a single seed
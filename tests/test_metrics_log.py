@@ -0,0 +1,114 @@
+"""JSON Lines metrics log: crash repair, tailing and the legacy conversion."""
+import json
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.madrl.metrics_log import MetricsReader, MetricsWriter, convert_legacy, list_runs, run_path
+
+
+def episodes(n, start=0):
+    return [{'kind': 'episode', 'episode': i, 'reward': i * 0.5, 'cost': 0.1} for i in range(start, start + n)]
+
+
+def write(log_dir, records, run_id='run', flush_every=32, **kwargs):
+    with MetricsWriter(run_id, str(log_dir), flush_every=flush_every, **kwargs) as writer:
+        for record in records:
+            writer.log(record)
+    return writer
+
+
+def test_records_round_trip(tmp_path):
+    writer = write(tmp_path, episodes(100), flush_every=7, info={'city': 'city4x4'})
+    assert writer.records_written == 100
+    reader = MetricsReader(writer.path)
+    assert list(reader.records()) == episodes(100)
+    assert list(reader.records(kind='summary')) == []
+    assert reader.last() == episodes(100)[-1:]
+    assert reader.last(3) == episodes(100)[-3:]
+    assert reader.last(500) == episodes(100)
+    [run] = list_runs(str(tmp_path))
+    assert (run['run'], run['city']) == ('run', 'city4x4')
+
+
+def test_truncated_last_line_is_repaired_on_reopen(tmp_path):
+    path = write(tmp_path, episodes(10)).path
+    # A crash in the middle of appending the next record
+    with open(path, 'ab') as f:
+        f.write(json.dumps(episodes(1, start=10)[0]).encode()[:-12])
+    reader = MetricsReader(path)
+    # Readers skip the torn line
+    assert list(reader.records()) == episodes(10)
+    assert reader.last(2) == episodes(10)[-2:]
+    assert reader.read_new() == episodes(10)
+
+    # Reopening the run truncates it, so appended records are intact
+    write(tmp_path, episodes(5, start=10))
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data.endswith(b'\n') and data.count(b'\n') == 15
+    assert list(reader.records()) == episodes(15)
+    assert reader.read_new() == episodes(5, start=10)
+    # Registered once, when the run was created
+    assert len(list_runs(str(tmp_path))) == 1
+
+
+def test_read_new_returns_each_record_once(tmp_path):
+    writer = MetricsWriter('run', str(tmp_path), flush_every=1)
+    reader = MetricsReader(writer.path)
+    assert reader.read_new() == []
+    for record in episodes(3):
+        writer.log(record)
+    assert reader.read_new() == episodes(3)
+    assert reader.read_new() == []
+    # An incomplete line is returned once it is complete
+    with open(writer.path, 'ab') as f:
+        f.write(b'{"kind":"episode",')
+    assert reader.read_new() == []
+    with open(writer.path, 'ab') as f:
+        f.write(b'"episode":3}\n')
+    assert reader.read_new() == [{'kind': 'episode', 'episode': 3}]
+
+
+def test_follow_yields_appended_records(tmp_path):
+    writer = MetricsWriter('run', str(tmp_path), flush_every=1)
+    writer.log(episodes(1)[0])
+    polls = []
+
+    def stop():
+        # Append between polls, as a training process would; stop after the third
+        polls.append(None)
+        if len(polls) == 1:
+            writer.log(episodes(1, start=1)[0])
+            writer.log(episodes(1, start=2)[0])
+        return len(polls) == 3
+
+    followed = list(MetricsReader(writer.path).follow(poll_interval=0, stop=stop))
+    assert followed == episodes(3)
+
+
+def test_convert_legacy(tmp_path):
+    metrics_path = tmp_path / 'metrics.json'
+    metrics_path.write_text(json.dumps({'episodes': episodes(4), 'best_reward': 1.5, 'best_episode': 3}))
+    baseline_path = tmp_path / 'baseline_results.csv'
+    baseline_path.write_text("Method,Avg Reward,Avg Cost\nFixed-Time,86.23,0.1003\nActuated,84.22,0.109\n")
+    log_dir = str(tmp_path / 'logs')
+
+    assert convert_legacy(str(metrics_path), str(baseline_path), 'legacy', log_dir) == 7
+    reader = MetricsReader(run_path('legacy', log_dir))
+    assert list(reader.records(kind='episode')) == episodes(4)
+    assert list(reader.records(kind='baseline')) == [
+        {'method': 'Fixed-Time', 'avg_reward': 86.23, 'avg_cost': 0.1003, 'kind': 'baseline'},
+        {'method': 'Actuated', 'avg_reward': 84.22, 'avg_cost': 0.109, 'kind': 'baseline'},
+    ]
+    assert reader.last() == [{'best_reward': 1.5, 'best_episode': 3, 'kind': 'summary'}]
+    assert list_runs(log_dir)[0]['converted_from'] == str(metrics_path)
+
+    # Never overwrites a run
+    with pytest.raises(FileExistsError):
+        convert_legacy(str(metrics_path), str(baseline_path), 'legacy', log_dir)
+    # Missing inputs are skipped
+    assert convert_legacy(str(tmp_path / 'missing.json'), None, 'empty', log_dir) == 0
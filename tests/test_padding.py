@@ -0,0 +1,117 @@
+"""Padding of mixed-size networks to a common agent count, and the masked trainer."""
+import os
+import sys
+
+import pytest
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.env.padding import agent_mask, pad_agents
+from src.env.threaded_vector_env import ThreadedVectorTrafficEnv
+from src.madrl.ppo_trainer import PPOTrainer
+
+CITIES = ['city2x2', 'city3x3', 'city2x2']
+COUNTS = [4, 9, 4]
+WIDTH = max(COUNTS)
+STEPS = 32
+
+
+def test_pad_agents():
+    tensors = [torch.full((n, 3), float(n)) for n in COUNTS]
+    padded, mask = pad_agents(tensors, fill=-1.0)
+    assert padded.shape == (3, WIDTH, 3)
+    assert torch.equal(mask, agent_mask(COUNTS))
+    assert mask.sum(dim=1).tolist() == COUNTS
+    for k, n in enumerate(COUNTS):
+        assert (padded[k, :n] == n).all() and (padded[k, n:] == -1.0).all()
+
+
+def test_mixed_cities_are_padded_with_an_agent_mask():
+    venv = ThreadedVectorTrafficEnv(3, use_sumo=False, cities=CITIES, config=RunConfig(device='cpu'))
+    try:
+        assert venv.reset(seed=0).shape == (3, WIDTH, 12)
+        assert venv.padded and venv.num_agents == WIDTH
+        assert torch.equal(venv.agent_mask.cpu(), agent_mask(COUNTS))
+        # Actions of padding slots are ignored; padded outputs are zero
+        actions = torch.ones(3, WIDTH, dtype=torch.long)
+        states, rewards, costs, _, _ = venv.step(actions)
+        padding = ~venv.agent_mask
+        assert states.shape == (3, WIDTH, 12) and rewards.shape == costs.shape == (3, WIDTH, 1)
+        assert not states[padding].any() and not rewards[padding].any() and not costs[padding].any()
+        assert states[venv.agent_mask].any()
+    finally:
+        venv.close()
+
+
+def masked_trainer(garbage):
+    """A masked trainer filled with a padded rollout; `garbage` fills the padding rows with noise."""
+    torch.manual_seed(0)
+    config = RunConfig(num_agents=len(COUNTS) * WIDTH, buffer_size=STEPS, batch_size=64, ppo_epochs=2,
+                       device='cpu')
+    trainer = PPOTrainer(config=config, masked=True, num_envs=len(COUNTS))
+    data = torch.Generator().manual_seed(1)
+    noise = torch.Generator().manual_seed(2)
+    mask = agent_mask(COUNTS)
+    padding = ~mask.unsqueeze(-1)
+
+    def pad(tensor, scale=100.0):
+        if not garbage:
+            return tensor.masked_fill(padding, 0)
+        return torch.where(padding, scale * torch.randn(tensor.shape, generator=noise), tensor)
+
+    for t in range(STEPS):
+        states = pad(torch.randn(len(COUNTS), WIDTH, config.state_dim, generator=data))
+        with torch.no_grad():
+            values, cost_values = trainer.critic(states)
+            logits = trainer.actor(states)
+        actions = torch.randint(0, config.action_dim, (len(COUNTS), WIDTH, 1), generator=data)
+        log_probs = torch.log_softmax(logits, dim=-1).gather(-1, actions)
+        if garbage:
+            actions = torch.where(padding, torch.randint(0, config.action_dim, actions.shape, generator=noise), actions)
+        rewards = pad(torch.randn(len(COUNTS), 1, 1, generator=data).expand(-1, WIDTH, -1))
+        costs = pad(torch.rand(len(COUNTS), 1, 1, generator=data).expand(-1, WIDTH, -1))
+        trainer.store(states, actions, pad(log_probs, 1.0), rewards, costs, pad(values), pad(cost_values),
+                      torch.zeros(len(COUNTS), dtype=torch.bool), agent_mask=mask)
+    next_states = pad(torch.randn(len(COUNTS), WIDTH, config.state_dim, generator=data))
+    return trainer, next_states
+
+
+def test_padding_agents_contribute_no_loss():
+    clean, _ = masked_trainer(garbage=False)
+    noisy, _ = masked_trainer(garbage=True)
+    zeros = torch.zeros(len(COUNTS), WIDTH, 1)
+    lagrange = clean.lagrange_multiplier.detach()
+    losses = []
+    for trainer in (clean, noisy):
+        trainer.buffer.compute_advantages_and_returns(zeros, zeros)
+        batch = trainer.buffer._unpack(trainer.buffer._pack().reshape(-1, trainer.buffer.packed_width))
+        with torch.no_grad():
+            losses.append(trainer._compute_losses(*batch[:7], lagrange, batch[7])[:4])
+    real = batch[7].squeeze(-1) > 0
+    assert real.sum() == STEPS * sum(COUNTS)
+    # Same losses with any padding content, and as for the real rows alone without a mask
+    with torch.no_grad():
+        unpadded = clean._compute_losses(*[b[real] for b in batch[:7]], lagrange)[:4]
+    for a, b, c in zip(*losses, unpadded):
+        torch.testing.assert_close(a, b)
+        torch.testing.assert_close(a, c)
+
+
+def test_padding_agents_do_not_change_the_update():
+    results = []
+    for garbage in (False, True):
+        trainer, next_states = masked_trainer(garbage)
+        torch.manual_seed(3)
+        stats = trainer.train_step(next_states, done=False)
+        results.append((stats, trainer))
+    (clean_stats, clean), (noisy_stats, noisy) = results
+    # The Lagrangian cost and the per-episode cost average only see real agents
+    for key in ('avg_cost', 'lagrange_multiplier', 'policy_loss', 'critic_loss', 'approx_kl'):
+        assert clean_stats[key] == pytest.approx(noisy_stats[key]), key
+    assert clean.current_episode_cost_sum == pytest.approx(noisy.current_episode_cost_sum)
+    for a, b in zip(clean.actor.parameters(), noisy.actor.parameters()):
+        torch.testing.assert_close(a, b)
+    for a, b in zip(clean.critic.parameters(), noisy.critic.parameters()):
+        torch.testing.assert_close(a, b)
@@ -0,0 +1,80 @@
+"""AsyncRolloutRunner on the surrogate: early exit, worker failures and step accounting."""
+import os
+import signal
+import sys
+
+import pytest
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.madrl.rollout import AsyncRolloutRunner
+
+
+def policy(states):
+    return torch.zeros(states.shape[:2], dtype=torch.long)
+
+
+@pytest.fixture
+def runner():
+    runner = AsyncRolloutRunner(4, policy, use_sumo=False, city='city2x2')
+    yield runner
+    runner.close()
+
+
+@pytest.fixture(autouse=True)
+def no_hang():
+    def timeout(*_):
+        raise TimeoutError("rollout hung")
+    previous = signal.signal(signal.SIGALRM, timeout)
+    signal.alarm(60)
+    yield
+    signal.alarm(0)
+    signal.signal(signal.SIGALRM, previous)
+
+
+def test_groups_alternate_and_count_steps(runner):
+    runner.reset(seed=0)
+    groups = [transition[0] for transition in runner.run(3)]
+    assert groups == [0, 1, 0, 1, 0, 1]
+    assert runner.get_stats()['env_steps'] == 12
+
+
+def test_leaving_early_settles_the_step_in_flight(runner):
+    runner.reset(seed=0)
+    for i, _ in enumerate(runner.run(10)):
+        if i == 2:
+            break
+    assert runner._pending == [None, None]
+    assert not any(group._waiting for group in runner.groups)
+    # Only the three consumed transitions count
+    assert runner.get_stats()['env_steps'] == 6
+    transitions = list(runner.run(2))
+    assert len(transitions) == 4
+    assert transitions[-1][3].shape == (2, 4, 12)
+
+
+def test_worker_failure_raises_instead_of_hanging(runner, monkeypatch):
+    runner.reset(seed=0)
+    group = runner.groups[1]
+    receive = group._receive
+    calls = {'n': 0}
+
+    def failing_receive():
+        # Read every reply, then report a worker failure on the second step of group B
+        results = receive()
+        calls['n'] += 1
+        if calls['n'] == 2:
+            raise RuntimeError("Worker failure: injected")
+        return results
+
+    monkeypatch.setattr(group, '_receive', failing_receive)
+    consumed = 0
+    with pytest.raises(RuntimeError, match="injected"):
+        for _ in runner.run(5):
+            consumed += 1
+    assert runner._pending == [None, None]
+    assert runner.get_stats()['env_steps'] == 2 * consumed
+
+    monkeypatch.setattr(group, '_receive', receive)
+    assert len(list(runner.run(1))) == 2
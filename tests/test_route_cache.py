@@ -0,0 +1,127 @@
+"""RouteCache file naming and reuse, RoutePrefetcher.poll, and the file_digest memo."""
+import gzip
+import os
+import shutil
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import get_sumo_config_file
+from src.env import route_cache
+from src.env.route_cache import RouteCache, RoutePrefetcher, file_digest, find_random_trips
+from src.env.topology import get_net_file
+
+NET_FILE = get_net_file(get_sumo_config_file('medium', 'city4x4'))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = RouteCache(cache_dir=str(tmp_path / 'routes'), max_workers=1, end=60)
+    yield cache
+    cache.close()
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, 'wb') as f:
+        f.write(b'<routes/>')
+
+
+def test_file_name_follows_network_content_and_options(cache, tmp_path):
+    path = cache.path('city4x4', 'medium', 0)
+    assert os.path.basename(path).startswith('city4x4_medium_seed0_p3.6_')
+    assert cache.path('city4x4', 'medium', 0) == path
+    assert cache.path('city4x4', 'medium', 1) != path
+    assert cache.path('city4x4', 'medium', 0, period=5.0) != path
+
+    # The same network content under another path shares the file; an edited one does not
+    net_copy = str(tmp_path / 'copy.net.xml')
+    shutil.copyfile(NET_FILE, net_copy)
+    assert cache.path('city4x4', 'medium', 0, net_file=net_copy) == path
+    with open(net_copy, 'a') as f:
+        f.write('<!-- edited -->\n')
+    assert cache.path('city4x4', 'medium', 0, net_file=net_copy) != path
+
+
+def test_cached_file_is_reused(cache):
+    path = cache.path('city4x4', 'high', 3)
+    touch(path)
+    future = cache.submit('city4x4', 'high', 3)
+    assert future.done() and future.result() == path
+    assert cache.get('city4x4', 'high', 3) == path
+    assert cache.get_stats() == {'hits': 2, 'misses': 0, 'pending': 0}
+    # Nothing was generated, so no worker pool was started
+    assert cache._executor is None
+
+
+def test_generated_file_is_reused(cache):
+    try:
+        find_random_trips()
+    except FileNotFoundError:
+        pytest.skip("randomTrips.py not available")
+    path = cache.get('city4x4', 'low', 0)
+    assert path == cache.path('city4x4', 'low', 0) and os.path.exists(path)
+    with gzip.open(path, 'rt') as f:
+        assert '<routes' in f.read()
+    mtime = os.stat(path).st_mtime_ns
+    assert cache.get('city4x4', 'low', 0) == path
+    assert os.stat(path).st_mtime_ns == mtime
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_random_trips_falls_back_to_the_sumo_package(tmp_path, monkeypatch):
+    sumo = pytest.importorskip('sumo')
+    # As libsumo's wheel leaves it: SUMO_HOME without a tools/ directory
+    monkeypatch.setenv('SUMO_HOME', str(tmp_path))
+    assert find_random_trips() == os.path.join(sumo.SUMO_HOME, 'tools', 'randomTrips.py')
+
+
+class ManualCache:
+    """Stands in for RouteCache.submit with futures the test completes itself."""
+
+    def __init__(self):
+        self.futures = {}
+
+    def submit(self, city, scenario, seed, period=None):
+        return self.futures.setdefault(seed, Future())
+
+
+def test_poll_returns_none_until_the_file_is_ready():
+    cache = ManualCache()
+    prefetcher = RoutePrefetcher(cache, (('city4x4', 'medium', seed, None) for seed in range(4)), ahead=2)
+    assert sorted(cache.futures) == [0, 1]
+
+    assert prefetcher.poll() is None
+    assert prefetcher.poll() is None
+    # A later file being ready does not skip the one ahead of it
+    cache.futures[1].set_result('routes-1')
+    assert prefetcher.poll() is None
+    cache.futures[0].set_result('routes-0')
+    assert prefetcher.poll() == 'routes-0'
+    assert sorted(cache.futures) == [0, 1, 2]
+    assert prefetcher.poll() == 'routes-1'
+    cache.futures[2].set_exception(RuntimeError("randomTrips.py failed"))
+    assert prefetcher.poll() is None
+    assert (prefetcher.ready, prefetcher.stalls) == (2, 3)
+
+
+def test_digest_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(route_cache, '_digests', route_cache.OrderedDict())
+    monkeypatch.setattr(route_cache, 'DIGEST_MEMO_SIZE', 4)
+    paths = []
+    for i in range(6):
+        paths.append(str(tmp_path / f'file{i}'))
+        with open(paths[-1], 'w') as f:
+            f.write(str(i))
+        file_digest(paths[-1])
+    assert list(route_cache._digests) == paths[2:]
+
+    # A changed file replaces its entry instead of adding one
+    first = file_digest(paths[-1])
+    with open(paths[-1], 'w') as f:
+        f.write('changed content')
+    assert file_digest(paths[-1]) != first
+    assert len(route_cache._digests) == 4
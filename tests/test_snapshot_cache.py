@@ -0,0 +1,121 @@
+"""SnapshotCache and SUMOInterface.warm_start against the in-process FakeTraCI backend."""
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import get_sumo_config_file
+from src.env.fake_traci import FakeTraCI
+from src.env.snapshot_cache import SnapshotCache
+from src.env.sumo_interface import SUMOInterface
+
+
+@pytest.fixture
+def api():
+    return FakeTraCI(grid_size=2)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SnapshotCache(str(tmp_path / "snapshots"), warmup_steps=20)
+
+
+def make_interface(api, scenario='medium'):
+    return SUMOInterface(sumo_cfg_path=get_sumo_config_file(scenario), scenario=scenario, api=api)
+
+
+def test_miss_then_hits_reuse_the_running_process(api, cache):
+    sumo = make_interface(api)
+    assert sumo.warm_start(cache, seed=1) is False
+    assert (api.starts, api.state_saves, api.state_loads) == (1, 1, 0)
+
+    for _ in range(3):
+        assert sumo.warm_start(cache, seed=1) is True
+    assert api.starts == 1
+    assert api.state_loads == 3
+    assert api.state_saves == 1
+    assert sumo._traci.simulation.getTime() == 20
+    sumo.end()
+
+
+def test_hit_rate_and_latency_stats(api, cache):
+    sumo = make_interface(api)
+    for hit in (False, True, True):
+        assert sumo.warm_start(cache, seed=0) is hit
+        cache.record_reset(0.01 if hit else 0.5, hit)
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+    assert stats['hit_reset_latency'] < stats['miss_reset_latency']
+    sumo.end()
+
+
+def test_snapshots_are_restored_exactly(api, cache):
+    sumo = make_interface(api)
+    sumo.warm_start(cache, seed=3)
+    warm = sumo.get_all_states()
+    for _ in range(15):
+        sumo._traci.simulationStep()
+    sumo.warm_start(cache, seed=3)
+    assert (sumo.get_all_states() == warm).all()
+    sumo.end()
+
+
+def test_seed_change_is_a_miss_and_reloads_in_process(api, cache):
+    sumo = make_interface(api)
+    sumo.warm_start(cache, seed=1)
+    assert sumo.warm_start(cache, seed=2) is False
+    assert api.starts == 1
+    assert api.loads == 1
+    assert sumo._conn.seed == 2
+    sumo.end()
+
+
+def test_key_depends_on_config_route_file_and_warmup(tmp_path, cache):
+    cfg = get_sumo_config_file('medium')
+    base = cache.path('city4x4', 'medium', 0, cfg)
+    assert cache.path('city4x4', 'medium', 0, cfg) == base
+    assert cache.path('city4x4', 'medium', 1, cfg) != base
+    assert cache.path('city4x4', 'medium', 0, get_sumo_config_file('high')) != base
+    assert cache.path('city4x4', 'medium', 0, cfg, route_file=str(tmp_path / "a.rou.xml")) != base
+    assert cache.path('city4x4', 'medium', 0, cfg, route_file=str(tmp_path / "a.rou.xml")) != \
+        cache.path('city4x4', 'medium', 0, cfg, route_file=str(tmp_path / "b.rou.xml"))
+    assert SnapshotCache(cache.cache_dir, warmup_steps=cache.warmup_steps + 1).path('city4x4', 'medium', 0, cfg) != base
+
+
+def test_new_route_file_is_a_miss(api, cache, tmp_path):
+    sumo = make_interface(api)
+    sumo.warm_start(cache, seed=0)
+    sumo.update_route_file(str(tmp_path / "demand.rou.xml"))
+    assert sumo.warm_start(cache, seed=0) is False
+    assert sumo.warm_start(cache, seed=0) is True
+    assert api.starts == 1
+    sumo.end()
+
+
+def test_snapshot_hit_after_route_switch_loads_the_new_demand(api, cache, tmp_path):
+    old_routes, new_routes = str(tmp_path / "old.rou.xml"), str(tmp_path / "new.rou.xml")
+    sumo = make_interface(api)
+    # Snapshot for the new demand cached by an earlier run
+    sumo.update_route_file(new_routes)
+    sumo.warm_start(cache, seed=0)
+    sumo.end()
+
+    sumo = make_interface(api)
+    sumo.update_route_file(old_routes)
+    sumo.warm_start(cache, seed=0)
+    assert sumo._conn.route_file == old_routes
+    loads = api.loads
+
+    # The route provider switches the demand, and its snapshot is a hit
+    sumo.update_route_file(new_routes)
+    assert sumo.warm_start(cache, seed=0) is True
+    assert api.loads == loads + 1
+    assert sumo._conn.route_file == new_routes
+
+    # Unchanged demand: hits only load the state
+    assert sumo.warm_start(cache, seed=0) is True
+    assert api.loads == loads + 1
+    sumo.end()
@@ -0,0 +1,105 @@
+"""Subscription state/metrics and TopologyIndex against the per-lane polling they replace."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import get_sumo_config_file
+from src.env.fake_traci import FakeTraCI
+from src.env.state_engine import STOPPED_SPEED, VehicleMetricsCollector
+from src.env.sumo_interface import SUMOInterface
+from src.env.topology import TopologyIndex, get_net_file
+
+
+@pytest.fixture
+def sumo():
+    sumo = SUMOInterface(sumo_cfg_path=get_sumo_config_file('medium'), api=FakeTraCI(grid_size=3))
+    sumo.start(seed=5)
+    yield sumo
+    sumo.end()
+
+
+def polled_states(sumo):
+    """The original path: getControlledLanes and per-lane getters for every intersection."""
+    return np.array([sumo.get_state(tls_id) for tls_id in sumo.tls_ids], dtype=np.float32)
+
+
+def test_subscription_and_topology_states_match_polling(sumo):
+    engine = sumo.state_engine
+    for step in range(120):
+        sumo._traci.simulationStep()
+        if step % 7 == 3:
+            sumo._traci.trafficlight.setPhase(sumo.tls_ids[step % len(sumo.tls_ids)], 2)
+        expected = polled_states(sumo)
+        assert np.allclose(engine.get_states(), expected)
+
+        # Per-lane queries through the topology gather / segment sum
+        sumo.state_engine = None
+        assert np.allclose(sumo.get_all_states(), expected)
+        sumo.state_engine = engine
+    assert expected[:, 1:9].any()
+
+
+def test_states_written_into_out(sumo):
+    for _ in range(40):
+        sumo._traci.simulationStep()
+    out = np.full((len(sumo.tls_ids), 12), 7.0, dtype=np.float32)
+    assert sumo.get_all_states(out=out) is out
+    assert np.allclose(out, polled_states(sumo))
+
+
+def test_vehicle_metrics_match_polling(sumo):
+    api = sumo._traci
+    collector = VehicleMetricsCollector(api)
+    for _ in range(150):
+        api.simulationStep()
+        vehicles = api.vehicle.getIDList()
+        speeds = [api.vehicle.getSpeed(v) for v in vehicles]
+        expected = (sum(api.vehicle.getWaitingTime(v) for v in vehicles),
+                    sum(1 for s in speeds if s < STOPPED_SPEED), sum(speeds), len(vehicles))
+        waiting, stopped, speed, count = collector.collect()
+        assert (stopped, count) == expected[1::2]
+        assert waiting == pytest.approx(expected[0])
+        assert speed == pytest.approx(expected[2])
+    assert count > 0
+
+
+def test_collector_subscribes_vehicles_already_in_the_network(sumo):
+    api = sumo._traci
+    for _ in range(30):
+        api.simulationStep()
+    collector = VehicleMetricsCollector(api)
+    api.simulationStep()
+    assert collector.collect()[3] == len(api.vehicle.getIDList())
+
+
+def _sumo_binary():
+    try:
+        import sumolib
+        binary = sumolib.checkBinary('sumo')
+        return binary if os.path.exists(binary) else None
+    except Exception:
+        return None
+
+
+@pytest.mark.skipif(_sumo_binary() is None, reason="SUMO is not installed")
+@pytest.mark.parametrize('city', ['city2x2', 'city4x4'])
+def test_topology_from_net_file_matches_traci(city):
+    import traci
+    net_file = get_net_file(get_sumo_config_file('medium', city))
+    label = f"test-topology-{city}"
+    # Network only: no demand and none of the configuration's output files
+    traci.start([_sumo_binary(), '-n', net_file, '--no-step-log', 'true'], label=label, doSwitch=False)
+    try:
+        live = TopologyIndex.from_traci(traci.getConnection(label))
+    finally:
+        traci.getConnection(label).close()
+    offline = TopologyIndex.from_net_file(net_file)
+
+    assert offline.tls_ids == live.tls_ids
+    assert offline.lane_ids == live.lane_ids
+    for name in ('link_lane', 'link_group', 'num_phases', 'approach_mask'):
+        assert np.array_equal(getattr(offline, name), getattr(live, name)), name
@@ -0,0 +1,103 @@
+"""SUMOProcessPool reuse, reload and replacement of dead processes, on FakeTraCI."""
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import get_sumo_config_file
+from src.env.fake_traci import FakeTraCI
+from src.env.sumo_interface import SUMOInterface
+from src.env.sumo_pool import SUMOProcessPool
+
+
+def command(config='a.sumocfg', seed=0, binary='sumo'):
+    return [binary, '-c', config, '--seed', str(seed)]
+
+
+@pytest.fixture
+def fake():
+    return FakeTraCI(grid_size=2)
+
+
+@pytest.fixture
+def pool(fake):
+    pool = SUMOProcessPool(api=fake)
+    yield pool
+    pool.close()
+
+
+def test_released_process_is_reloaded_not_relaunched(fake, pool):
+    conn = pool.acquire(command(seed=1))
+    label = conn.getLabel()
+    assert (fake.starts, conn.seed) == (1, 1)
+    pool.release(conn)
+    assert pool.get_stats()['idle'] == 1
+
+    again = pool.acquire(command(seed=2))
+    assert again is conn and again.getLabel() == label
+    # The new episode's options were loaded into the running process
+    assert (fake.starts, fake.loads, again.seed) == (1, 1, 2)
+    assert pool.get_stats() == {'processes': 1, 'idle': 0, 'in_use': 1, 'launches': 1, 'reloads': 1,
+                                'restarts': 0}
+
+
+def test_busy_processes_are_not_shared(fake, pool):
+    first = pool.acquire(command())
+    second = pool.acquire(command())
+    assert first is not second and first.getLabel() != second.getLabel()
+    assert (pool.launches, fake.starts, len(pool)) == (2, 2, 2)
+
+
+def test_idle_process_of_the_same_config_is_preferred(pool):
+    a, b = pool.acquire(command('a.sumocfg')), pool.acquire(command('b.sumocfg'))
+    pool.release(a)
+    pool.release(b)
+    assert pool.acquire(command('b.sumocfg')) is b
+    assert pool.acquire(command('b.sumocfg')) is a
+    assert pool.acquire(command('a.sumocfg', binary='sumo-gui')) not in (a, b)
+
+
+def test_killed_idle_process_is_replaced(fake, pool):
+    conn = pool.acquire(command())
+    pool.release(conn)
+    conn.kill()
+
+    replacement = pool.acquire(command())
+    assert replacement is not conn and replacement.getLabel() != conn.getLabel()
+    assert replacement.simulation.getTime() == 0
+    assert (pool.restarts, pool.launches, fake.starts) == (1, 2, 2)
+    assert pool.get_stats()['processes'] == 1
+
+
+def test_process_killed_in_use_is_dropped_on_release(pool):
+    conn = pool.acquire(command())
+    conn.kill()
+    pool.release(conn)
+    assert pool.get_stats()['processes'] == pool.get_stats()['idle'] == 0
+    assert pool.acquire(command()) is not conn
+
+
+def test_max_idle_closes_surplus_processes(pool):
+    pool.max_idle = 1
+    a, b = pool.acquire(command()), pool.acquire(command())
+    pool.release(a)
+    pool.release(b)
+    assert not b.connected
+    assert pool.get_stats()['idle'] == len(pool) == 1
+
+
+def test_interface_episodes_share_one_pooled_process(fake, pool):
+    sumo = SUMOInterface(sumo_cfg_path=get_sumo_config_file('medium'), api=fake, pool=pool)
+    labels = []
+    for seed in (0, 1, 2):
+        sumo.start(seed=seed)
+        for _ in range(5):
+            sumo.step()
+        labels.append(sumo._conn.getLabel())
+        assert sumo._conn.seed == seed
+        sumo.end()
+    assert len(set(labels)) == 1
+    assert (fake.starts, pool.reloads) == (1, 2)
+    assert pool.get_stats()['idle'] == 1
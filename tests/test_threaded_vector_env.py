@@ -0,0 +1,70 @@
+"""ThreadedVectorTrafficEnv: one connection per environment, stepped from a thread pool."""
+import os
+import sys
+
+import pytest
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.env.threaded_vector_env import ThreadedVectorTrafficEnv
+
+NUM_ENVS = 3
+EPISODE = 5
+
+
+@pytest.fixture
+def venv():
+    venv = ThreadedVectorTrafficEnv(NUM_ENVS, backend='fake',
+                                    config=RunConfig(max_steps_per_episode=EPISODE, device='cpu'))
+    yield venv
+    venv.close()
+
+
+def connections(venv):
+    return [env.sumo._conn for env in venv.envs]
+
+
+def test_each_environment_has_its_own_connection(venv):
+    venv.reset(seed=10)
+    conns = connections(venv)
+    assert len({conn.getLabel() for conn in conns}) == NUM_ENVS
+    # Environment k is seeded with seed + k
+    assert [conn.seed for conn in conns] == [10, 11, 12]
+
+
+def test_shapes(venv):
+    states = venv.reset(seed=0)
+    assert states.shape == (NUM_ENVS, venv.num_agents, 12) and not venv.padded
+    states, rewards, costs, dones, infos = venv.step(torch.ones(NUM_ENVS, venv.num_agents, dtype=torch.long))
+    assert states.shape == (NUM_ENVS, venv.num_agents, 12)
+    assert rewards.shape == costs.shape == (NUM_ENVS, venv.num_agents, 1)
+    assert dones.shape == (NUM_ENVS,) and dones.dtype == torch.bool
+    assert all(info['step_time'] > 0 for info in infos)
+
+
+def test_auto_reset_on_done(venv):
+    venv.reset(seed=0)
+    actions = torch.zeros(NUM_ENVS, venv.num_agents, dtype=torch.long)
+    for t in range(1, EPISODE + 1):
+        states, _, _, dones, infos = venv.step(actions)
+        assert dones.all() == (t == EPISODE)
+    assert all(info['terminal_observation'].shape == (venv.num_agents, 12) for info in infos)
+    # The next episode of environment k uses seed + k + num_envs
+    conns = connections(venv)
+    assert [conn.seed for conn in conns] == [3, 4, 5]
+    assert all(conn.time == 0 for conn in conns)
+    _, _, _, dones, infos = venv.step(actions)
+    assert not dones.any() and not any('terminal_observation' in info for info in infos)
+
+
+def test_close_waits_for_a_step_in_flight():
+    venv = ThreadedVectorTrafficEnv(2, backend='fake', config=RunConfig(device='cpu'))
+    venv.reset()
+    conns = connections(venv)
+    venv.step_async(torch.zeros(2, venv.num_agents, dtype=torch.long))
+    venv.close()
+    assert venv.closed and not any(conn.connected for conn in conns)
+    assert all(conn.time == 1 for conn in conns)
+    venv.close()
@@ -0,0 +1,129 @@
+"""Chunked trajectory recording round trip: columns, cross-chunk returns and to_buffer."""
+import os
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.agents.critic import Critic
+from src.config import RunConfig
+from src.madrl.trajectory import TrajectoryDataset, TrajectoryRecorder, find_trajectories
+
+STEPS, CHUNK, NUM_ENVS, AGENTS_PER_ENV = 70, 32, 2, 4
+NUM_AGENTS = NUM_ENVS * AGENTS_PER_ENV
+GAMMA = 0.9
+
+
+@pytest.fixture
+def config():
+    return RunConfig(num_agents=NUM_AGENTS, device='cpu')
+
+
+@pytest.fixture
+def recorded(tmp_path, config):
+    """A recording of 70 steps in chunks of 32 (32 + 32 + 6), and the data that went in."""
+    generator = torch.Generator().manual_seed(0)
+    data = {
+        'states': torch.randn(STEPS, NUM_AGENTS, config.state_dim, generator=generator),
+        'actions': torch.randint(0, config.action_dim, (STEPS, NUM_AGENTS), generator=generator),
+        'log_probs': -torch.rand(STEPS, NUM_AGENTS, generator=generator),
+        'rewards': torch.randn(STEPS, NUM_AGENTS, generator=generator),
+        'costs': torch.rand(STEPS, NUM_AGENTS, generator=generator),
+        'dones': torch.zeros(STEPS, NUM_ENVS, dtype=torch.bool),
+    }
+    # Episode ends inside chunks, on the last row of a chunk, and one per environment only
+    data['dones'][[10, 40], 0] = True
+    data['dones'][[31, 50], 1] = True
+    with TrajectoryRecorder('city2x2', 'medium', 0, 'actor_test.pt', config=config, num_envs=NUM_ENVS,
+                            root=str(tmp_path), chunk_steps=CHUNK) as recorder:
+        for t in range(STEPS):
+            recorder.record(*(data[name][t] for name in ('states', 'actions', 'log_probs', 'rewards',
+                                                          'costs', 'dones')))
+    return recorder.directory, data
+
+
+def test_columns_round_trip(tmp_path, recorded):
+    directory, data = recorded
+    assert find_trajectories(str(tmp_path)) == [directory]
+    dataset = TrajectoryDataset(directory)
+    assert len(dataset) == STEPS
+    assert [chunk['rows'] for chunk in dataset.manifest['chunks']] == [32, 32, 6]
+    assert dataset.chunks[0]['actions'].dtype == np.uint8 and dataset.chunks[0]['dones'].dtype == np.bool_
+
+    batches = list(dataset.batches())
+    assert [len(batch['states']) for batch in batches] == [32, 32, 6]
+    for name, values in data.items():
+        stored = torch.cat([batch[name] for batch in batches])
+        assert torch.equal(stored.reshape(values.shape).to(values.dtype), values), name
+    # Windows stay inside their chunk
+    assert [len(batch['states']) for batch in dataset.batches(steps=20)] == [20, 12, 20, 12, 6]
+
+
+def test_compute_returns_carries_across_chunks(recorded):
+    directory, data = recorded
+    dataset = TrajectoryDataset(directory)
+    dataset.compute_returns(GAMMA)
+
+    # Direct loop over the whole recording
+    dones = data['dones'].repeat_interleave(AGENTS_PER_ENV, dim=1).double()
+    expected = {'returns': torch.zeros(STEPS, NUM_AGENTS, dtype=torch.float64)}
+    expected['cost_returns'] = expected['returns'].clone()
+    for name, source in (('returns', 'rewards'), ('cost_returns', 'costs')):
+        running = torch.zeros(NUM_AGENTS, dtype=torch.float64)
+        for t in reversed(range(STEPS)):
+            running = data[source][t].double() + GAMMA * (1.0 - dones[t]) * running
+            expected[name][t] = running
+
+    # Also as a freshly opened dataset reads them
+    for reader in (dataset, TrajectoryDataset(directory)):
+        batches = list(reader.batches())
+        for name in ('returns', 'cost_returns'):
+            stored = torch.cat([batch[name] for batch in batches]).squeeze(-1)
+            torch.testing.assert_close(stored.double(), expected[name], rtol=1e-5, atol=1e-5)
+    # Without the carry, the last step of the first chunk would only hold its own reward
+    assert not torch.allclose(expected['returns'][CHUNK - 1], data['rewards'][CHUNK - 1].double())
+
+
+def test_compute_returns_only_reruns_for_a_new_gamma(recorded):
+    directory, _ = recorded
+    dataset = TrajectoryDataset(directory)
+    dataset.compute_returns(GAMMA)
+    path = os.path.join(directory, 'returns.00000.npy')
+    first = np.load(path)
+    mtime = os.stat(path).st_mtime_ns
+    dataset.compute_returns(GAMMA)
+    assert os.stat(path).st_mtime_ns == mtime
+    dataset.compute_returns(0.5)
+    assert TrajectoryDataset(directory).manifest['returns'] == {'gamma': 0.5}
+    assert not np.allclose(np.load(path), first)
+
+
+def test_to_buffer_rebuilds_the_stored_tensors(recorded, config):
+    directory, data = recorded
+    dataset = TrajectoryDataset(directory)
+    torch.manual_seed(0)
+    critic = Critic(config)
+    batch = next(dataset.batches())
+    buffer, next_v, next_cv = dataset.to_buffer(batch, critic, config)
+
+    assert buffer.ptr == buffer.buffer_size == CHUNK and buffer.num_envs == NUM_ENVS
+    # Recorded fields are used in place, without a copy
+    for name in ('states', 'actions', 'log_probs', 'rewards', 'costs', 'dones'):
+        assert getattr(buffer, name).data_ptr() == batch[name].data_ptr(), name
+    assert torch.equal(buffer.states, data['states'][:CHUNK])
+    assert torch.equal(buffer.actions.long().squeeze(-1), data['actions'][:CHUNK])
+    assert torch.equal(buffer.agent_view(buffer.dones).squeeze(-1),
+                       data['dones'][:CHUNK].repeat_interleave(AGENTS_PER_ENV, dim=1))
+    with torch.no_grad():
+        values, cost_values = critic(data['states'][:CHUNK])
+    torch.testing.assert_close(buffer.values, values)
+    torch.testing.assert_close(buffer.cost_values, cost_values)
+    assert not next_v.any() and not next_cv.any()
+
+    buffer.compute_advantages_and_returns(next_v, next_cv)
+    assert buffer.advantages.shape == (CHUNK, NUM_AGENTS, 1)
+    samples = sum(len(minibatch[0]) for minibatch in buffer.get(64))
+    assert samples == CHUNK * NUM_AGENTS
@@ -0,0 +1,87 @@
+"""VectorTrafficEnv (worker processes, shared memory) and SurrogateVectorEnv without SUMO."""
+import os
+import sys
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+from src.config import RunConfig
+from src.env.surrogate import SurrogateVectorEnv
+from src.env.vector_env import VectorTrafficEnv
+
+EPISODE = 6
+
+
+@pytest.fixture
+def venv():
+    venv = VectorTrafficEnv(3, use_sumo=False, city='city2x2',
+                            config=RunConfig(max_steps_per_episode=EPISODE, device='cpu'))
+    yield venv
+    venv.close()
+
+
+def test_shapes(venv):
+    states = venv.reset(seed=0)
+    assert venv.num_agents == 4
+    assert states.shape == (3, 4, 12) and states.dtype == torch.float32
+    states, rewards, costs, dones, infos = venv.step(torch.ones(3, 4, dtype=torch.long))
+    assert states.shape == (3, 4, 12)
+    assert rewards.shape == costs.shape == (3, 4, 1)
+    assert dones.shape == (3,) and dones.dtype == torch.bool
+    assert len(infos) == 3 and all('step_time' in info for info in infos)
+    assert states.device == torch.device('cpu')
+
+
+def test_environments_are_seeded_per_rank(venv):
+    first = venv.reset(seed=0)
+    assert torch.equal(first, venv.reset(seed=0))
+    actions = torch.zeros(3, 4, dtype=torch.long)
+    for _ in range(3):
+        venv.step(actions)
+    after = venv.reset(seed=0)
+    assert torch.equal(first, after)
+
+
+def test_auto_reset_on_done(venv):
+    venv.reset(seed=0)
+    actions = torch.zeros(3, 4, dtype=torch.long)
+    for step in range(1, EPISODE + 1):
+        states, _, _, dones, infos = venv.step(actions)
+        if step < EPISODE:
+            assert not dones.any()
+    assert dones.all()
+    for info in infos:
+        assert torch.as_tensor(info['terminal_observation']).shape == (4, 12)
+    # The workers started the next episode: it runs its full length again
+    for _ in range(EPISODE - 1):
+        assert not venv.step(actions)[3].any()
+    assert venv.step(actions)[3].all()
+
+
+def test_close_releases_workers_and_shared_memory():
+    venv = VectorTrafficEnv(2, use_sumo=False, city='city2x2', config=RunConfig(device='cpu'))
+    venv.reset(seed=1)
+    venv.step_async(torch.zeros(2, 4, dtype=torch.long))   # closed while a step is in flight
+    names = [shm.name for shm in venv._shm.values()]
+    processes = list(venv._processes)
+    venv.close()
+    assert venv.closed
+    assert not any(p.is_alive() for p in processes)
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+    venv.close()   # idempotent
+
+
+def test_surrogate_vector_env_follows_the_config():
+    venv = SurrogateVectorEnv(2, city='city3x3', config=RunConfig(max_steps_per_episode=4, device='cpu'))
+    assert venv.num_agents == venv.config.num_agents == 9
+    venv.reset(seed=0)
+    actions = torch.zeros(2, 9, dtype=torch.long)
+    for _ in range(4):
+        states, rewards, _, dones, infos = venv.step(actions)
+    assert dones.all() and 'terminal_observation' in infos[0]
+    assert states.shape == (2, 9, 12) and rewards.shape == (2, 9, 1)